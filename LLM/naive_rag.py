@@ -6,6 +6,7 @@
 
 import os
 import json
+import math
 import logging
 from typing import List, Dict, Any, Optional
 import psycopg2
@@ -21,6 +22,16 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+EMBEDDING_DIMENSIONS = 3072  # policy_embeddings.embedding (text-embedding-3-large)
+
+
+def reduce_embedding(embedding: List[float], dimensions: int) -> List[float]:
+    """Matryoshka 차원 축소 (앞 dimensions개만 남기고 L2 정규화) - 적재 시 저장한 embedding_{차원}과 같은 방식"""
+    reduced = embedding[:dimensions]
+    norm = math.sqrt(sum(value * value for value in reduced)) or 1.0
+    return [value / norm for value in reduced]
+
+
 class YouthPolicyRAG:
     """청년정책 RAG 시스템 클래스"""
     
@@ -49,6 +60,11 @@ class YouthPolicyRAG:
         self.top_k = int(os.getenv('TOP_K', 5))
         self.similarity_threshold = float(os.getenv('SIMILARITY_THRESHOLD', 0.7))
         self.embedding_model = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-large')
+        # 벡터 검색 차원 (0: 원본 임베딩, 256/512/1024: 적재 시 저장한 축소 임베딩 컬럼)
+        self.search_dimensions = int(os.getenv('EMBEDDING_SEARCH_DIMENSIONS', 0))
+        # HNSW 검색 후보 수 (클수록 재현율 증가/지연 증가) / 임계값 필터 전 ANN 후보 배수
+        self.ef_search = int(os.getenv('HNSW_EF_SEARCH', 100))
+        self.candidate_factor = int(os.getenv('ANN_CANDIDATE_FACTOR', 4))
         
         logger.info("RAG 시스템 초기화 완료")
     
@@ -92,6 +108,14 @@ class YouthPolicyRAG:
             logger.error(f"임베딩 생성 실패: {e}")
             raise
     
+    def _search_target(self, query_embedding: List[float]):
+        """(거리 계산 대상 식, 벡터 타입, 질의 벡터) - HNSW 인덱스와 같은 식을 사용해야 인덱스 검색"""
+        if not self.search_dimensions or self.search_dimensions == EMBEDDING_DIMENSIONS:
+            vector_type = f"halfvec({EMBEDDING_DIMENSIONS})"
+            return f"pe.embedding::{vector_type}", vector_type, query_embedding
+        vector_type = f"halfvec({self.search_dimensions})"
+        return f"pe.embedding_{self.search_dimensions}", vector_type, reduce_embedding(query_embedding, self.search_dimensions)
+    
     def search_similar_policies(self, query_embedding: List[float], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         임베딩 유사도를 기반으로 관련 정책 검색
@@ -116,8 +140,19 @@ class YouthPolicyRAG:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
             logger.info("데이터베이스 연결 성공")
             
-            # pgvector의 코사인 유사도를 사용한 검색 쿼리 - policies 테이블의 모든 컬럼 조회
-            search_query = """
+            # HNSW 검색 후보 수 (이 연결에만 적용)
+            cursor.execute("SELECT set_config('hnsw.ef_search', %s, false)", (str(self.ef_search),))
+            
+            # pgvector의 코사인 거리를 사용한 검색 쿼리 - policies 테이블의 모든 컬럼 조회
+            # 거리는 ANN 후보 조회에서 한 번만 계산하고, 임계값 필터는 후보에 적용 (인덱스 정렬 유지)
+            vector_target, vector_type, search_embedding = self._search_target(query_embedding)
+            search_query = f"""
+            WITH nearest AS (
+                SELECT pe.plcy_no, {vector_target} <=> %(embedding)s::{vector_type} AS distance
+                FROM policy_embeddings pe
+                ORDER BY distance
+                LIMIT %(candidate_limit)s
+            )
             SELECT 
                 -- 기본 정책 정보
                 p.plcy_no,
@@ -165,24 +200,20 @@ class YouthPolicyRAG:
                 p.ref_url_addr2,
                 
                 -- 유사도 점수
-                (1 - (pe.embedding <=> %s::vector)) AS similarity_score
-            FROM policies p
-            JOIN policy_embeddings pe ON p.plcy_no = pe.plcy_no
-            WHERE (1 - (pe.embedding <=> %s::vector)) >= %s
-            ORDER BY pe.embedding <=> %s::vector
-            LIMIT %s;
+                (1 - n.distance) AS similarity_score
+            FROM nearest n
+            JOIN policies p ON p.plcy_no = n.plcy_no
+            WHERE (1 - n.distance) >= %(threshold)s
+            ORDER BY n.distance
+            LIMIT %(top_k)s;
             """
             
-            # 임베딩을 문자열로 변환
-            embedding_str = str(query_embedding)
-            
-            cursor.execute(search_query, (
-                embedding_str, 
-                embedding_str, 
-                self.similarity_threshold,
-                embedding_str,
-                top_k
-            ))
+            cursor.execute(search_query, {
+                "embedding": str(search_embedding),
+                "candidate_limit": top_k * self.candidate_factor,
+                "threshold": self.similarity_threshold,
+                "top_k": top_k
+            })
             
             results = cursor.fetchall()
             
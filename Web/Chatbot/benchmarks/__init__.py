@@ -0,0 +1,3 @@
+"""
+챗봇 성능 측정 스크립트 모음 (Web 디렉토리에서 python -m Chatbot.benchmarks.<모듈> 으로 실행)
+"""
@@ -0,0 +1,88 @@
+"""
+요청당 프롬프트/체인 구성 오버헤드 마이크로 벤치마크
+- before: 요청마다 ChatPromptTemplate.from_messages / bind / with_structured_output 으로 체인을 새로 구성 (기존 방식)
+- after: 프로세스당 한 번 구성한 체인 재사용
+LLM/DB 호출 없이 체인 구성 + 프롬프트 포맷팅 비용만 측정한다
+
+실행 (Web 디렉토리):
+    python -m Chatbot.benchmarks.chain_overhead [반복 횟수]
+"""
+import os
+import sys
+import time
+import statistics
+
+# 네트워크 호출은 하지 않으므로 임의의 키로 설정 로드
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from Chatbot import service  # noqa: E402
+from Chatbot.prompt_context import serialize_policies, ANSWER_FIELDS  # noqa: E402
+
+SAMPLE_ANALYSIS = service.QueryAnalysis(
+    lclsf_nm="주거",
+    mclsf_nm=None,
+    query_keywords="전세대출",
+    query_intent="맞춤 정책 검색",
+    classification_confidence=0.9,
+    reasoning="벤치마크",
+    age=27,
+    zip_cd="서울특별시",
+    extraction_confidence=0.9,
+)
+SAMPLE_ROWS = [
+    {"plcy_no": str(i), "plcy_nm": f"청년 전세자금 대출 {i}", "plcy_expln_cn": "청년 전세자금 이자 지원 " * 5, "lclsf_nm": "주거"}
+    for i in range(10)
+]
+SAMPLE_QUERY = "서울 사는 27살 전세대출 받을 수 있는 정책 알려줘"
+
+
+def request_setup():
+    """한 요청에서 LLM 호출 직전까지 수행하는 체인 구성 + 프롬프트 포맷팅"""
+    analysis_chain = service.build_query_analysis_chain()
+    analysis_chain.first.invoke({"query": SAMPLE_QUERY})
+    
+    search_data, _ = serialize_policies(SAMPLE_ROWS, ANSWER_FIELDS)
+    response_chain = service.build_single_call_chain()
+    response_chain.first.invoke({
+        "classification_type": SAMPLE_ANALYSIS.lclsf_nm,
+        "user_query": SAMPLE_QUERY,
+        "user_conditions": str(SAMPLE_ANALYSIS),
+        "search_data": search_data
+    })
+
+
+def rebuild_per_request():
+    """기존 방식: 캐시를 비워 매 요청마다 체인을 새로 구성"""
+    service.clear_chain_cache()
+    request_setup()
+
+
+def measure(func, iterations: int):
+    func()  # 워밍업
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(name: str, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:<24} mean {statistics.mean(samples):8.3f} ms   p50 {statistics.median(samples):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"요청당 체인 구성 오버헤드 ({iterations}회)")
+    before = measure(rebuild_per_request, iterations)
+    service.clear_chain_cache()
+    after = measure(request_setup, iterations)
+    report("before (요청마다 구성)", before)
+    report("after (구성 재사용)", after)
+    print(f"요청당 절감: {statistics.mean(before) - statistics.mean(after):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+벤치마크용 가짜 채팅 모델 (OpenAI 호출 없음)
+- 구조화 출력(with_structured_output)은 스키마별로 고정된 결과를 반환
+  - QueryAnalysis: 코퍼스에 기록된 질문별 분석 결과
+  - PolicySelection: 프롬프트의 검색 결과(TSV) 상위 정책
+  - SQLQueryGeneration: 조회수 순 정책 조회 쿼리
+- 일반 호출은 단일 호출 방식 형식('선정 정책: ...' + 답변)의 텍스트를 반환
+- 호출마다 latency만큼, 스트리밍 시 청크마다 chunk_latency만큼 대기
+"""
+import time
+import asyncio
+from typing import Any, Dict, Iterator, AsyncIterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from Chatbot.service import (
+    QueryAnalysis, PolicySelection, SelectedPolicy, SQLQueryGeneration, SELECTION_PREFIX,
+)
+
+# 코퍼스에 없는 질문의 분석 결과
+DEFAULT_ANALYSIS = {"lclsf_nm": "일반", "query_keywords": "청년 정책"}
+FALLBACK_SQL = "SELECT * FROM policies ORDER BY inq_cnt DESC NULLS LAST LIMIT 10"
+SELECTED_COUNT = 3
+ANSWER_BODY = "조건에 맞는 정책을 안내해 드립니다.\n\n" + "\n".join(
+    f"{i}. **정책 {i}** - 지원 내용과 신청 방법은 상세 페이지를 확인해 주세요." for i in range(1, SELECTED_COUNT + 1)
+)
+
+
+def build_query_analysis(query: str, fields: Optional[Dict[str, Any]] = None) -> QueryAnalysis:
+    """코퍼스 분석 결과 -> QueryAnalysis (신뢰도/근거는 고정값)"""
+    return QueryAnalysis(
+        classification_confidence=0.9,
+        extraction_confidence=0.9,
+        reasoning=f"벤치마크 코퍼스: {query}",
+        **(fields or DEFAULT_ANALYSIS),
+    )
+
+
+def _prompt_text(prompt) -> str:
+    messages = prompt.to_messages() if hasattr(prompt, "to_messages") else prompt
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.content) for message in messages)
+
+
+def _search_rows(text: str) -> List[Dict[str, str]]:
+    """프롬프트의 TSV 검색 결과(첫 줄 컬럼명이 plcy_no로 시작) -> 행 목록"""
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        if line.startswith("plcy_no\t"):
+            header = line.split("\t")
+            rows = []
+            for row_line in lines[i + 1:]:
+                cells = row_line.split("\t")
+                if len(cells) != len(header):
+                    break
+                rows.append(dict(zip(header, cells)))
+            return rows
+    return []
+
+
+class FakePipelineChatModel(BaseChatModel):
+    """챗봇 파이프라인 벤치마크용 가짜 모델 (지연 시간 설정 가능)"""
+    corpus: Dict[str, Dict[str, Any]] = {}  # 질문 -> QueryAnalysis 필드
+    latency: float = 0.0  # 호출당 대기(초)
+    chunk_latency: float = 0.0  # 스트리밍 청크당 대기(초)
+    chunk_size: int = 8  # 스트리밍 청크 글자 수
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-pipeline"
+
+    # 구조화 출력
+    def _structured(self, schema, prompt):
+        text = _prompt_text(prompt)
+        if schema is QueryAnalysis:
+            for query, fields in self.corpus.items():
+                if query in text:
+                    return build_query_analysis(query, fields)
+            return build_query_analysis(text[-50:])
+        if schema is PolicySelection:
+            rows = _search_rows(text)[:SELECTED_COUNT]
+            return PolicySelection(
+                selected_policies=[
+                    SelectedPolicy(
+                        plcy_no=row.get("plcy_no", ""),
+                        plcy_nm=row.get("plcy_nm", ""),
+                        plcy_expln_nm=row.get("plcy_expln_cn", ""),
+                        lclsf_nm=row.get("lclsf_nm", ""),
+                        mclsf_nm=row.get("mclsf_nm", ""),
+                        zip_cd=row.get("zip_cd", ""),
+                        inq_cnt=int(row.get("inq_cnt") or 0),
+                    )
+                    for row in rows
+                ],
+                selection_reasoning="벤치마크 고정 선정",
+            )
+        if schema is SQLQueryGeneration:
+            return SQLQueryGeneration(sql_query=FALLBACK_SQL, explanation="벤치마크 고정 쿼리", confidence=0.9)
+        raise ValueError(f"지원하지 않는 구조화 출력 스키마: {schema}")
+
+    def with_structured_output(self, schema, **kwargs):
+        def invoke(prompt):
+            time.sleep(self.latency)
+            return self._structured(schema, prompt)
+
+        async def ainvoke(prompt):
+            await asyncio.sleep(self.latency)
+            return self._structured(schema, prompt)
+
+        return RunnableLambda(invoke, afunc=ainvoke)
+
+    # 일반 호출 (단일 호출 방식 답변)
+    def _answer(self, messages: List[BaseMessage]) -> str:
+        plcy_nos = [row["plcy_no"] for row in _search_rows(_prompt_text(messages))[:SELECTED_COUNT]]
+        return f"{SELECTION_PREFIX} {', '.join(plcy_nos) or '없음'}\n{ANSWER_BODY}"
+
+    def _usage(self, messages: List[BaseMessage], text: str) -> Dict[str, int]:
+        # 글자 수 기준 추정치 (실제 토큰 수와 무관, 지표 수집 경로 확인용)
+        input_tokens = len(_prompt_text(messages)) // 2
+        output_tokens = len(text) // 2
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        text = self._answer(messages)
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+    def _chunks(self, messages: List[BaseMessage]) -> Iterator[ChatGenerationChunk]:
+        text = self._answer(messages)
+        for start in range(0, len(text), self.chunk_size):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[start:start + self.chunk_size]))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, text)))
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for chunk in self._chunks(messages):
+            time.sleep(self.chunk_latency)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(messages):
+            await asyncio.sleep(self.chunk_latency)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
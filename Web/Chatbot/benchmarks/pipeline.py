@@ -0,0 +1,172 @@
+"""
+챗봇 파이프라인 부하 벤치마크 (OpenAI 호출 없음, 로컬 PostgreSQL 사용)
+- corpus.jsonl의 질문을 graph로 재생하고 동시성 수준별 처리량과 노드별 p50/p95/p99 출력
+- LLM은 FakePipelineChatModel로 대체하고 지연 시간을 옵션으로 고정 -> 측정값 변화는 우리 코드(DB/그래프/직렬화)의 변화
+- 노드별 시간은 ChatMetricsCallback(운영 지표와 동일한 수집 경로)으로 측정
+- 질의 분석/답변 캐시와 질의 사전 분류는 기본 비활성화 (매 요청이 전체 파이프라인 실행, PRECLASSIFIER_ENABLED와 무관)
+
+실행 (Web 디렉토리, 먼저 python -m Chatbot.benchmarks.seed 로 로컬 DB 적재):
+    python -m Chatbot.benchmarks.pipeline --concurrency 1 4 16 --requests 200 --llm-latency-ms 50
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+# 네트워크 호출은 하지 않으므로 임의의 키로 설정 로드
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain_core.embeddings import DeterministicFakeEmbedding  # noqa: E402
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+from Chatbot import service  # noqa: E402
+from Chatbot.metrics import ChatMetricsCallback  # noqa: E402
+from Chatbot.retrieval import EMBEDDING_DIMENSIONS, RETRIEVAL_MODES  # noqa: E402
+from Chatbot.benchmarks.fake_llm import FakePipelineChatModel  # noqa: E402
+
+CORPUS_PATH = Path(__file__).with_name("corpus.jsonl")
+PERCENTILES = (50, 95, 99)
+
+
+def load_corpus(path: Path) -> Dict[str, Dict[str, Any]]:
+    """질문 -> QueryAnalysis 필드"""
+    corpus = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                corpus[record["query"]] = record["analysis"]
+    return corpus
+
+
+def configure(corpus: Dict[str, Dict[str, Any]], args):
+    """service 설정(get_config)의 LLM/캐시를 벤치마크용으로 교체"""
+    config = service.get_config()
+    latency = args.llm_latency_ms / 1000
+    config.thinking_model = FakePipelineChatModel(corpus=corpus, latency=latency)
+    config.chat_llm = FakePipelineChatModel(corpus=corpus, latency=latency, chunk_latency=args.chunk_latency_ms / 1000)
+    config.query_embeddings = DeterministicFakeEmbedding(size=256)
+    config.policy_embeddings = DeterministicFakeEmbedding(size=EMBEDDING_DIMENSIONS)
+    config.retrieval_mode = args.retrieval_mode
+    config.query_cache_enabled = args.with_cache
+    config.response_cache_enabled = args.with_cache
+    config.preclassifier_enabled = args.with_preclassifier
+    config.query_cache.clear()
+    config.response_cache.clear()
+    service.clear_chain_cache()
+
+
+def graph_input(query: str) -> Dict[str, Any]:
+    return {"messages": [HumanMessage(content=query)], "query": query}
+
+
+async def run_async(queries: List[str], concurrency: int) -> List[Dict[str, Any]]:
+    """ainvoke를 concurrency개 작업자로 실행 (ASGI 뷰와 같은 경로)"""
+    pending = list(queries)
+    results = []
+
+    async def worker():
+        while pending:
+            query = pending.pop()
+            metrics = ChatMetricsCallback()
+            await service.get_graph().ainvoke(graph_input(query), config={"callbacks": [metrics]})
+            results.append(metrics.as_dict())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def run_sync(queries: List[str], concurrency: int) -> List[Dict[str, Any]]:
+    """invoke를 concurrency개 스레드로 실행 (각 노드는 service.run_sync로 백그라운드 이벤트 루프에서 실행)"""
+    def run(query):
+        metrics = ChatMetricsCallback()
+        service.get_graph().invoke(graph_input(query), config={"callbacks": [metrics]})
+        return metrics.as_dict()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(run, queries))
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """nearest-rank 백분위수"""
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, List[float]]:
+    """단계별 처리 시간(ms) 목록 (DB 시간 포함)"""
+    samples: Dict[str, List[float]] = {}
+    for result in results:
+        for stage, duration in result["stages_ms"].items():
+            samples.setdefault(stage, []).append(duration)
+        samples.setdefault("db (합계)", []).append(result["db"]["time_ms"])
+    return {stage: sorted(values) for stage, values in samples.items()}
+
+
+def report(concurrency: int, elapsed: float, results: List[Dict[str, Any]]):
+    print(f"\n동시성 {concurrency}: {len(results)}건 / {elapsed:.2f}초 -> 처리량 {len(results) / elapsed:.1f} req/s")
+    print(f"  {'단계':<26}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES) + f"{'건수':>8}")
+    for stage, values in sorted(summarize(results).items(), key=lambda item: -item[1][-1]):
+        print(f"  {stage:<26}" + "".join(f"{percentile(values, p):>10.1f}" for p in PERCENTILES) + f"{len(values):>8}")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="챗봇 파이프라인 오프라인 벤치마크")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="동시성 수준 목록")
+    parser.add_argument("--requests", type=int, default=100, help="동시성 수준별 요청 수 (코퍼스를 반복)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="가짜 LLM 호출당 지연(ms)")
+    parser.add_argument("--chunk-latency-ms", type=float, default=0.0, help="가짜 LLM 스트리밍 청크당 지연(ms)")
+    parser.add_argument("--mode", choices=["async", "sync"], default="async", help="ainvoke(작업자) / invoke(스레드)")
+    parser.add_argument("--with-cache", action="store_true", help="질의 분석/답변 캐시 사용")
+    parser.add_argument("--with-preclassifier", action="store_true", help="질의 사전 분류 사용 (PRECLASSIFIER_MODEL_PATH 모델)")
+    parser.add_argument("--retrieval-mode", choices=RETRIEVAL_MODES, default="similarity", help="템플릿 검색 방식")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH, help="질문 코퍼스(jsonl)")
+    return parser.parse_args(argv)
+
+
+def batches(queries: List[str], args):
+    for concurrency in args.concurrency:
+        yield concurrency, [queries[i % len(queries)] for i in range(args.requests)]
+
+
+async def abenchmark(queries: List[str], args):
+    """비동기 모드 - 비동기 커넥션 풀이 이벤트 루프에 묶이므로 모든 동시성 수준을 한 루프에서 실행"""
+    await run_async(queries[:1], 1)  # 워밍업 (스키마 스냅샷, 커넥션 풀, 체인 구성)
+    for concurrency, batch in batches(queries, args):
+        started = time.perf_counter()
+        results = await run_async(batch, concurrency)
+        report(concurrency, time.perf_counter() - started, results)
+
+
+def benchmark(queries: List[str], args):
+    """동기 모드"""
+    run_sync(queries[:1], 1)  # 워밍업
+    for concurrency, batch in batches(queries, args):
+        started = time.perf_counter()
+        results = run_sync(batch, concurrency)
+        report(concurrency, time.perf_counter() - started, results)
+
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    logging.getLogger().setLevel(logging.WARNING)  # 요청별 INFO 로그가 측정을 왜곡하지 않도록
+
+    corpus = load_corpus(args.corpus)
+    queries = list(corpus)
+    configure(corpus, args)
+    print(f"코퍼스 {len(queries)}개 질문, LLM 지연 {args.llm_latency_ms}ms, 모드 {args.mode}, 검색 {args.retrieval_mode}, 캐시 {'사용' if args.with_cache else '미사용'}")
+
+    if args.mode == "async":
+        asyncio.run(abenchmark(queries, args))
+    else:
+        benchmark(queries, args)
+
+
+if __name__ == "__main__":
+    main()
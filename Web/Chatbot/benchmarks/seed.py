@@ -0,0 +1,71 @@
+"""
+벤치마크용 로컬 PostgreSQL 적재
+- 운영 DDL(aws_deploy/.../create_youth_policy_tables.sql)로 테이블을 만들고 (임베딩 테이블 제외)
+- 적재 스크립트(YouthPolicyDataInserter)로 전처리 완료 CSV를 적재 (임베딩 생성 없음)
+- 검색 쿼리의 similarity()를 위해 pg_trgm 확장 설치
+
+실행 (Web 디렉토리, DB_HOST/DB_NAME/DB_USER/DB_PASSWORD/DB_PORT로 로컬 DB 지정):
+    python -m Chatbot.benchmarks.seed [CSV 경로]
+"""
+import os
+import sys
+from pathlib import Path
+
+import psycopg2
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+DATA_PROCESSING_DIR = REPO_ROOT / "aws_deploy" / "lambda_functions" / "data_processing"
+DDL_PATH = DATA_PROCESSING_DIR / "create_youth_policy_tables.sql"
+DEFAULT_CSV_PATH = REPO_ROOT / "data" / "청년정책목록_전처리완료_2025-06-20.csv"
+
+# 벤치마크에서 사용하지 않는 pgvector 관련 구문 (로컬 DB에 확장이 없을 수 있음)
+SKIPPED_DDL_MARKERS = ("vector", "policy_embeddings")
+
+
+def db_config():
+    """Chatbot.service Config와 같은 환경변수 사용"""
+    return {
+        'host': os.getenv("DB_HOST", 'localhost'),
+        'database': os.getenv("DB_NAME", 'youth_policy'),
+        'user': os.getenv("DB_USER", 'postgres'),
+        'password': os.getenv("DB_PASSWORD", 'your_password'),
+        'port': os.getenv("DB_PORT", 5432)
+    }
+
+
+def ddl_statements():
+    """운영 DDL을 구문 단위로 분리 (주석 줄 제거, pgvector 관련 구문 제외)"""
+    lines = [line for line in DDL_PATH.read_text(encoding="utf-8").splitlines() if not line.strip().startswith("--")]
+    for statement in "\n".join(lines).split(";"):
+        statement = statement.strip()
+        if statement and not any(marker in statement for marker in SKIPPED_DDL_MARKERS):
+            yield statement
+
+
+def create_tables(config):
+    """policies 테이블이 없을 때만 DDL 실행"""
+    with psycopg2.connect(**config) as conn, conn.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute("SELECT to_regclass('policies')")
+        if cursor.fetchone()[0] is not None:
+            print("policies 테이블이 이미 있어 DDL 생략")
+            return
+        for statement in ddl_statements():
+            cursor.execute(statement)
+        print("벤치마크 테이블 생성 완료")
+
+
+def main():
+    csv_path = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CSV_PATH
+    config = db_config()
+    create_tables(config)
+
+    # 적재 스크립트 재사용 (새로운/수정된 정책만 upsert, 데이터 버전 증가)
+    sys.path.insert(0, str(DATA_PROCESSING_DIR))
+    from insert_data_in_postgres import YouthPolicyDataInserter
+
+    YouthPolicyDataInserter(config).insert_all_data(str(csv_path), include_embeddings=False)
+
+
+if __name__ == "__main__":
+    main()
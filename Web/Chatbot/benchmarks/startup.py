@@ -0,0 +1,108 @@
+"""
+챗봇 서비스 시작 비용 벤치마크 (OpenAI 호출 없음)
+- 새 프로세스마다 단계별 누적 시간 측정: import Chatbot.service -> get_config() -> get_graph()
+- import 단계가 manage.py 명령/마이그레이션/워커 부팅이 매번 내는 비용
+  (설정/그래프는 첫 챗봇 요청에서 생성되며, DB가 없어도 import는 실패하지 않음)
+- --importtime: python -X importtime으로 import Chatbot.service의 패키지별 누적 시간 출력
+  - 요청 처리 시점에만 필요한 모듈(LAZY_MODULES)이 import되었거나 --max-import-ms를 넘으면 종료 코드 1
+
+실행 (Web 디렉토리):
+    python -m Chatbot.benchmarks.startup --repeat 5
+    python -m Chatbot.benchmarks.startup --importtime --max-import-ms 2000
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+# 측정 대상 프로세스에서 실행할 코드 (단계별 경과 시간(ms)을 JSON으로 출력)
+PROBE = """
+import json, os, time
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+started = time.perf_counter()
+timings = {}
+from Chatbot import service
+timings["import"] = (time.perf_counter() - started) * 1000
+service.get_config()
+timings["get_config"] = (time.perf_counter() - started) * 1000
+service.get_graph()
+timings["get_graph"] = (time.perf_counter() - started) * 1000
+print(json.dumps(timings))
+"""
+STAGES = ("import", "get_config", "get_graph")
+
+# 웹 워커 부팅 시 import되면 안 되는 모듈 (첫 요청/해당 경로에서만 import)
+# - openai, langchain_openai: 설정 생성 시 (get_config)
+# - sqlglot: LLM 생성 쿼리 검사 시 (sql_guard)
+# - sqlalchemy, langchain_community: 챗봇에서 사용하지 않음
+LAZY_MODULES = ("openai", "langchain_openai", "sqlglot", "sqlalchemy", "langchain_community")
+
+
+def _env() -> Dict[str, str]:
+    return {**os.environ, "PYTHONPATH": os.getcwd(), "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "sk-benchmark")}
+
+
+def probe() -> dict:
+    """새 인터프리터에서 단계별 누적 시간 측정 (모듈 캐시 영향 없음)"""
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], capture_output=True, text=True, check=True, env=_env(),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def importtime() -> List[Tuple[str, int, float]]:
+    """python -X importtime 결과 -> (모듈, 들여쓰기 깊이, 누적 시간 ms) 목록"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import Chatbot.service"],
+        capture_output=True, text=True, check=True, env=_env(),
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), depth, int(cumulative) / 1000))
+    return modules
+
+
+def report_importtime(max_import_ms: float, top: int) -> bool:
+    """패키지별 누적 import 시간 출력, 기준 통과 여부 반환"""
+    modules = importtime()
+    total = next(ms for name, depth, ms in modules if name == "Chatbot.service")
+    print(f"import Chatbot.service: {total:.1f}ms (기준 {max_import_ms:.0f}ms)")
+    direct = sorted((entry for entry in modules if entry[1] == 1), key=lambda entry: -entry[2])
+    for name, _, ms in direct[:top]:
+        print(f"  {name:<40}{ms:>10.1f}")
+
+    loaded = sorted({name.split(".")[0] for name, _, _ in modules} & set(LAZY_MODULES))
+    if loaded:
+        print(f"지연 import 대상 모듈이 import됨: {', '.join(loaded)}")
+    return not loaded and total <= max_import_ms
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="챗봇 서비스 시작 비용 벤치마크")
+    parser.add_argument("--repeat", type=int, default=5, help="측정할 새 프로세스 수")
+    parser.add_argument("--importtime", action="store_true", help="python -X importtime 패키지별 결과와 기준 검사")
+    parser.add_argument("--max-import-ms", type=float, default=2000, help="import Chatbot.service 허용 시간(ms)")
+    parser.add_argument("--top", type=int, default=10, help="출력할 패키지 수")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    if args.importtime:
+        sys.exit(0 if report_importtime(args.max_import_ms, args.top) else 1)
+
+    samples = [probe() for _ in range(args.repeat)]
+    print(f"새 프로세스 {args.repeat}회 (누적 시간 중앙값, ms)")
+    for stage in STAGES:
+        print(f"  {stage:<12}{statistics.median(sample[stage] for sample in samples):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
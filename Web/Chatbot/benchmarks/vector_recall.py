@@ -0,0 +1,118 @@
+"""
+벡터 검색 재현율/지연 벤치마크 (OpenAI 호출 없음, 임베딩이 적재된 PostgreSQL 사용)
+- policy_embeddings의 정책 임베딩을 질의로 사용 (자기 자신은 결과에서 제외)
+- 정답: 원본 임베딩(vector 3072) 전체 탐색 (인덱스 사용 금지)
+- 비교: HNSW(halfvec 3072 식 인덱스) / 축소 임베딩 컬럼(embedding_256/512/1024) x ef_search
+- 설정별 recall@k와 질의 지연 p50/p95 출력
+
+실행 (Web 디렉토리, 적재 스크립트로 임베딩과 축소 임베딩 컬럼을 먼저 생성):
+    python -m Chatbot.benchmarks.vector_recall --queries 100 --k 10 --ef-search 40 100 200
+"""
+import sys
+import time
+import argparse
+from typing import Dict, List, Tuple
+
+import psycopg2
+
+from Chatbot.retrieval import REDUCED_EMBEDDING_DIMENSIONS, embedding_search_target
+from Chatbot.benchmarks.pipeline import percentile
+from Chatbot.benchmarks.seed import db_config
+
+EXACT_QUERY = """
+SELECT pe.plcy_no FROM policy_embeddings pe
+WHERE pe.plcy_no <> %(plcy_no)s
+ORDER BY pe.embedding <=> (SELECT embedding FROM policy_embeddings WHERE plcy_no = %(plcy_no)s)
+LIMIT %(k)s
+"""
+
+
+def ann_query(dimensions: int) -> str:
+    """챗봇 하이브리드 검색과 같은 거리 식 (질의 벡터도 같은 방식으로 축소)"""
+    target, vector_type = embedding_search_target(dimensions)
+    source = target.replace("pe.", "q.")
+    return f"""
+    SELECT pe.plcy_no FROM policy_embeddings pe
+    WHERE pe.plcy_no <> %(plcy_no)s
+    ORDER BY {target} <=> (SELECT {source} FROM policy_embeddings q WHERE q.plcy_no = %(plcy_no)s)::{vector_type}
+    LIMIT %(k)s
+    """
+
+
+def sample_queries(cursor, count: int) -> List[str]:
+    cursor.execute("SELECT plcy_no FROM policy_embeddings ORDER BY md5(plcy_no) LIMIT %s", (count,))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def available_dimensions(cursor, requested: List[int]) -> List[int]:
+    """적재 시 생성된 축소 임베딩 컬럼만 비교 대상"""
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = 'policy_embeddings'"
+    )
+    columns = {row[0] for row in cursor.fetchall()}
+    return [dimensions for dimensions in requested if f"embedding_{dimensions}" in columns]
+
+
+def ground_truth(conn, plcy_nos: List[str], k: int) -> Dict[str, set]:
+    """원본 임베딩 전체 탐색 결과 (인덱스 검색 비활성화)"""
+    truth = {}
+    with conn.cursor() as cursor:
+        cursor.execute("SET LOCAL enable_indexscan = off")
+        for plcy_no in plcy_nos:
+            cursor.execute(EXACT_QUERY, {"plcy_no": plcy_no, "k": k})
+            truth[plcy_no] = {row[0] for row in cursor.fetchall()}
+    conn.rollback()
+    return truth
+
+
+def measure(conn, sql: str, plcy_nos: List[str], k: int, ef_search: int, truth: Dict[str, set]) -> Tuple[float, List[float]]:
+    """(평균 recall@k, 정렬된 질의 지연 ms 목록)"""
+    recalls, latencies = [], []
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(ef_search),))
+        for plcy_no in plcy_nos:
+            started = time.perf_counter()
+            cursor.execute(sql, {"plcy_no": plcy_no, "k": k})
+            found = {row[0] for row in cursor.fetchall()}
+            latencies.append((time.perf_counter() - started) * 1000)
+            expected = truth[plcy_no]
+            recalls.append(len(found & expected) / len(expected) if expected else 1.0)
+    conn.rollback()
+    return sum(recalls) / len(recalls), sorted(latencies)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="벡터 검색 재현율/지연 벤치마크")
+    parser.add_argument("--queries", type=int, default=100, help="질의로 사용할 정책 수")
+    parser.add_argument("--k", type=int, default=10, help="recall@k의 k")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[40, 100, 200], help="hnsw.ef_search 목록")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=list(REDUCED_EMBEDDING_DIMENSIONS), help="비교할 축소 차원 목록")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv if argv is not None else sys.argv[1:])
+    conn = psycopg2.connect(**db_config())
+    try:
+        with conn.cursor() as cursor:
+            plcy_nos = sample_queries(cursor, args.queries)
+            dimensions = available_dimensions(cursor, args.dimensions)
+        conn.rollback()
+        if not plcy_nos:
+            print("policy_embeddings가 비어 있습니다 (임베딩 적재 후 실행)")
+            return
+
+        truth = ground_truth(conn, plcy_nos, args.k)
+        print(f"질의 {len(plcy_nos)}개, recall@{args.k} (정답: 원본 임베딩 전체 탐색)")
+        print(f"  {'검색 대상':<24}{'ef_search':>10}{'recall':>10}{'p50(ms)':>10}{'p95(ms)':>10}")
+        for dimension in [0] + dimensions:
+            label = embedding_search_target(dimension)[0]
+            for ef_search in args.ef_search:
+                recall, latencies = measure(conn, ann_query(dimension), plcy_nos, args.k, ef_search, truth)
+                print(f"  {label:<24}{ef_search:>10}{recall:>10.3f}{percentile(latencies, 50):>10.2f}{percentile(latencies, 95):>10.2f}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+챗봇 그래프 노드에서 공유하는 PostgreSQL 커넥션 풀
+요청마다 psycopg2.connect()로 연결을 새로 맺지 않고, 제한된 수의 연결을 재사용한다
+- PolicyDBPool: 동기 코드용 (psycopg2, 스키마 스냅샷 조회 등)
+- AsyncPolicyDBPool: 그래프 노드용 (psycopg 3, 이벤트 루프마다 풀 하나)
+"""
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Any, Optional
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+
+def session_options(statement_timeout_ms: int, session_settings: Optional[Dict[str, Any]] = None) -> str:
+    """연결 시작 시 적용할 서버 설정 (libpq options 형식)"""
+    settings = {"statement_timeout": statement_timeout_ms, **(session_settings or {})}
+    return " ".join(f"-c {name}={value}" for name, value in settings.items())
+
+
+class PolicyDBPool:
+    """
+    ThreadedConnectionPool 래퍼
+    - 최대 연결 수 제한 (초과 요청은 acquire_timeout 동안 대기)
+    - 일정 시간 사용되지 않은 연결은 꺼내기 전에 헬스체크
+    - 연결 단위 statement_timeout (+ session_settings, 예: hnsw.ef_search) 적용
+    - 풀 사용 지표 수집
+    """
+    def __init__(self, db_config: Dict[str, Any], minconn: int = 1, maxconn: int = 10,
+                 statement_timeout_ms: int = 5000, acquire_timeout: float = 10.0,
+                 health_check_interval: float = 30.0, session_settings: Optional[Dict[str, Any]] = None):
+        self.db_config = db_config
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.statement_timeout_ms = statement_timeout_ms
+        self.session_settings = session_settings or {}
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+
+        self._pool = None  # 첫 사용 시 생성
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}  # id(conn) -> 마지막 반납 시각
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,  # 연결 대여 횟수
+            "in_use": 0,  # 현재 대여 중인 연결 수
+            "max_in_use": 0,  # 최대 동시 대여 수
+            "wait_seconds_total": 0.0,  # 연결 대기 누적 시간
+            "acquire_timeouts": 0,  # 대기 시간 초과 횟수
+            "health_checks": 0,  # 헬스체크 수행 횟수
+            "discarded": 0,  # 끊어져서 폐기된 연결 수
+            "errors": 0,  # 대여 중 발생한 오류 수
+        }
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        """풀 생성 (최초 1회)"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadedConnectionPool(
+                        self.minconn,
+                        self.maxconn,
+                        host=self.db_config['host'],
+                        database=self.db_config['database'],
+                        user=self.db_config['user'],
+                        password=self.db_config['password'],
+                        port=self.db_config['port'],
+                        connect_timeout=5,
+                        keepalives=1,
+                        keepalives_idle=60,
+                        application_name="youth_policy_chatbot",
+                        options=session_options(self.statement_timeout_ms, self.session_settings)
+                    )
+                    logger.info(f"PostgreSQL 커넥션 풀 생성 완료 (min={self.minconn}, max={self.maxconn})")
+        return self._pool
+
+    def _incr(self, key: str, value=1):
+        with self._stats_lock:
+            self._stats[key] += value
+
+    def _is_healthy(self, conn) -> bool:
+        """SELECT 1 로 연결 상태 확인"""
+        self._incr("health_checks")
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self, pool: ThreadedConnectionPool):
+        """풀에서 연결을 꺼내고, 오래 쉬었던 연결은 헬스체크 후 반환"""
+        conn = pool.getconn()
+        idle_since = self._last_used.get(id(conn))
+        needs_check = idle_since is None or time.monotonic() - idle_since > self.health_check_interval
+
+        if conn.closed or (needs_check and not self._is_healthy(conn)):
+            logger.warning("끊어진 DB 연결 폐기 후 재연결")
+            self._discard(pool, conn)
+            conn = pool.getconn()
+        return conn
+
+    def _discard(self, pool: ThreadedConnectionPool, conn):
+        self._incr("discarded")
+        self._last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+
+    @contextmanager
+    def connection(self):
+        """
+        풀에서 연결을 빌려 사용 후 반납
+        - 블록 종료 시 열린 트랜잭션은 롤백되므로 조회 전용으로 사용
+        """
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            self._incr("acquire_timeouts")
+            raise PoolError(f"DB 연결 대기 시간 초과 ({self.acquire_timeout}초)")
+
+        pool = None
+        conn = None
+        try:
+            pool = self._get_pool()
+            conn = self._checkout(pool)
+            with self._stats_lock:
+                self._stats["checkouts"] += 1
+                self._stats["wait_seconds_total"] += time.monotonic() - started
+                self._stats["in_use"] += 1
+                self._stats["max_in_use"] = max(self._stats["max_in_use"], self._stats["in_use"])
+
+            yield conn
+
+            conn.rollback()
+            self._release(pool, conn)
+        except Exception as e:
+            self._incr("errors")
+            if conn is not None:
+                if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)) or conn.closed:
+                    self._discard(pool, conn)
+                else:
+                    try:
+                        conn.rollback()
+                        self._release(pool, conn)
+                    except psycopg2.Error:
+                        self._discard(pool, conn)
+            raise
+        finally:
+            if conn is not None:
+                self._incr("in_use", -1)
+            self._slots.release()
+
+    def _release(self, pool: ThreadedConnectionPool, conn):
+        self._last_used[id(conn)] = time.monotonic()
+        pool.putconn(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """풀 사용 지표 스냅샷"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["max_size"] = self.maxconn
+        stats["avg_wait_ms"] = (stats["wait_seconds_total"] / stats["checkouts"] * 1000) if stats["checkouts"] else 0.0
+        return stats
+
+    def close(self):
+        """풀의 모든 연결 종료"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._last_used.clear()
+                logger.info("PostgreSQL 커넥션 풀 종료")
+
+
+class AsyncPolicyDBPool:
+    """
+    psycopg 3 AsyncConnectionPool 래퍼 (PolicyDBPool과 동일한 설정/지표)
+    - 연결 대기 중에 이벤트 루프를 막지 않으므로 워커 스레드 없이 동시 요청 처리 가능
+    - 행은 dict로 반환 (RealDictCursor와 동일)
+    - AsyncConnectionPool은 생성한 이벤트 루프에서만 쓸 수 있으므로 실행 중인 루프마다 풀을 따로 둔다
+      (ASGI 서버는 루프가 하나라 풀도 하나, 루프가 사라지면 해당 풀도 목록에서 제거)
+    """
+    def __init__(self, db_config: Dict[str, Any], minconn: int = 1, maxconn: int = 10,
+                 statement_timeout_ms: int = 5000, acquire_timeout: float = 10.0,
+                 health_check_interval: float = 30.0, session_settings: Optional[Dict[str, Any]] = None):
+        self.db_config = db_config
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.statement_timeout_ms = statement_timeout_ms
+        self.session_settings = session_settings or {}
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+
+        self._pools = weakref.WeakKeyDictionary()  # 이벤트 루프 -> 열린 풀 (open()이 끝난 뒤에만 등록)
+        self._open_locks = weakref.WeakKeyDictionary()  # 이벤트 루프 -> 풀 생성 잠금
+        self._last_used = {}  # id(conn) -> 마지막 반납 시각
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "in_use": 0,
+            "max_in_use": 0,
+            "wait_seconds_total": 0.0,
+            "acquire_timeouts": 0,
+            "health_checks": 0,
+            "errors": 0,
+        }
+
+    def _connect_kwargs(self) -> Dict[str, Any]:
+        return {
+            "host": self.db_config['host'],
+            "dbname": self.db_config['database'],
+            "user": self.db_config['user'],
+            "password": self.db_config['password'],
+            "port": self.db_config['port'],
+            "connect_timeout": 5,
+            "keepalives": 1,
+            "keepalives_idle": 60,
+            "application_name": "youth_policy_chatbot",
+            "options": session_options(self.statement_timeout_ms, self.session_settings),
+            "row_factory": dict_row,
+        }
+
+    def _incr(self, key: str, value=1):
+        with self._stats_lock:
+            self._stats[key] += value
+
+    async def _check(self, conn):
+        """오래 쉬었던 연결만 헬스체크 (끊어진 연결이면 예외 -> 풀이 폐기 후 재연결)"""
+        idle_since = self._last_used.get(id(conn))
+        if idle_since is None or time.monotonic() - idle_since > self.health_check_interval:
+            self._incr("health_checks")
+            await AsyncConnectionPool.check_connection(conn)
+
+    async def _get_pool(self) -> AsyncConnectionPool:
+        """
+        현재 이벤트 루프의 풀 반환 (루프마다 최초 1회 생성)
+        - 동시에 처음 호출한 코루틴은 잠금에서 기다렸다가 같은 풀 사용
+        - 풀은 open()이 끝난 뒤에 등록하므로 열리지 않은 풀을 받는 코루틴이 없음
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(loop)
+        if pool is not None:
+            return pool
+
+        # 같은 루프의 코루틴은 await 전에는 전환되지 않으므로 잠금 생성 자체는 경쟁하지 않음
+        async with self._open_locks.setdefault(loop, asyncio.Lock()):
+            pool = self._pools.get(loop)
+            if pool is None:
+                pool = AsyncConnectionPool(
+                    min_size=self.minconn,
+                    max_size=self.maxconn,
+                    kwargs=self._connect_kwargs(),
+                    check=self._check,
+                    timeout=self.acquire_timeout,
+                    name="youth_policy_chatbot",
+                    open=False,
+                )
+                await pool.open()
+                self._pools[loop] = pool
+                logger.info(f"PostgreSQL 비동기 커넥션 풀 생성 완료 (min={self.minconn}, max={self.maxconn})")
+        return pool
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        풀에서 연결을 빌려 사용 후 반납
+        - 블록 종료 시 열린 트랜잭션은 롤백되므로 조회 전용으로 사용
+        """
+        pool = await self._get_pool()
+        started = time.monotonic()
+        try:
+            async with pool.connection() as conn:
+                with self._stats_lock:
+                    self._stats["checkouts"] += 1
+                    self._stats["wait_seconds_total"] += time.monotonic() - started
+                    self._stats["in_use"] += 1
+                    self._stats["max_in_use"] = max(self._stats["max_in_use"], self._stats["in_use"])
+                try:
+                    yield conn
+                    await conn.rollback()
+                finally:
+                    self._incr("in_use", -1)
+                    self._last_used[id(conn)] = time.monotonic()
+        except PoolTimeout as e:
+            self._incr("acquire_timeouts")
+            raise PoolError(f"DB 연결 대기 시간 초과 ({self.acquire_timeout}초)") from e
+        except Exception:
+            self._incr("errors")
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """풀 사용 지표 스냅샷 (모든 이벤트 루프 풀의 합계)"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["pools"] = len(self._pools)
+        stats["max_size"] = self.maxconn
+        stats["avg_wait_ms"] = (stats["wait_seconds_total"] / stats["checkouts"] * 1000) if stats["checkouts"] else 0.0
+        return stats
+
+    async def close(self):
+        """현재 이벤트 루프 풀의 모든 연결 종료"""
+        pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.close()
+            logger.info("PostgreSQL 비동기 커넥션 풀 종료")
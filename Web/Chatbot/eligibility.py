@@ -0,0 +1,171 @@
+"""
+정책 자격 조건 비트맵 엔진 (프로세스 내 사전 필터)
+policies의 조건 컬럼을 열 단위 배열로 적재하고 조건 값마다 비트맵(np.packbits)을 만들어
+"사용자가 대상인 정책"을 DB 조회 없이 비트 AND/OR 연산으로 계산한다
+- 조건 규칙은 retrieval._build_filters / _matches_condition과 동일 (나이, 결혼, 취업, 학력, 전공, 지역 계통, 대분류)
+- 정책 데이터 버전(policy_data_version)이 바뀌면 updated_at 이후 변경된 정책만 다시 조회해 비트맵 재구성
+"""
+import logging
+import threading
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .retrieval import GENERAL_CATEGORIES, MULTI_VALUE_CONDITIONS, NO_RESTRICTION, codes_column, region_lineage
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE = 120  # 나이 비트맵 범위 (0 ~ MAX_AGE, 범위 밖 나이는 경계값으로 계산)
+UNRESTRICTED_MARRIAGE = (NO_RESTRICTION, "", None)
+
+ELIGIBILITY_COLUMNS = (
+    "plcy_no, lclsf_nm, sprt_trgt_min_age, sprt_trgt_max_age, mrg_stts_cd,"
+    " plcy_major_cds, job_cds, school_cds, zip_cds, updated_at"
+)
+ELIGIBILITY_QUERY = f"SELECT {ELIGIBILITY_COLUMNS} FROM policies"
+# 적재 트랜잭션 시작 시각이 updated_at이 되므로, 먼저 시작해 늦게 커밋된 행을 놓치지 않도록 겹쳐서 조회
+ELIGIBILITY_REFRESH_OVERLAP = timedelta(hours=1)
+ELIGIBILITY_REFRESH_QUERY = f"{ELIGIBILITY_QUERY} WHERE updated_at >= %(since)s"
+
+
+class EligibilityIndex:
+    """
+    조건 값별 정책 비트맵 (생성 후 변경하지 않음 - 갱신은 새 인덱스로 교체)
+    - 비트맵 i번째 비트 = plcy_nos[i] 정책이 해당 조건 값에서 대상인지
+    """
+    def __init__(self, rows: Iterable[Dict[str, Any]], version: Optional[int] = None):
+        self.rows: Dict[str, Dict[str, Any]] = {row["plcy_no"]: row for row in rows}
+        self.version = version
+        self.plcy_nos = np.array(list(self.rows), dtype=object)
+        self.size = len(self.plcy_nos)
+        self.updated_at = max((row["updated_at"] for row in self.rows.values() if row.get("updated_at")), default=None)
+
+        records = list(self.rows.values())
+        self._empty = self._pack([])
+        self._age = self._build_age_bitmaps(records)
+        self._marriage, self._marriage_unrestricted = self._build_marriage_bitmaps(records)
+        self._codes: Dict[str, Dict[str, np.ndarray]] = {
+            column: self._build_value_bitmaps(records, lambda row, column=column: row.get(codes_column(column)) or ())
+            for column in MULTI_VALUE_CONDITIONS
+        }
+        self._regions = self._build_value_bitmaps(records, lambda row: row.get("zip_cds") or ())
+        self._categories = self._build_value_bitmaps(records, lambda row: (row.get("lclsf_nm"),))
+
+    # 비트맵 구성
+    def _pack(self, positions: List[int]) -> np.ndarray:
+        bits = np.zeros(self.size, dtype=bool)
+        bits[positions] = True
+        return np.packbits(bits)
+
+    def _build_age_bitmaps(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """나이(0 ~ MAX_AGE)별 대상 정책 비트맵 - 최소/최대 연령이 0(또는 NULL)이면 제한 없음"""
+        min_age = np.array([row.get("sprt_trgt_min_age") or 0 for row in records], dtype=np.int16)
+        max_age = np.array([row.get("sprt_trgt_max_age") or 0 for row in records], dtype=np.int16)
+        ages = np.arange(MAX_AGE + 1, dtype=np.int16)[:, None]
+        eligible = (min_age <= ages) & ((max_age == 0) | (max_age >= ages))
+        return np.packbits(eligible, axis=1)
+
+    def _build_marriage_bitmaps(self, records: List[Dict[str, Any]]):
+        """결혼 상태 값별 비트맵 + 제한 없음('제한없음', 빈 값) 비트맵"""
+        positions: Dict[str, List[int]] = {}
+        unrestricted = []
+        for i, row in enumerate(records):
+            value = row.get("mrg_stts_cd")
+            if value in UNRESTRICTED_MARRIAGE:
+                unrestricted.append(i)
+            else:
+                positions.setdefault(value, []).append(i)
+        return {value: self._pack(indexes) for value, indexes in positions.items()}, self._pack(unrestricted)
+
+    def _build_value_bitmaps(self, records: List[Dict[str, Any]], values_of) -> Dict[str, np.ndarray]:
+        """값 -> 그 값을 가진 정책 비트맵 (한 정책이 여러 값을 가질 수 있음)"""
+        positions: Dict[str, List[int]] = {}
+        for i, row in enumerate(records):
+            for value in values_of(row):
+                positions.setdefault(value, []).append(i)
+        return {value: self._pack(indexes) for value, indexes in positions.items()}
+
+    # 조건 계산
+    def _any_of(self, bitmaps: Dict[str, np.ndarray], values: Iterable[str]) -> np.ndarray:
+        mask = self._empty
+        for value in values:
+            mask = mask | bitmaps.get(value, self._empty)
+        return mask
+
+    def eligible_mask(self, query_analysis) -> np.ndarray:
+        """사용자 조건 -> 대상 정책 비트맵"""
+        categories = GENERAL_CATEGORIES if query_analysis.lclsf_nm == "일반" else (query_analysis.lclsf_nm,)
+        mask = self._any_of(self._categories, categories)
+
+        if query_analysis.age is not None:
+            mask = mask & self._age[min(max(query_analysis.age, 0), MAX_AGE)]
+        if query_analysis.mrg_stts_cd:
+            mask = mask & (self._marriage.get(query_analysis.mrg_stts_cd, self._empty) | self._marriage_unrestricted)
+        for column in MULTI_VALUE_CONDITIONS:
+            value = getattr(query_analysis, column, None)
+            if value:
+                mask = mask & self._any_of(self._codes[column], (value, NO_RESTRICTION))
+        if query_analysis.zip_cd:
+            mask = mask & self._any_of(self._regions, region_lineage(query_analysis.zip_cd))
+        return mask
+
+    def eligible(self, query_analysis) -> List[str]:
+        """사용자 조건 -> 대상 정책 번호 목록"""
+        bits = np.unpackbits(self.eligible_mask(query_analysis), count=self.size).astype(bool)
+        return self.plcy_nos[bits].tolist()
+
+    def count(self, query_analysis) -> int:
+        return int(np.unpackbits(self.eligible_mask(query_analysis), count=self.size).sum())
+
+    def refreshed(self, changed_rows: Iterable[Dict[str, Any]], version: Optional[int]) -> "EligibilityIndex":
+        """변경된 정책 행을 반영한 새 인덱스 (적재 작업은 upsert만 하므로 삭제는 없음)"""
+        return EligibilityIndex({**self.rows, **{row["plcy_no"]: row for row in changed_rows}}.values(), version)
+
+
+class EligibilityEngine:
+    """
+    프로세스 전역 비트맵 인덱스 보관 (조회는 잠금 없이 현재 인덱스 사용, 갱신 시 교체)
+    - 처음 사용할 때 전체 적재, 이후 정책 데이터 버전이 바뀌면 변경분만 조회
+    """
+    def __init__(self):
+        self._index: Optional[EligibilityIndex] = None
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()  # 동시에 한 요청만 DB에서 갱신
+
+    @property
+    def index(self) -> Optional[EligibilityIndex]:
+        return self._index
+
+    def needs_refresh(self, version: Optional[int]) -> bool:
+        index = self._index
+        return index is None or (version is not None and index.version != version)
+
+    def begin_refresh(self) -> bool:
+        """갱신 시작 (다른 요청이 갱신 중이면 False - 기다리지 않음)"""
+        return self._refreshing.acquire(blocking=False)
+
+    def end_refresh(self):
+        self._refreshing.release()
+
+    def refresh_query(self):
+        """다음 갱신에 사용할 (SQL, 파라미터) - 적재된 인덱스가 없으면 전체 조회"""
+        index = self._index
+        if index is None or index.updated_at is None:
+            return ELIGIBILITY_QUERY, None
+        return ELIGIBILITY_REFRESH_QUERY, {"since": index.updated_at - ELIGIBILITY_REFRESH_OVERLAP}
+
+    def apply(self, rows: List[Dict[str, Any]], version: Optional[int], full: bool) -> EligibilityIndex:
+        """조회한 행으로 인덱스 교체"""
+        with self._lock:
+            if full or self._index is None:
+                index = EligibilityIndex(rows, version)
+            else:
+                index = self._index.refreshed(rows, version)
+            self._index = index
+        logger.info(f"자격 조건 비트맵 {'적재' if full else '갱신'}: 정책 {index.size}개 (변경 {len(rows)}개, 데이터 버전 {version})")
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._index = None
@@ -0,0 +1,94 @@
+"""
+질의 사전 분류기 최근접 중심 모델 학습
+- 학습 데이터: 챗봇 메시지에 기록된 LLM 질의 분석 결과(Message.query_analysis)의 대분류 + 직전 사용자 질문
+  (사전 분류기가 만든 분석 결과, 이전 턴 정책에 대한 정책 상세 설명 후속 질문은 제외)
+- --corpus: 질문/분석 jsonl(benchmarks/corpus.jsonl 형식)을 학습 데이터에 추가
+- 학습 후 학습 데이터 기준 사전 분류 결과(거부/라우팅/LLM 분석 비율, 대분류 일치율, 분류 지연) 출력
+
+실행 (Web 디렉토리, 서버 재시작 후 적용):
+    python manage.py train_preclassifier --corpus Chatbot/benchmarks/corpus.jsonl
+"""
+import json
+import time
+from typing import Iterable, List, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Chatbot.models import Message
+from Chatbot.preclassifier import DEFAULT_MODEL_PATH, REASONING_PREFIX, REJECT_LABELS, CentroidModel, PreClassifier
+
+
+def logged_samples() -> Iterable[Tuple[str, str]]:
+    """(사용자 질문, LLM이 분류한 대분류) - 세션별로 챗봇 메시지와 직전 사용자 메시지를 짝지음"""
+    last_user = {}
+    messages = Message.objects.order_by("session_id", "msg_id").values_list("session_id", "sender", "content", "query_analysis")
+    for session_id, sender, content, analysis in messages.iterator():
+        if sender == "user":
+            last_user[session_id] = content
+            continue
+        query = last_user.pop(session_id, None)
+        if not query or not analysis or not analysis.get("lclsf_nm"):
+            continue
+        if (analysis.get("reasoning") or "").startswith(REASONING_PREFIX) or analysis.get("query_intent") == "정책 상세 설명":
+            continue
+        yield query, analysis["lclsf_nm"]
+
+
+def corpus_samples(path: str) -> Iterable[Tuple[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record["query"], record["analysis"]["lclsf_nm"]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """nearest-rank 백분위수"""
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class Command(BaseCommand):
+    help = "기록된 질의 분석 결과로 질의 사전 분류기 중심 모델 학습"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=DEFAULT_MODEL_PATH, help="모델 저장 경로 (PRECLASSIFIER_MODEL_PATH)")
+        parser.add_argument("--corpus", action="append", default=[], help="추가 학습 데이터 jsonl (여러 번 지정 가능)")
+        parser.add_argument("--min-similarity", type=float, default=0.35, help="평가용 PRECLASSIFIER_MIN_SIMILARITY")
+        parser.add_argument("--min-margin", type=float, default=0.05, help="평가용 PRECLASSIFIER_MIN_MARGIN")
+        parser.add_argument("--max-latency-ms", type=float, default=10.0, help="허용 분류 지연 p99(ms)")
+
+    def handle(self, *args, **options):
+        samples = list(logged_samples())
+        self.stdout.write(f"기록된 질의 분석 {len(samples)}건")
+        for path in options["corpus"]:
+            samples.extend(corpus_samples(path))
+        if not samples:
+            raise CommandError("학습할 질의 분석 기록이 없습니다")
+
+        model = CentroidModel.train(samples)
+        model.save(options["output"])
+        self.stdout.write(f"모델 저장: {options['output']} {dict(zip(model.labels, model.counts))}")
+        self.evaluate(PreClassifier(model, options["min_similarity"], options["min_margin"]), samples, options["max_latency_ms"])
+
+    def evaluate(self, classifier: PreClassifier, samples: List[Tuple[str, str]], max_latency_ms: float):
+        """학습 데이터 기준 결정 비율과 LLM 분류와의 일치율 (reject는 거부 대분류면 일치)"""
+        decisions = {"reject": [0, 0], "route": [0, 0], "escalate": [0, 0]}  # 결정 -> [건수, 일치 건수]
+        latencies = []
+        for query, label in samples:
+            started = time.perf_counter()
+            result = classifier.classify(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+            decision = result.decision if result else "escalate"
+            decisions[decision][0] += 1
+            if result and (result.lclsf_nm == label or (decision == "reject" and label in REJECT_LABELS)):
+                decisions[decision][1] += 1
+
+        for decision, (count, agreed) in decisions.items():
+            agreement = f", LLM 분류와 일치 {agreed / count:.1%}" if count and decision != "escalate" else ""
+            self.stdout.write(f"  {decision:<10}{count:>6}건 ({count / len(samples):.1%}){agreement}")
+        latencies.sort()
+        p99 = percentile(latencies, 99)
+        self.stdout.write(f"  분류 지연 p50 {percentile(latencies, 50):.2f}ms / p99 {p99:.2f}ms / 최대 {latencies[-1]:.2f}ms")
+        if p99 > max_latency_ms:
+            raise CommandError(f"분류 지연 p99 {p99:.2f}ms가 기준 {max_latency_ms:.0f}ms를 넘었습니다")
@@ -0,0 +1,93 @@
+"""
+세션 대화 메모리 (최근 메시지 + 누적 요약)
+- 최근 메시지: 요약되지 않은 마지막 N개 메시지를 메시지별/전체 토큰 한도로 잘라 그래프 입력 messages로 전달
+- 누적 요약: 최근 메시지 창을 넘은 오래된 메시지는 ChatSession.summary로 접어 넣음 (summary_msg_id까지 요약됨)
+- 이전 턴: 마지막 챗봇 메시지의 질의 분석/선정 정책 (정책 상세 설명 후속 질문에서 재사용)
+- 맥락 의존 질문: 지시어('그 정책', '거기')나 후속 질문 표현('신청 방법은?', '부산은?')이 있어 이전 대화 없이 해석할 수 없는 질문
+행은 Message 필드(msg_id, sender, content, sql_result, query_analysis)를 가진 딕셔너리, 오래된 순
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from .prompt_context import count_tokens, truncate_to_tokens
+
+NO_CONVERSATION = "없음"
+SENDER_LABELS = {"user": "사용자", "chatbot": "챗봇"}
+# 이전 턴에 안내한 정책을 가리키는 표현 (지시어, 순서)
+PREVIOUS_POLICY_PATTERN = re.compile(
+    r"(?<![가-힣])(?:그|이|저|위|해당)\s*(?:정책|사업|제도|것|거|곳|중)|(?<![가-힣])(?:그거|이거|저거|거기|그곳|그중|아까|방금)"
+    r"|앞에서|위에서|\d+\s*번(?:째)?|(?:첫|두|세|네|다섯)\s*번째"
+)
+# 이전 대화를 가리키는 표현 (위 표현 + 후속 질문) 및 한 어절 생략 질문 ('부산은?', '대학생은요?')
+CONTEXT_REFERENCE_PATTERN = re.compile(
+    PREVIOUS_POLICY_PATTERN.pattern
+    + r"|다른\s*(?:거|건|것|정책)|더\s*(?:있|없|알려)"
+    r"|신청\s*(?:방법|기간|자격|조건)|(?:방법|기간|자격|조건|서류)은"
+    r"|^\s*\S+(?:은|는)(?:요)?\s*\??\s*$"
+)
+
+
+def history_messages(rows: List[Dict[str, Any]], token_budget: int, message_tokens: int) -> List[BaseMessage]:
+    """
+    최근 메시지 -> LangChain 메시지 목록
+    - 메시지마다 message_tokens로 자르고, 합계가 token_budget을 넘으면 오래된 메시지부터 제외
+    """
+    messages: List[BaseMessage] = []
+    used_tokens = 0
+    for row in reversed(rows):
+        content = truncate_to_tokens(row["content"] or "", message_tokens)
+        tokens = count_tokens(content)
+        if used_tokens + tokens > token_budget:
+            break
+        used_tokens += tokens
+        message_class = HumanMessage if row["sender"] == "user" else AIMessage
+        messages.append(message_class(content=content))
+    return list(reversed(messages))
+
+
+def previous_turn(rows: List[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], Optional[List[Dict[str, Any]]]]:
+    """마지막 챗봇 메시지의 (질의 분석, 선정 정책) - 없으면 (None, None)"""
+    for row in reversed(rows):
+        if row["sender"] == "chatbot":
+            return row.get("query_analysis"), row.get("sql_result") or None
+    return None, None
+
+
+def refers_to_previous_policy(query: str) -> bool:
+    """이전 턴에 안내한 정책을 지시어/순서로 가리키는 질문인지"""
+    return bool(PREVIOUS_POLICY_PATTERN.search(query or ""))
+
+
+def refers_to_context(query: str) -> bool:
+    """이전 대화를 가리키는 표현이 있는 질문인지 (이전 대화가 있을 때만 의미 있음)"""
+    return bool(CONTEXT_REFERENCE_PATTERN.search(query or ""))
+
+
+def conversation_text(messages: List[BaseMessage], summary: Optional[str]) -> str:
+    """프롬프트용 이전 대화 (누적 요약 + 최근 메시지, 없으면 '없음')"""
+    lines = [f"(요약) {summary}"] if summary else []
+    for message in messages:
+        sender = "사용자" if isinstance(message, HumanMessage) else "챗봇"
+        lines.append(f"{sender}: {message.content}")
+    return "\n".join(lines) or NO_CONVERSATION
+
+
+def split_for_summary(rows: List[Dict[str, Any]], max_messages: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    요약되지 않은 메시지 -> (요약에 접어 넣을 메시지, 남길 메시지)
+    - max_messages를 넘을 때만 접고, 최근 max_messages // 2개를 남겨 요약 호출이 매 턴 일어나지 않도록 함
+    """
+    if len(rows) <= max_messages:
+        return [], rows
+    keep = max(1, max_messages // 2)
+    return rows[:-keep], rows[-keep:]
+
+
+def transcript(rows: List[Dict[str, Any]], message_tokens: int) -> str:
+    """요약 프롬프트용 대화 기록"""
+    return "\n".join(
+        f"{SENDER_LABELS.get(row['sender'], row['sender'])}: {truncate_to_tokens(row['content'] or '', message_tokens)}"
+        for row in rows
+    )
@@ -0,0 +1,256 @@
+"""
+챗봇 그래프 처리 지표 (Prometheus + 메시지별 기록)
+- 노드/단계별 처리 시간: LangGraph 노드 실행(graph:step 태그)과 이름을 붙인 하위 체인(정책 선정, 답변 생성)
+- LLM 토큰 수: OpenAI 응답의 usage (입력/출력)
+- SQL 결과 행 수와 DB 처리 시간: execute_postgresql_query에서 arecord_db_query로 전달
+- 커넥션 풀 사용 지표, 질의 분석/답변 캐시 적중 지표: stats() 스냅샷을 수집 시점에 읽음 (StatsCollector)
+ChatMetricsCallback을 graph.invoke/ainvoke/astream의 callbacks로 넘기면 한 번의 대화 턴 지표를 모은다
+"""
+import time
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler, dispatch_custom_event, adispatch_custom_event
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# 그래프 밖에서 이름으로 구분하는 하위 단계 (체인 run_name)
+POLICY_SELECTION_STAGE = "policy_selection"
+RESPONSE_GENERATION_STAGE = "response_generation"
+TOTAL_STAGE = "total"  # 그래프 전체 실행
+
+DB_QUERY_EVENT = "db_query"
+
+STAGE_DURATION = Histogram(
+    "chatbot_stage_duration_seconds",
+    "챗봇 그래프 노드/단계별 처리 시간",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+LLM_TOKENS = Counter(
+    "chatbot_llm_tokens_total",
+    "챗봇 단계별 LLM 사용 토큰 수",
+    ["stage", "type"],
+)
+DB_QUERY_DURATION = Histogram(
+    "chatbot_db_query_duration_seconds",
+    "정책 DB 쿼리 처리 시간",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+SQL_GUARD_REJECTIONS = Counter(
+    "chatbot_sql_guard_rejections_total",
+    "실행 전 검사에서 거부된 LLM 생성 쿼리 수",
+    ["reason"],
+)
+PRECLASSIFIER_DECISIONS = Counter(
+    "chatbot_preclassifier_decisions_total",
+    "질의 사전 분류 결과 (reject/route: LLM 질의 분석 생략, escalate: LLM 질의 분석으로 진행)",
+    ["decision"],
+)
+SQL_ROWS = Histogram(
+    "chatbot_sql_rows",
+    "정책 DB 쿼리 결과 행 수",
+    buckets=(0, 1, 5, 10, 20, 30, 50, 100),
+)
+
+
+class StatsCollector:
+    """
+    stats() 스냅샷(딕셔너리)을 가진 객체의 값을 수집 시점에 Prometheus 지표로 변환
+    - source: (라벨 값, stats 딕셔너리) 목록을 반환하는 함수 (설정이 아직 생성되지 않았으면 빈 목록)
+    - gauges/counters: stats 키 -> (지표 이름, 설명), 스냅샷에 없는 키는 해당 라벨에서 생략
+    """
+    def __init__(self, label: str, gauges: Dict[str, Tuple[str, str]], counters: Dict[str, Tuple[str, str]]):
+        self.label = label
+        self.gauges = gauges
+        self.counters = counters
+        self._source: Callable[[], Iterable[Tuple[str, Dict[str, Any]]]] = lambda: ()
+
+    def set_source(self, source: Callable[[], Iterable[Tuple[str, Dict[str, Any]]]]):
+        self._source = source
+
+    def collect(self):
+        snapshots = list(self._source())
+        for metrics, family_class in ((self.gauges, GaugeMetricFamily), (self.counters, CounterMetricFamily)):
+            for key, (name, documentation) in metrics.items():
+                family = family_class(name, documentation, labels=[self.label])
+                for label_value, stats in snapshots:
+                    if key in stats:
+                        family.add_metric([label_value], stats[key])
+                yield family
+
+
+DB_POOL_STATS = StatsCollector(
+    "pool",
+    gauges={
+        "in_use": ("chatbot_db_pool_in_use", "현재 대여 중인 DB 연결 수"),
+        "max_in_use": ("chatbot_db_pool_max_in_use", "최대 동시 대여 DB 연결 수"),
+        "max_size": ("chatbot_db_pool_max_size", "DB 커넥션 풀 최대 연결 수"),
+        "pools": ("chatbot_db_pool_loops", "이벤트 루프별로 생성된 비동기 커넥션 풀 수"),
+    },
+    counters={
+        "checkouts": ("chatbot_db_pool_checkouts", "DB 연결 대여 횟수"),
+        "wait_seconds_total": ("chatbot_db_pool_wait_seconds", "DB 연결 대기 누적 시간(초)"),
+        "acquire_timeouts": ("chatbot_db_pool_acquire_timeouts", "DB 연결 대기 시간 초과 횟수"),
+        "health_checks": ("chatbot_db_pool_health_checks", "DB 연결 헬스체크 횟수"),
+        "discarded": ("chatbot_db_pool_discarded", "끊어져서 폐기된 DB 연결 수"),
+        "errors": ("chatbot_db_pool_errors", "DB 연결 대여 중 발생한 오류 수"),
+    },
+)
+REGISTRY.register(DB_POOL_STATS)
+
+CACHE_STATS = StatsCollector(
+    "cache",
+    gauges={
+        "size": ("chatbot_cache_entries", "캐시 항목 수"),
+        "hit_rate": ("chatbot_cache_hit_rate", "캐시 적중률 (프로세스 시작 이후)"),
+    },
+    counters={
+        "hits": ("chatbot_cache_hits", "답변 캐시 적중 수"),
+        "exact_hits": ("chatbot_cache_exact_hits", "질의 분석 캐시 정규화 텍스트 일치 적중 수"),
+        "semantic_hits": ("chatbot_cache_semantic_hits", "질의 분석 캐시 유사 질문 적중 수"),
+        "misses": ("chatbot_cache_misses", "캐시 미적중 수"),
+        "bypassed": ("chatbot_cache_bypassed", "캐시를 우회한 요청 수"),
+        "stores": ("chatbot_cache_stores", "캐시 저장 수"),
+        "evictions": ("chatbot_cache_evictions", "LRU로 제거된 캐시 항목 수"),
+        "expirations": ("chatbot_cache_expirations", "TTL 만료로 제거된 캐시 항목 수"),
+        "invalidations": ("chatbot_cache_invalidations", "데이터 버전 변경으로 제거된 캐시 항목 수"),
+    },
+)
+REGISTRY.register(CACHE_STATS)
+
+
+def record_db_query(duration: float, row_count: int):
+    """DB 쿼리 1회 지표 기록 (동기) - 실행 중인 그래프 턴의 콜백에도 전달"""
+    DB_QUERY_DURATION.observe(duration)
+    SQL_ROWS.observe(row_count)
+    data = {"duration": duration, "row_count": row_count}
+    try:
+        dispatch_custom_event(DB_QUERY_EVENT, data)
+    except RuntimeError:
+        # 그래프 밖(벤치마크, 셸 등)에서 호출된 경우 - Prometheus 지표만 기록
+        pass
+
+
+async def arecord_db_query(duration: float, row_count: int):
+    """DB 쿼리 1회 지표 기록 (비동기)"""
+    DB_QUERY_DURATION.observe(duration)
+    SQL_ROWS.observe(row_count)
+    data = {"duration": duration, "row_count": row_count}
+    try:
+        await adispatch_custom_event(DB_QUERY_EVENT, data)
+    except RuntimeError:
+        # 그래프 밖(벤치마크, 셸 등)에서 호출된 경우 - Prometheus 지표만 기록
+        pass
+
+
+def _token_usage(response) -> Optional[Dict[str, int]]:
+    """LLMResult -> {"prompt": n, "completion": n} (usage 정보가 없으면 None)"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {"prompt": usage.get("input_tokens", 0), "completion": usage.get("output_tokens", 0)}
+    token_usage = (response.llm_output or {}).get("token_usage")
+    if token_usage:
+        return {"prompt": token_usage.get("prompt_tokens", 0), "completion": token_usage.get("completion_tokens", 0)}
+    return None
+
+
+class ChatMetricsCallback(BaseCallbackHandler):
+    """
+    대화 턴 1회의 처리 지표 수집 콜백
+    - 단계 시간/토큰은 Prometheus에도 기록하고, as_dict()로 Message.metrics에 저장할 요약을 반환
+    - 병렬 분기는 서로 다른 스레드에서 콜백을 호출하므로 잠금으로 보호
+    """
+    run_inline = True  # 비동기 실행에서도 이벤트 순서대로 바로 처리
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._run_stages: Dict[UUID, Optional[str]] = {}  # run_id -> 지표를 합산할 단계
+        self._started_at: Dict[UUID, float] = {}  # 시간을 재는 run의 시작 시각
+        self.stages: Dict[str, float] = {}  # 단계 -> 처리 시간(초)
+        self.tokens: Dict[str, Dict[str, int]] = {}  # 단계 -> {"prompt": n, "completion": n}
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.sql_rows = 0
+
+    def _stage_of(self, parent_run_id: Optional[UUID]) -> Optional[str]:
+        return self._run_stages.get(parent_run_id) if parent_run_id else None
+
+    @staticmethod
+    def _timed_stage(name: Optional[str], parent_run_id: Optional[UUID], tags, metadata) -> Optional[str]:
+        """시간을 재는 run이면 단계 이름 반환 (그래프 전체, 노드, 이름 붙인 하위 체인)"""
+        if parent_run_id is None:
+            return TOTAL_STAGE
+        if name in (POLICY_SELECTION_STAGE, RESPONSE_GENERATION_STAGE):
+            return name
+        if name and name == (metadata or {}).get("langgraph_node") and any(tag.startswith("graph:step:") for tag in tags or ()):
+            return name
+        return None
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                       tags=None, metadata=None, **kwargs: Any):
+        stage = self._timed_stage(kwargs.get("name"), parent_run_id, tags, metadata)
+        with self._lock:
+            if stage is not None:
+                self._started_at[run_id] = time.perf_counter()
+            self._run_stages[run_id] = stage or self._stage_of(parent_run_id)
+
+    def _end_run(self, run_id: UUID):
+        with self._lock:
+            started_at = self._started_at.pop(run_id, None)
+            stage = self._run_stages.get(run_id)
+            if started_at is None:
+                return
+            duration = time.perf_counter() - started_at
+            self.stages[stage] = self.stages.get(stage, 0.0) + duration
+        STAGE_DURATION.labels(stage=stage).observe(duration)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any):
+        self._end_run(run_id)
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs: Any):
+        self._end_run(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        with self._lock:
+            self._run_stages[run_id] = self._stage_of(parent_run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        with self._lock:
+            self._run_stages[run_id] = self._stage_of(parent_run_id)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        usage = _token_usage(response)
+        if usage is None:
+            return
+        with self._lock:
+            stage = self._run_stages.get(run_id) or "unknown"
+            stage_tokens = self.tokens.setdefault(stage, {"prompt": 0, "completion": 0})
+            for kind, count in usage.items():
+                stage_tokens[kind] += count
+        for kind, count in usage.items():
+            LLM_TOKENS.labels(stage=stage, type=kind).inc(count)
+
+    def on_custom_event(self, name: str, data: Any, *, run_id: UUID, **kwargs: Any):
+        if name != DB_QUERY_EVENT:
+            return
+        with self._lock:
+            self.db_queries += 1
+            self.db_time += data["duration"]
+            self.sql_rows += data["row_count"]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Message.metrics 저장용 요약 (시간 단위: ms)"""
+        with self._lock:
+            return {
+                "stages_ms": {stage: round(duration * 1000, 1) for stage, duration in self.stages.items()},
+                "tokens": {stage: dict(usage) for stage, usage in self.tokens.items()},
+                "db": {
+                    "queries": self.db_queries,
+                    "time_ms": round(self.db_time * 1000, 1),
+                    "rows": self.sql_rows,
+                },
+            }
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Chatbot', '0004_message_sql_result'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='metrics',
+            field=models.JSONField(blank=True, null=True, verbose_name='처리 지표'),
+        ),
+    ]
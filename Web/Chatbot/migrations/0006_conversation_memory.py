@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Chatbot', '0005_message_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary',
+            field=models.TextField(blank=True, default='', verbose_name='대화 요약'),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary_msg_id',
+            field=models.IntegerField(blank=True, null=True, verbose_name='요약된 마지막 메시지 아이디'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='query_analysis',
+            field=models.JSONField(blank=True, null=True, verbose_name='질의 분석'),
+        ),
+    ]
@@ -7,6 +7,9 @@ class ChatSession(models.Model):
     session_nm = models.CharField(max_length=100, verbose_name='세션 이름')
     create_dt = models.DateTimeField(auto_now_add=True, verbose_name='생성일시')
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='사용자 아이디')
+    # 최근 메시지 창을 넘은 오래된 대화의 누적 요약 (summary_msg_id 메시지까지 요약됨)
+    summary = models.TextField(blank=True, default='', verbose_name='대화 요약')
+    summary_msg_id = models.IntegerField(null=True, blank=True, verbose_name='요약된 마지막 메시지 아이디')
 
 
 class Message(models.Model):
@@ -18,6 +21,8 @@ class Message(models.Model):
     sender = models.CharField(max_length=10, choices=MSG_SENDER_CHOICES, verbose_name='발신자')
     content = models.TextField(verbose_name='내용')
     sql_result = models.JSONField(null=True, blank=True, verbose_name='SQL 결과')
+    metrics = models.JSONField(null=True, blank=True, verbose_name='처리 지표')  # 챗봇 응답의 단계별 처리 시간/토큰/DB 지표
+    query_analysis = models.JSONField(null=True, blank=True, verbose_name='질의 분석')  # 챗봇 응답의 질의 분석 결과 (후속 질문에서 재사용)
     create_dt = models.DateTimeField(auto_now_add=True, verbose_name='생성일시')
     session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, verbose_name='세션 아이디')
 
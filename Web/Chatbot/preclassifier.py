@@ -0,0 +1,314 @@
+"""
+질의 사전 분류기 (o3-mini 질의 분석 전에 프로세스 내에서 실행, LLM/네트워크 호출 없음)
+- 규칙: 주거/일자리 핵심 키워드, 명백한 주제 외 질문 패턴, LLM 분석이 필요한 표현(소득/추가 요건/정책 상세 설명 등)
+- 최근접 중심 모델: 질문의 문자 n-gram 해시 벡터와 대분류별 중심 벡터의 코사인 유사도
+  (중심 벡터는 기록된 질의 분석 결과로 학습 - python manage.py train_preclassifier)
+- 결정: reject(주제 외 - 거부 응답), route(주거/일자리 - 규칙으로 조건 추출), 그 외는 None(LLM 질의 분석으로 진행)
+- 키워드는 어절 시작에서만 찾고(지역/키워드처럼 보이는 관용 표현은 먼저 제거), 규칙 결과는
+  두 번째 근거(중심 모델 일치 또는 서로 다른 키워드 2개 이상)가 있을 때만 사용
+"""
+import os
+import re
+import zlib
+import logging
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .retrieval import PLCY_NO_PATTERN
+from .vocabulary import (
+    SIDO_NAMES, SIDO_FULL_NAMES, NON_REGION_WORDS, MARRIAGE_KEYWORDS, JOB_KEYWORDS, SCHOOL_KEYWORDS,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preclassifier_model.npz")
+# 사전 분류기가 만든 분석 결과 표시 (학습 데이터에서 제외 - 자기 결과로 다시 학습하지 않도록)
+REASONING_PREFIX = "사전 분류"
+REJECT_LABELS = ("기타", "그 외 정책")  # route_after_analysis에서 거부되는 대분류
+RULE_CONFIDENCE = 0.9  # 규칙으로 결정한 분류 신뢰도
+EXTRACTION_CONFIDENCE = 0.8  # 규칙으로 추출한 조건 신뢰도
+
+# 문자 n-gram 해시 벡터
+VECTOR_DIMENSIONS = 4096
+NGRAM_SIZES = (2, 3)
+
+# 대분류 핵심 키워드 (한 대분류의 키워드만 있어야 route, 어절 시작에서만 일치)
+DOMAIN_KEYWORDS = {
+    "주거": ("전세", "월세", "전월세", "임대", "임차", "주택", "주거", "기숙사", "이사비", "이사 비용", "중개", "보증금", "청약", "자취", "원룸"),
+    "일자리": ("취업", "일자리", "구직", "채용", "인턴", "창업", "직업훈련", "훈련", "취준", "면접", "자격증", "고용", "일경험"),
+}
+# 어절 앞에 붙어도 같은 키워드로 보는 수식어 (예: '청년전세', '공공임대')
+KEYWORD_PREFIXES = ("청년", "공공", "국민", "행복", "신규")
+# 키워드/지역명처럼 보이지만 다른 뜻인 표현 (키워드/조건 추출 전에 제거)
+STOP_PHRASE_PATTERN = re.compile(
+    r"전\s?세계|경기\s*(?:불황|침체|회복|부양|악화|둔화|전망|상황|일정|결과|중계|관람|규칙)"
+    r"|(?:축구|야구|농구|배구|e스포츠)\s*경기"
+)
+# 정책 질문 표현 (주제 외 패턴과 함께 있으면 LLM 분석)
+POLICY_PATTERN = re.compile(r"정책|지원|청년|혜택|대출|보조금|수당|장려금|바우처")
+# 명백한 주제 외 질문 (인사만 있는 질문은 바로 거부, 주제 외 표현은 두 번째 근거가 있어야 거부)
+GREETING_PATTERN = re.compile(r"(?:안녕|안녕하세요|하이|ㅎㅇ|고마워|감사합니다|ㅋ+|ㅎ+)[!.?~ ]*")
+OFF_TOPIC_PATTERN = re.compile(
+    r"(?<![가-힣])(?:날씨|주식|비트코인|코인|맛집|레시피|요리|게임|영화|드라마|노래|연예인|축구|야구|운세|로또|번역|코딩|프로그래밍|숙제|연애|다이어트)"
+)
+# 규칙으로 처리하지 않고 LLM 분석이 필요한 표현
+# - 소득/추가 요건/전공 등 규칙으로 추출하지 않는 조건, 결혼 여부 해석, 나이대
+# - 정책 상세 설명/기타 의도 (방법, 서류, 기간, 비교 등)
+LLM_REQUIRED_PATTERN = re.compile(
+    r"소득|수급|차상위|한부모|장애|다문화|보훈|중소기업|중견기업|농업|어업|영농|귀농|전공|계열|비정규|자영업|프리랜서"
+    r"|결혼|신혼|예비부부|\d+\s*대\b|만원|%"
+    r"|방법|절차|서류|기간|언제|마감|자격|어떻게|뭐야|설명|차이|비교|그 정책|이 정책"
+    r"|군대|입대|군 복무|전역|예비군|민방위"
+)
+
+# 규칙 조건 추출
+AGE_PATTERN = re.compile(r"(?:만\s*)?(\d{2})\s*(?:살|세)")
+MIN_AGE, MAX_AGE = 15, 45  # 범위 밖 나이는 LLM 분석
+SIDO_PATTERN = re.compile(
+    r"(?<![가-힣])(" + "|".join(SIDO_FULL_NAMES) + "|" + "|".join(SIDO_NAMES) + r")(?:특별자치시|특별자치도|특별시|광역시|시|도)?(?:(?![가-힣])|(?=에서|에|의))"
+)
+SUBREGION_PATTERN = re.compile(r"\s*([가-힣]{1,5}(?:시|군|구))(?:(?![가-힣])|(?=에서|에|의))")
+# 규칙이 모르는 지역 표현 (시/도로 시작하지 않는 지역명, '~에 사는' 앞의 지역명) - 지역이 아닌 흔한 단어 제외
+UNKNOWN_REGION_PATTERN = re.compile(r"[가-힣]+(?:시|군|구|동|읍|면)(?![가-힣])|[가-힣]+\s?(?:에\s*)?(?:사는|살고|거주|산다|살아)")
+# 키워드 어절 끝의 조사/어미 (예: '창업하려는' -> '창업')
+TOKEN_SUFFIX_PATTERN = re.compile(r"(?:하려는|하려고|해주는|하는|하고|받을|인데|으로|에서|은|는|이|가|을|를|에|의|도|로)$")
+REGION_PLACEHOLDER = "\x00"  # 추출한 지역 자리 (앞뒤 단어가 붙어 모르는 지역명으로 보이지 않도록)
+
+
+def _keyword_pattern(keywords: Iterable[str]) -> "re.Pattern":
+    """어절 시작(수식어 허용)에서 일치하는 키워드 패턴 - 긴 키워드 먼저 ('전월세'가 '월세'보다 먼저)"""
+    alternatives = "|".join(re.escape(keyword).replace(r"\ ", r"\s*") for keyword in sorted(keywords, key=len, reverse=True))
+    return re.compile(r"(?<![가-힣])(?:" + "|".join(KEYWORD_PREFIXES) + r")?(" + alternatives + ")")
+
+
+DOMAIN_PATTERNS = {category: _keyword_pattern(keywords) for category, keywords in DOMAIN_KEYWORDS.items()}
+
+
+def normalize_text(query: str) -> str:
+    """유니코드 정규화(NFKC) + 소문자 + 공백 정리 (문장부호는 규칙 판단에 쓰이므로 유지)"""
+    return " ".join(unicodedata.normalize("NFKC", query or "").lower().split())
+
+
+def text_vector(text: str) -> np.ndarray:
+    """질문 -> 문자 n-gram 해시 벡터 (단위 벡터, 공백 제거 후 계산)"""
+    compact = normalize_text(text).replace(" ", "")
+    vector = np.zeros(VECTOR_DIMENSIONS, dtype=np.float32)
+    for size in NGRAM_SIZES:
+        for i in range(len(compact) - size + 1):
+            vector[zlib.crc32(compact[i:i + size].encode("utf-8")) % VECTOR_DIMENSIONS] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@dataclass
+class CentroidPrediction:
+    label: str
+    score: float  # 1위 중심 벡터와의 코사인 유사도
+    margin: float  # 1위와 2위 유사도 차이
+
+
+class CentroidModel:
+    """대분류별 중심 벡터 (학습 질문 벡터 평균을 정규화) - 생성 후 변경하지 않음"""
+    def __init__(self, labels: List[str], centroids: np.ndarray, counts: List[int]):
+        self.labels = list(labels)
+        self.centroids = centroids
+        self.counts = list(counts)
+
+    @classmethod
+    def train(cls, samples: Iterable[Tuple[str, str]]) -> "CentroidModel":
+        """(질문, 대분류) 목록으로 학습"""
+        sums: Dict[str, np.ndarray] = {}
+        counts: Dict[str, int] = {}
+        for query, label in samples:
+            sums[label] = sums.get(label, 0) + text_vector(query)
+            counts[label] = counts.get(label, 0) + 1
+        labels = sorted(sums)
+        if not labels:
+            raise ValueError("학습할 질의 분석 기록이 없습니다")
+        centroids = np.stack([sums[label] / (np.linalg.norm(sums[label]) or 1.0) for label in labels]).astype(np.float32)
+        return cls(labels, centroids, [counts[label] for label in labels])
+
+    def predict(self, vector: np.ndarray) -> CentroidPrediction:
+        scores = self.centroids @ vector
+        order = np.argsort(scores)[::-1]
+        runner_up = float(scores[order[1]]) if len(order) > 1 else 0.0
+        return CentroidPrediction(self.labels[order[0]], float(scores[order[0]]), float(scores[order[0]]) - runner_up)
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            np.savez(f, labels=np.array(self.labels), centroids=self.centroids, counts=np.array(self.counts))
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> Optional["CentroidModel"]:
+        """학습된 모델 (파일이 없거나 읽을 수 없으면 None -> 규칙만 사용)"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                model = cls(data["labels"].tolist(), data["centroids"], data["counts"].tolist())
+        except Exception as e:
+            logger.warning(f"사전 분류 모델 로드 실패, 규칙만 사용: {e}")
+            return None
+        logger.info(f"사전 분류 모델 로드: {dict(zip(model.labels, model.counts))}")
+        return model
+
+
+@dataclass
+class PreClassification:
+    decision: str  # reject | route
+    lclsf_nm: str
+    reason: str
+    conditions: Dict[str, Any] = field(default_factory=dict)  # route: 규칙으로 추출한 조건 (QueryAnalysis 필드명)
+    query_keywords: Optional[str] = None
+
+    def analysis_fields(self) -> Dict[str, Any]:
+        """QueryAnalysis 생성 인자"""
+        keywords = {"query_keywords": self.query_keywords} if self.query_keywords else {}
+        return {
+            "lclsf_nm": self.lclsf_nm,
+            **keywords,
+            "query_intent": "맞춤 정책 검색" if self.decision == "route" else "기타",
+            "classification_confidence": RULE_CONFIDENCE,
+            "extraction_confidence": EXTRACTION_CONFIDENCE,
+            "reasoning": f"{REASONING_PREFIX}: {self.reason}",
+            **self.conditions,
+        }
+
+
+def _first_match(text: str, mapping) -> Optional[str]:
+    for keywords, value in mapping:
+        if any(keyword in text for keyword in keywords):
+            return value
+    return None
+
+
+def extract_region(text: str) -> Tuple[Optional[str], str]:
+    """(거주지, 지역 표현을 제거한 나머지) - 시/도 + 뒤따르는 시/군/구"""
+    match = SIDO_PATTERN.search(text)
+    if not match:
+        return None, text
+    name = match.group(1)
+    parts = [SIDO_FULL_NAMES.get(name) or SIDO_NAMES[name]]
+    end = match.end()
+    while len(parts) < 3:
+        subregion = SUBREGION_PATTERN.match(text, end)
+        if not subregion:
+            break
+        parts.append(subregion.group(1))
+        end = subregion.end()
+    return " ".join(parts), text[:match.start()] + REGION_PLACEHOLDER + text[end:]
+
+
+def extract_conditions(text: str) -> Optional[Dict[str, Any]]:
+    """
+    규칙 조건 추출 (나이, 결혼 상태, 거주지, 취업 상태, 학력)
+    - 규칙으로 해석할 수 없는 조건 표현(범위 밖 나이, 모르는 지역명 등)이 있으면 None -> LLM 분석
+    """
+    conditions: Dict[str, Any] = {}
+    ages = {int(age) for age in AGE_PATTERN.findall(text)}
+    if len(ages) > 1 or any(not MIN_AGE <= age <= MAX_AGE for age in ages):
+        return None
+    if ages:
+        conditions["age"] = ages.pop()
+
+    zip_cd, rest = extract_region(text)
+    rest = AGE_PATTERN.sub(" ", rest)
+    if any(match.group(0) not in NON_REGION_WORDS for match in UNKNOWN_REGION_PATTERN.finditer(rest)):
+        return None
+    if zip_cd:
+        conditions["zip_cd"] = zip_cd
+
+    for column, mapping in (("mrg_stts_cd", [((keyword,), value) for keyword, value in MARRIAGE_KEYWORDS]),
+                            ("job_cd", JOB_KEYWORDS), ("school_cd", SCHOOL_KEYWORDS)):
+        value = _first_match(text, mapping)
+        if value:
+            conditions[column] = value
+    return conditions
+
+
+def strip_stop_phrases(text: str) -> str:
+    """키워드/지역명처럼 보이는 관용 표현 제거 (예: '전세계', '경기 불황')"""
+    return STOP_PHRASE_PATTERN.sub(" ", text)
+
+
+def domain_keywords(text: str) -> Dict[str, List[str]]:
+    """대분류 -> 질문에 포함된 핵심 키워드 (어절 시작에서 일치, 중복 제거)"""
+    found = {}
+    for category, pattern in DOMAIN_PATTERNS.items():
+        matched = [re.sub(r"\s+", " ", match.group(1)) for match in pattern.finditer(text)]
+        if matched:
+            found[category] = list(dict.fromkeys(matched))
+    return found
+
+
+def keyword_tokens(text: str, keywords: List[str]) -> str:
+    """
+    검색 유사도 키워드 - 핵심 키워드로 시작하는 어절은 조사/어미를 뗀 어절(예: '전세대출'),
+    키워드가 수식어 뒤에 있으면 키워드만 사용 (예: '청년전세대출을' -> '전세')
+    """
+    terms = []
+    longest_first = sorted(keywords, key=len, reverse=True)  # '전월세'가 '월세'보다 먼저
+    for token in re.findall(r"[가-힣a-z0-9]+", text):
+        for keyword in longest_first:
+            if token.startswith(keyword):
+                terms.append(TOKEN_SUFFIX_PATTERN.sub("", token) or keyword)
+                break
+            if keyword in token:
+                terms.append(keyword)
+                break
+    return " ".join(dict.fromkeys(terms)) or " ".join(keywords)
+
+
+class PreClassifier:
+    """규칙 + 최근접 중심 모델 사전 분류 (판단이 애매하면 None -> LLM 질의 분석)"""
+    def __init__(self, model: Optional[CentroidModel] = None, min_similarity: float = 0.35,
+                 min_margin: float = 0.05, max_query_chars: int = 60):
+        self.model = model
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.max_query_chars = max_query_chars
+
+    def _confident(self, prediction: Optional[CentroidPrediction]) -> bool:
+        return bool(prediction and prediction.score >= self.min_similarity and prediction.margin >= self.min_margin)
+
+    def classify(self, query: str) -> Optional[PreClassification]:
+        text = normalize_text(query)
+        if not text or len(text) > self.max_query_chars or PLCY_NO_PATTERN.search(text):
+            return None
+        if GREETING_PATTERN.fullmatch(text):
+            return PreClassification("reject", "기타", "인사")
+        prediction = self.model.predict(text_vector(text)) if self.model else None
+        model_reason = f"중심 모델 {prediction.label} {prediction.score:.2f}" if prediction else "중심 모델 없음"
+        text = strip_stop_phrases(text)
+        domains = domain_keywords(text)
+
+        # 주거/일자리/정책 표현이 없는 질문만 거부 (주제 외 표현 2개 이상 또는 중심 모델도 거부 대분류)
+        if not domains and not POLICY_PATTERN.search(text):
+            off_topic = set(OFF_TOPIC_PATTERN.findall(text))
+            if not off_topic:
+                return None
+            if len(off_topic) >= 2:
+                return PreClassification("reject", "기타", f"주제 외 표현 {', '.join(sorted(off_topic))}, {model_reason}")
+            if self._confident(prediction) and prediction.label in REJECT_LABELS:
+                return PreClassification("reject", prediction.label, f"주제 외 표현 {off_topic.pop()}, {model_reason}")
+            return None
+
+        # 한 대분류 키워드만 있고, 중심 모델이 다른 대분류가 아니어야 route
+        if len(domains) != 1 or LLM_REQUIRED_PATTERN.search(text):
+            return None
+        category, keywords = next(iter(domains.items()))
+        if prediction and prediction.label != category:
+            return None
+        # 두 번째 근거: 중심 모델이 같은 대분류로 확신하거나 서로 다른 키워드가 2개 이상
+        if len(keywords) < 2 and not self._confident(prediction):
+            return None
+        conditions = extract_conditions(text)
+        if conditions is None:
+            return None
+        return PreClassification(
+            "route", category, f"키워드 {', '.join(keywords)}, {model_reason}",
+            conditions=conditions, query_keywords=keyword_tokens(text, keywords),
+        )
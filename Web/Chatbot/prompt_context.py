@@ -0,0 +1,137 @@
+"""
+LLM 프롬프트용 정책 검색 결과 직렬화
+str(sql_result) 대신 프롬프트에 필요한 컬럼만 골라 컬럼별 토큰 한도로 자른 TSV로 변환한다
+"""
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# 토큰 계산 기준 모델 (chat_llm)
+TOKENIZER_MODEL = "gpt-4o"
+
+# 정책 선정에 필요한 컬럼
+SELECTION_FIELDS = (
+    "plcy_no", "plcy_nm", "plcy_expln_cn", "lclsf_nm", "mclsf_nm",
+    "sprt_trgt_min_age", "sprt_trgt_max_age", "mrg_stts_cd", "job_cd", "school_cd",
+    "plcy_major_cd", "zip_cd", "earn_etc_cn", "add_aply_qlfcc_cn", "inq_cnt",
+)
+
+# 답변 생성에 필요한 컬럼 (선정 컬럼 + 지원내용/신청방법/기간/URL)
+ANSWER_FIELDS = SELECTION_FIELDS + (
+    "plcy_sprt_cn", "plcy_aply_mthd_cn", "aply_bgng_ymd", "aply_end_ymd", "aply_url_addr",
+)
+
+# 정책 상세 설명 답변에 필요한 컬럼 (답변 컬럼 + 심사방법/제출서류/기관/기타)
+DETAIL_FIELDS = ANSWER_FIELDS + (
+    "srng_mthd_cn", "sbmsn_dcmnt_cn", "etc_mttr_cn", "sprvsn_inst_cd_nm", "oper_inst_cd_nm", "ref_url_addr1",
+)
+
+# 컬럼별 토큰 한도 (지정되지 않은 컬럼은 DEFAULT_FIELD_TOKENS)
+FIELD_TOKEN_BUDGETS = {
+    "plcy_nm": 40,
+    "plcy_expln_cn": 120,
+    "plcy_sprt_cn": 200,
+    "plcy_aply_mthd_cn": 80,
+    "earn_etc_cn": 60,
+    "add_aply_qlfcc_cn": 80,
+    "zip_cd": 40,
+    "aply_url_addr": 40,
+}
+DEFAULT_FIELD_TOKENS = 30
+
+# 정책 하나만 전달하는 상세 설명 답변의 컬럼별 토큰 한도 (FIELD_TOKEN_BUDGETS보다 넉넉하게)
+DETAIL_FIELD_TOKEN_BUDGETS = {
+    "plcy_expln_cn": 300,
+    "plcy_sprt_cn": 500,
+    "plcy_aply_mthd_cn": 300,
+    "srng_mthd_cn": 200,
+    "sbmsn_dcmnt_cn": 200,
+    "etc_mttr_cn": 200,
+    "earn_etc_cn": 150,
+    "add_aply_qlfcc_cn": 200,
+    "zip_cd": 150,
+}
+
+TRUNCATION_MARK = "…"
+
+# tiktoken 인코더를 불러올 수 없을 때 사용하는 추정치 (UTF-8 4바이트 ≈ 1토큰, 한글 1자 ≈ 0.75토큰)
+BYTES_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    """
+    tiktoken 인코더 (프로세스당 1회 로드)
+    - 인코딩 파일 다운로드가 불가능한 환경에서는 None을 반환하고 바이트 수로 토큰을 추정
+    """
+    try:
+        return tiktoken.get_encoding(tiktoken.encoding_name_for_model(TOKENIZER_MODEL))
+    except Exception as e:
+        logger.warning(f"tiktoken 인코더 로드 실패, 바이트 수 기반으로 토큰 추정: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """텍스트의 토큰 수"""
+    encoding = get_encoding()
+    if encoding is None:
+        return -(-len(text.encode("utf-8")) // BYTES_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """토큰 한도를 넘는 텍스트를 잘라내고 말줄임표 추가"""
+    encoding = get_encoding()
+    if encoding is None:
+        max_bytes = max_tokens * BYTES_PER_TOKEN
+        encoded = text.encode("utf-8")
+        if len(encoded) <= max_bytes:
+            return text
+        return encoded[:max_bytes].decode("utf-8", errors="ignore").rstrip() + TRUNCATION_MARK
+    
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens]).rstrip() + TRUNCATION_MARK
+
+
+def _clean_value(value: Any) -> str:
+    """TSV 셀 값으로 변환 (탭/줄바꿈 제거, None은 빈 문자열)"""
+    if value is None:
+        return ""
+    return " ".join(str(value).split())
+
+
+def serialize_policies(rows: Iterable[Dict[str, Any]], fields: Tuple[str, ...] = ANSWER_FIELDS,
+                       total_token_budget: Optional[int] = None,
+                       field_budgets: Optional[Dict[str, int]] = None) -> Tuple[str, int]:
+    """
+    정책 행 목록 -> (TSV 문자열, 토큰 수)
+    - fields 컬럼만 헤더 순서대로 출력
+    - 각 셀은 컬럼별 토큰 한도로 자름
+    - total_token_budget을 넘기면 그 뒤의 행은 제외 (행은 이미 관련도 순으로 정렬되어 있음)
+    """
+    budgets = {**FIELD_TOKEN_BUDGETS, **(field_budgets or {})}
+    header = "\t".join(fields)
+    lines: List[str] = [header]
+    token_count = count_tokens(header)
+
+    for row in rows or []:
+        cells = []
+        for field in fields:
+            value = _clean_value(row.get(field))
+            if value:
+                value = truncate_to_tokens(value, budgets.get(field, DEFAULT_FIELD_TOKENS))
+            cells.append(value)
+        line = "\t".join(cells)
+        line_tokens = count_tokens(line) + 1  # 줄바꿈 포함
+        if total_token_budget is not None and token_count + line_tokens > total_token_budget:
+            break
+        lines.append(line)
+        token_count += line_tokens
+
+    return "\n".join(lines), token_count
@@ -0,0 +1,183 @@
+"""
+질의 분석(QueryAnalysis) 시맨틱 캐시
+표현만 다른 비슷한 질문("서울 사는 27살 전세대출" 등)에 대해 o3-mini 질의 분석 호출을 건너뛴다
+- 1차: 정규화한 질문 텍스트의 해시가 같으면 적중
+- 2차: 질문 임베딩의 코사인 유사도가 임계값 이상이고, 질문에 포함된 숫자(나이/소득 등)와
+  조건 표현(시/도, 시/군/구, 결혼/취업/학력 상태)이 같으면 적중
+"""
+import re
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional
+
+import numpy as np
+
+from .vocabulary import SIDO_NAMES, SIDO_FULL_NAMES, NON_REGION_WORDS, MARRIAGE_KEYWORDS, JOB_KEYWORDS, SCHOOL_KEYWORDS
+
+logger = logging.getLogger(__name__)
+
+# 정규화 시 제거할 문자 (문장부호/기호)
+_PUNCTUATION_PATTERN = re.compile(r"[^\w\s]")
+_NUMBER_PATTERN = re.compile(r"\d+")
+# 시/군/구 어절 (조사가 붙은 경우 포함)
+_SUBREGION_PATTERN = re.compile(r"[가-힣]{1,5}(?:시|군|구)(?:(?![가-힣])|(?=에서|에|의))")
+# 조건 표현 -> 비교용 값 (시/도는 약칭과 정식 명칭을 같은 값으로)
+_ENTITY_KEYWORDS = (
+    [(name, sido) for name, sido in {**SIDO_NAMES, **SIDO_FULL_NAMES}.items()]
+    + [(keyword, value) for keyword, value in MARRIAGE_KEYWORDS]
+    + [(keyword, value) for keywords, value in JOB_KEYWORDS + SCHOOL_KEYWORDS for keyword in keywords]
+)
+
+
+def normalize_query(query: str) -> str:
+    """유니코드 정규화(NFKC) + 소문자 + 문장부호 제거 + 공백 정리"""
+    text = unicodedata.normalize("NFKC", query).lower()
+    text = _PUNCTUATION_PATTERN.sub(" ", text)
+    return " ".join(text.split())
+
+
+def query_hash(normalized_query: str) -> str:
+    return hashlib.sha256(normalized_query.encode("utf-8")).hexdigest()
+
+
+def query_numbers(normalized_query: str) -> FrozenSet[str]:
+    """질문에 포함된 숫자 집합 - 임베딩은 '27살'과 '28살'을 거의 같게 보므로 별도로 비교"""
+    return frozenset(_NUMBER_PATTERN.findall(normalized_query))
+
+
+def query_entities(normalized_query: str) -> FrozenSet[str]:
+    """
+    질문에 포함된 조건 표현 집합 - 임베딩은 '서울 사는'과 '부산 사는'을 거의 같게 보므로 별도로 비교
+    (부분 문자열로 찾으므로 지역이 아닌 단어가 섞여도 캐시를 덜 쓸 뿐 다른 질문의 분석을 돌려주지 않음)
+    """
+    entities = {value for keyword, value in _ENTITY_KEYWORDS if keyword in normalized_query}
+    for match in _SUBREGION_PATTERN.finditer(normalized_query):
+        token = match.group(0)
+        if token not in NON_REGION_WORDS and token[:-1] not in SIDO_NAMES:  # '서울시'는 시/도로 비교
+            entities.add(token)
+    return frozenset(entities)
+
+
+class _CacheEntry:
+    __slots__ = ("normalized_query", "numbers", "entities", "embedding", "value", "created_at")
+
+    def __init__(self, normalized_query: str, embedding: Optional[np.ndarray], value: Any):
+        self.normalized_query = normalized_query
+        self.numbers = query_numbers(normalized_query)
+        self.entities = query_entities(normalized_query)
+        self.embedding = embedding
+        self.value = value
+        self.created_at = time.monotonic()
+
+
+class SemanticQueryCache:
+    """
+    프로세스 내 질의 분석 캐시 (TTL + LRU)
+    - 저장 값은 그대로 반환하므로 호출 측에서 복사본을 사용
+    - 임베딩은 단위 벡터로 정규화해 저장하고 내적으로 코사인 유사도 계산
+    """
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600.0, similarity_threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()  # 해시 -> 항목 (LRU 순서)
+        self._lock = threading.Lock()
+        self._stats = {
+            "exact_hits": 0,  # 정규화 텍스트 일치
+            "semantic_hits": 0,  # 임베딩 유사도 일치
+            "misses": 0,
+            "bypassed": 0,  # 캐시 우회 요청 수
+            "evictions": 0,  # LRU로 제거된 항목 수
+            "expirations": 0,  # TTL 만료로 제거된 항목 수
+        }
+
+    def _is_expired(self, entry: _CacheEntry, now: float) -> bool:
+        return now - entry.created_at > self.ttl_seconds
+
+    def _purge_expired(self, now: float):
+        expired = [key for key, entry in self._entries.items() if self._is_expired(entry, now)]
+        for key in expired:
+            del self._entries[key]
+        self._stats["expirations"] += len(expired)
+
+    @staticmethod
+    def _unit_vector(embedding: Optional[List[float]]) -> Optional[np.ndarray]:
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def get_exact(self, query: str) -> Optional[Any]:
+        """정규화 텍스트 해시로 조회 (임베딩 계산 전 단계)"""
+        normalized = normalize_query(query)
+        key = query_hash(normalized)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._is_expired(entry, time.monotonic()):
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["exact_hits"] += 1
+            return entry.value
+
+    def get_similar(self, query: str, embedding: Optional[List[float]]) -> Optional[Any]:
+        """임베딩 유사도로 조회 - 임계값 이상이면서 숫자/조건 표현 집합이 같은 항목 중 가장 유사한 항목"""
+        vector = self._unit_vector(embedding)
+        normalized = normalize_query(query)
+        numbers, entities = query_numbers(normalized), query_entities(normalized)
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry.embedding is not None and entry.numbers == numbers and entry.entities == entities
+            ]
+            if vector is not None and candidates:
+                matrix = np.stack([entry.embedding for _, entry in candidates])
+                similarities = matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self._stats["semantic_hits"] += 1
+                    logger.info(f"질의 분석 캐시 유사 질문 적중 (유사도 {similarities[best]:.3f}): {entry.normalized_query}")
+                    return entry.value
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, query: str, embedding: Optional[List[float]], value: Any):
+        """질의 분석 결과 저장 (최대 항목 수 초과 시 가장 오래 사용되지 않은 항목 제거)"""
+        normalized = normalize_query(query)
+        key = query_hash(normalized)
+        with self._lock:
+            self._entries[key] = _CacheEntry(normalized, self._unit_vector(embedding), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def clear(self):
+        """캐시 비우기 (질의 분석 프롬프트 변경 시 등)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """캐시 지표 스냅샷"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["exact_hits"] + stats["semantic_hits"]) / lookups if lookups else 0.0
+        return stats
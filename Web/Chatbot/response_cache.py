@@ -0,0 +1,128 @@
+"""
+최종 답변 캐시
+같은 QueryAnalysis(분류 + 조건)로 귀결되는 질문은 SQL 검색/정책 선정/답변 생성을 다시 하지 않는다
+- 키: 정규화한 분석 결과 + 생성 설정(top_k, 생성 방식)
+- 값: sql_result, selected_policies, final_response 등 그래프 상태 일부
+- 정책 데이터 버전(policy_data_version, 적재 작업이 갱신)이 바뀌면 이전 버전 항목은 무효
+"""
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 검색/답변 결과에 영향을 주는 분석 필드 (신뢰도, reasoning은 제외)
+CACHE_KEY_FIELDS = (
+    "lclsf_nm", "mclsf_nm", "query_keywords", "query_intent",
+    "age", "mrg_stts_cd", "plcy_major_cd", "job_cd", "school_cd",
+    "zip_cd", "earn_etc_cn", "additional_requirement",
+)
+
+
+def _canonical_value(field: str, value: Any) -> Any:
+    """문자열 필드 정규화 (NFKC + 공백 정리), 키워드는 순서 무관하게 정렬"""
+    if not isinstance(value, str):
+        return value
+    text = " ".join(unicodedata.normalize("NFKC", value).split())
+    if field == "query_keywords":
+        keywords = {keyword.strip() for keyword in text.replace(",", " ").split() if keyword.strip()}
+        return " ".join(sorted(keywords))
+    return text or None
+
+
+def canonical_analysis(query_analysis, **settings) -> Dict[str, Any]:
+    """QueryAnalysis -> 캐시 키용 정규화 딕셔너리"""
+    canonical = {
+        field: _canonical_value(field, getattr(query_analysis, field, None))
+        for field in CACHE_KEY_FIELDS
+    }
+    canonical.update(settings)
+    return canonical
+
+
+def response_cache_key(query_analysis, **settings) -> str:
+    payload = json.dumps(canonical_analysis(query_analysis, **settings), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    프로세스 내 답변 캐시 (TTL + LRU + 데이터 버전)
+    - 저장/조회 시 깊은 복사로 그래프 상태와 캐시 값을 분리
+    """
+    def __init__(self, max_entries: int = 500, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # 키 -> {version, value, created_at}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,  # LRU로 제거된 항목 수
+            "expirations": 0,  # TTL 만료로 제거된 항목 수
+            "invalidations": 0,  # 데이터 버전 변경으로 제거된 항목 수
+        }
+
+    def get(self, key: str, version: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if entry["version"] != version:
+                del self._entries[key]
+                self._stats["invalidations"] += 1
+                self._stats["misses"] += 1
+                return None
+            if time.monotonic() - entry["created_at"] > self.ttl_seconds:
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return copy.deepcopy(entry["value"])
+
+    def set(self, key: str, version: int, value: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = {
+                "version": version,
+                "value": copy.deepcopy(value),
+                "created_at": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate_except(self, version: int):
+        """현재 데이터 버전이 아닌 항목 모두 제거 (정책 데이터 갱신 감지 시)"""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry["version"] != version]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidations"] += len(stale)
+        if stale:
+            logger.info(f"정책 데이터 버전 변경 ({version}) - 답변 캐시 {len(stale)}개 무효화")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """캐시 지표 스냅샷"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,440 @@
+"""
+정책 검색 쿼리 빌더
+QueryAnalysis 결과를 LLM 없이 바인드 파라미터 기반 PostgreSQL 쿼리로 변환한다
+(build_direct_sql_chain 프롬프트의 쿼리 생성 규칙을 그대로 코드로 옮긴 것)
+"""
+import re
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+# '일반' 질의는 주거/일자리 정책을 절반씩 반환
+GENERAL_CATEGORIES = ("주거", "일자리")
+
+# 조건 컬럼 (QueryAnalysis 필드명 == policies 컬럼명)
+MULTI_VALUE_CONDITIONS = ("school_cd", "plcy_major_cd", "job_cd")  # 쉼표로 여러 값이 저장된 컬럼
+NO_RESTRICTION = "제한없음"
+NATIONWIDE = "전국"
+
+# 검색 방식
+# - similarity: 조건 필터 후 similarity() 합으로 정렬 (전체 후보에 대해 유사도 계산)
+# - trigram: pg_trgm 인덱스 연산자 사용 - 키워드가 정책명(%)/정책설명(<%)과 일치하는 정책을
+#   정책명 거리(<->) KNN으로 후보 추출 후 정렬 (키워드가 없으면 similarity와 동일)
+# - hybrid: 조건 필터 후 질문 임베딩 ANN 검색(policy_embeddings, HNSW)과 키워드 유사도 검색 결과를
+#   RRF(reciprocal rank fusion)로 합쳐 정렬 (질문 임베딩이 없으면 similarity와 동일)
+RETRIEVAL_MODES = ("similarity", "trigram", "hybrid")
+KNN_CANDIDATE_FACTOR = 5  # trigram/hybrid 방식 후보 수 = top_k * 배수
+RRF_K = 60  # RRF 점수 = sum(1 / (RRF_K + 순위))
+EMBEDDING_DIMENSIONS = 3072  # policy_embeddings.embedding (text-embedding-3-large)
+# 적재 시 선택적으로 저장하는 축소 임베딩 차원 (policy_embeddings.embedding_{차원}, 앞부분 절단 후 정규화)
+REDUCED_EMBEDDING_DIMENSIONS = (256, 512, 1024)
+
+# 정책 상세 설명 질문의 대상 정책 조회 (정책 번호 직접 언급 또는 정책명 trigram 거리)
+PLCY_NO_PATTERN = re.compile(r"(?<!\d)\d{20}(?!\d)")  # 예: 20250521005400110863
+DETAIL_LOOKUP_LIMIT = 2  # 1위와 2위 정책명 유사도 차이로 모호한 질문 판단
+
+
+def codes_column(column: str) -> str:
+    """조건 컬럼 -> 값 단위로 분리해 저장한 배열 컬럼 (GIN 인덱스)"""
+    return f"{column}s"
+
+
+def split_codes(value) -> List[str]:
+    """'재직자, 미취업자' -> ['재직자', '미취업자'] (적재 스크립트와 같은 분리 규칙)"""
+    return [code.strip() for code in (value or "").split(",") if code.strip()]
+
+
+def region_prefixes(zip_cd: str) -> List[str]:
+    """
+    '경기도 수원시 팔달구' -> ['경기도 수원시 팔달구', '경기도 수원시', '경기도'] (하위 지역부터)
+    - youth_policy_region(insert_condition.py)과 같은 규칙 (공백 단위 계층, 지역명은 상위 지역을 포함한 전체 경로)
+      이므로 결과가 해당 지역과 모든 상위 지역
+    """
+    parts = [part for part in zip_cd.split() if part]
+    return [" ".join(parts[:i]) for i in range(len(parts), 0, -1)]
+
+
+def region_lineage(zip_cd: str) -> List[str]:
+    """사용자 지역과 일치로 보는 정책 지역 목록 (해당 지역, 상위 지역, 전국)"""
+    return region_prefixes(zip_cd) + [NATIONWIDE]
+
+
+def build_region_policy_query(zip_cd: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    사용자 지역 -> 대상 정책 번호 조회 쿼리
+    - 정책 지역 배열(zip_cds, 전체 경로 지역명)과 사용자 지역 계통의 겹침 검색 한 번 (GIN 인덱스)
+    """
+    sql = "SELECT p.plcy_no FROM policies p WHERE p.zip_cds && %(zip_regions)s::text[]"
+    return sql, {"zip_regions": region_lineage(zip_cd)}
+
+
+def find_plcy_no(text: str) -> Optional[str]:
+    """질문에 포함된 정책 번호 (없으면 None)"""
+    match = PLCY_NO_PATTERN.search(text or "")
+    return match.group(0) if match else None
+
+
+def build_policy_detail_query(query: str, policy_name: Optional[str]) -> Tuple[str, Dict[str, Any]]:
+    """
+    정책 상세 설명 질문 -> 대상 정책 조회 쿼리 (name_score: 정책명 trigram 유사도)
+    - 질문에 정책 번호가 있으면 기본 키 조회 (name_score = 1)
+    - 없으면 정책명과 가장 가까운 정책 DETAIL_LOOKUP_LIMIT개 (<-> KNN, GiST 인덱스)
+    """
+    plcy_no = find_plcy_no(query)
+    if plcy_no:
+        return "SELECT p.*, 1.0::float8 AS name_score FROM policies p WHERE p.plcy_no = %(plcy_no)s", {"plcy_no": plcy_no}
+    sql = (
+        "SELECT p.*, similarity(p.plcy_nm, %(policy_name)s)::float8 AS name_score FROM policies p"
+        " ORDER BY p.plcy_nm <-> %(policy_name)s"
+        " LIMIT %(limit)s"
+    )
+    return sql, {"policy_name": policy_name or query, "limit": DETAIL_LOOKUP_LIMIT}
+
+
+def resolve_policy_detail(rows: List[Dict[str, Any]], min_score: float, min_margin: float) -> Optional[Dict[str, Any]]:
+    """
+    정책 상세 조회 결과 -> 대상 정책 행 (모호하면 None -> 일반 검색으로 진행)
+    - 1위 유사도가 min_score 이상이고 2위보다 min_margin 이상 높아야 함
+    """
+    if not rows:
+        return None
+    top_score = rows[0].get("name_score") or 0.0
+    runner_up = (rows[1].get("name_score") or 0.0) if len(rows) > 1 else 0.0
+    if top_score < min_score or top_score - runner_up < min_margin:
+        return None
+    return rows[0]
+
+
+def build_policies_by_no_query(plcy_nos: List[str]) -> Tuple[str, Dict[str, Any]]:
+    """정책 번호 목록 -> 정책 행 조회 쿼리 (기본 키 조회, 입력 순서 유지)"""
+    sql = (
+        "SELECT p.* FROM policies p WHERE p.plcy_no = ANY(%(plcy_nos)s)"
+        " ORDER BY array_position(%(plcy_nos)s::text[], p.plcy_no::text)"
+    )
+    return sql, {"plcy_nos": list(plcy_nos)}
+
+
+def _build_filters(query_analysis, params: Dict[str, Any]) -> List[str]:
+    """사용자 조건으로 WHERE 절 구성"""
+    filters = []
+
+    # 나이: 최소/최대 연령이 0(또는 NULL)이면 제한 없음
+    if query_analysis.age is not None:
+        params["age"] = query_analysis.age
+        filters.append(
+            "(COALESCE(p.sprt_trgt_min_age, 0) <= %(age)s"
+            " AND (COALESCE(p.sprt_trgt_max_age, 0) = 0 OR p.sprt_trgt_max_age >= %(age)s))"
+        )
+
+    # 결혼 상태: IN (조건, '제한없음')
+    if query_analysis.mrg_stts_cd:
+        params["mrg_stts_cd"] = query_analysis.mrg_stts_cd
+        filters.append(
+            f"(p.mrg_stts_cd IN (%(mrg_stts_cd)s, '{NO_RESTRICTION}')"
+            " OR COALESCE(p.mrg_stts_cd, '') = '')"
+        )
+
+    # 학력/전공/취업: 배열에 해당 조건 또는 '제한없음' 포함 (GIN 인덱스 겹침 검색)
+    for column in MULTI_VALUE_CONDITIONS:
+        value = getattr(query_analysis, column, None)
+        if value:
+            params[column] = value
+            params[f"{column}_codes"] = [value, NO_RESTRICTION]
+            filters.append(f"p.{codes_column(column)} && %({column}_codes)s::text[]")
+
+    # 거주지: 해당 지역 + 상위 지역 + 전국 (build_region_policy_query와 같은 조건)
+    if query_analysis.zip_cd:
+        params["zip_regions"] = region_lineage(query_analysis.zip_cd)
+        filters.append("p.zip_cds && %(zip_regions)s::text[]")
+
+    return filters
+
+
+def _build_order_by(query_analysis, params: Dict[str, Any], trigram: bool = False) -> List[str]:
+    """정렬 순서: zip_cd > 조건 일치 > query_keywords > earn_etc_cn, additional_requirement"""
+    order_by = []
+
+    # 1. 거주지: 더 구체적인 지역이 일치할수록 우선, 전국은 마지막
+    if query_analysis.zip_cd:
+        cases = []
+        for i, region in enumerate(region_prefixes(query_analysis.zip_cd)):
+            params[f"zip_cd_{i}"] = region
+            cases.append(f"WHEN %(zip_cd_{i})s = ANY(p.zip_cds) THEN {i}")
+        order_by.append(f"CASE {' '.join(cases)} ELSE {len(cases)} END")
+
+    # 2. 결혼/학력/전공/취업: '제한없음'보다 조건이 직접 일치하는 정책 우선
+    match_terms = []
+    if query_analysis.mrg_stts_cd:
+        match_terms.append("(CASE WHEN p.mrg_stts_cd = %(mrg_stts_cd)s THEN 0 ELSE 1 END)")
+    for column in MULTI_VALUE_CONDITIONS:
+        if getattr(query_analysis, column, None):
+            match_terms.append(f"(CASE WHEN %({column})s = ANY(p.{codes_column(column)}) THEN 0 ELSE 1 END)")
+    if match_terms:
+        order_by.append(" + ".join(match_terms))
+
+    # 3. 키워드 유사도 (정책명, 정책설명) - trigram 방식은 KNN 후보 추출과 같은 정책명 거리
+    if query_analysis.query_keywords:
+        params["query_keywords"] = query_analysis.query_keywords
+        if trigram:
+            order_by.append("p.plcy_nm <-> %(query_keywords)s")
+        else:
+            order_by.append(
+                "(similarity(p.plcy_nm, %(query_keywords)s)"
+                " + similarity(COALESCE(p.plcy_expln_cn, ''), %(query_keywords)s)) DESC"
+            )
+
+    # 4. 소득 요건 / 추가 요건 유사도
+    if query_analysis.earn_etc_cn:
+        params["earn_etc_cn"] = query_analysis.earn_etc_cn
+        order_by.append("similarity(COALESCE(p.earn_etc_cn, ''), %(earn_etc_cn)s) DESC")
+    if query_analysis.additional_requirement:
+        params["additional_requirement"] = query_analysis.additional_requirement
+        order_by.append(
+            "(similarity(COALESCE(p.add_aply_qlfcc_cn, ''), %(additional_requirement)s)"
+            " + similarity(COALESCE(p.ptcp_prp_trgt_cn, ''), %(additional_requirement)s)) DESC"
+        )
+
+    order_by.append("p.inq_cnt DESC NULLS LAST")
+    return order_by
+
+
+def _select(filters: List[str], order_by: List[str], limit_param: str) -> str:
+    where = " AND ".join(filters) if filters else "TRUE"
+    return (
+        "SELECT p.* FROM policies p"
+        f" WHERE {where}"
+        f" ORDER BY {', '.join(order_by)}"
+        f" LIMIT %({limit_param})s"
+    )
+
+
+def _select_trigram(filters: List[str], order_by: List[str], limit_param: str) -> str:
+    """
+    키워드 일치(% / <%, GIN) + 정책명 거리 KNN(<->, GiST)으로 후보를 뽑고 전체 정렬 기준으로 재정렬
+    - 리터럴 %는 바인드 파라미터 형식과 구분하기 위해 %%로 작성
+    """
+    keyword_match = "(p.plcy_nm %% %(query_keywords)s OR %(query_keywords)s <%% p.plcy_expln_cn)"
+    candidates = (
+        "SELECT p.* FROM policies p"
+        f" WHERE {' AND '.join(filters + [keyword_match])}"
+        " ORDER BY p.plcy_nm <-> %(query_keywords)s"
+        " LIMIT %(candidate_limit)s"
+    )
+    return (
+        f"SELECT p.* FROM ({candidates}) p"
+        f" ORDER BY {', '.join(order_by)}"
+        f" LIMIT %({limit_param})s"
+    )
+
+
+def uses_trigram(query_analysis, mode: str) -> bool:
+    """trigram 방식 적용 여부 (키워드가 있을 때만)"""
+    return mode == "trigram" and bool(query_analysis.query_keywords)
+
+
+def uses_hybrid(mode: str, query_embedding: Optional[List[float]]) -> bool:
+    """hybrid 방식 적용 여부 (질문 임베딩이 있을 때만)"""
+    return mode == "hybrid" and bool(query_embedding)
+
+
+def reduce_embedding(embedding: List[float], dimensions: int) -> List[float]:
+    """text-embedding-3 임베딩 차원 축소 (Matryoshka: 앞 dimensions개만 남기고 L2 정규화)"""
+    reduced = embedding[:dimensions]
+    norm = math.sqrt(sum(value * value for value in reduced)) or 1.0
+    return [value / norm for value in reduced]
+
+
+def embedding_search_target(dimensions: int = 0) -> Tuple[str, str]:
+    """
+    검색 차원 -> (policy_embeddings 거리 계산 대상 식, 벡터 타입)
+    - 0: 원본 임베딩 (HNSW 차원 한도 때문에 halfvec으로 캐스팅한 식 인덱스 사용)
+    - REDUCED_EMBEDDING_DIMENSIONS 중 하나: 적재 시 저장한 축소 임베딩 컬럼 (컬럼 HNSW 인덱스)
+    """
+    if not dimensions or dimensions == EMBEDDING_DIMENSIONS:
+        vector_type = f"halfvec({EMBEDDING_DIMENSIONS})"
+        return f"pe.embedding::{vector_type}", vector_type
+    if dimensions not in REDUCED_EMBEDDING_DIMENSIONS:
+        raise ValueError(f"지원하지 않는 임베딩 검색 차원: {dimensions}")
+    return f"pe.embedding_{dimensions}", f"halfvec({dimensions})"
+
+
+def vector_literal(embedding: List[float]) -> str:
+    """임베딩 -> pgvector 입력 형식 '[0.1,0.2,...]' (바인드 파라미터로 전달 후 캐스팅)"""
+    return "[" + ",".join(f"{value:.7g}" for value in embedding) + "]"
+
+
+def _select_hybrid(query_analysis, filters: List[str], params: Dict[str, Any], embedding_dimensions: int = 0) -> str:
+    """
+    조건 필터를 적용한 두 순위 목록을 RRF로 결합
+    - 벡터: 질문 임베딩과의 코사인 거리 (HNSW 인덱스와 같은 식, 거리는 한 번만 계산)
+    - 키워드: 정책명/정책설명 trigram 유사도 (키워드가 없으면 조회수)
+    - '일반' 질의는 대분류별 category_limit개까지 (주거/일자리 절반씩)
+    """
+    where = " AND ".join(filters)
+    vector_target, vector_type = embedding_search_target(embedding_dimensions)
+    if query_analysis.query_keywords:
+        keyword_order = (
+            "(similarity(p.plcy_nm, %(query_keywords)s)"
+            " + similarity(COALESCE(p.plcy_expln_cn, ''), %(query_keywords)s)) DESC, p.inq_cnt DESC NULLS LAST"
+        )
+    else:
+        keyword_order = "p.inq_cnt DESC NULLS LAST"
+    vector_candidates = (
+        f"SELECT pe.plcy_no, {vector_target} <=> %(query_embedding)s::{vector_type} AS distance"
+        " FROM policy_embeddings pe JOIN policies p ON p.plcy_no = pe.plcy_no"
+        f" WHERE {where}"
+        " ORDER BY distance LIMIT %(candidate_limit)s"
+    )
+    return (
+        "WITH vector_ranked AS ("
+        f"SELECT v.plcy_no, row_number() OVER (ORDER BY v.distance) AS rank FROM ({vector_candidates}) v"
+        "), keyword_ranked AS ("
+        f"SELECT p.plcy_no, row_number() OVER (ORDER BY {keyword_order}) AS rank FROM policies p"
+        f" WHERE {where} ORDER BY rank LIMIT %(candidate_limit)s"
+        "), fused AS ("
+        "SELECT r.plcy_no, SUM(1.0 / (%(rrf_k)s + r.rank))::float8 AS rrf_score FROM ("
+        "SELECT plcy_no, rank FROM vector_ranked UNION ALL SELECT plcy_no, rank FROM keyword_ranked"
+        ") r GROUP BY r.plcy_no"
+        ") SELECT ranked.* FROM ("
+        "SELECT p.*, f.rrf_score, row_number() OVER"
+        " (PARTITION BY p.lclsf_nm ORDER BY f.rrf_score DESC, p.inq_cnt DESC NULLS LAST) AS category_rank"
+        " FROM fused f JOIN policies p ON p.plcy_no = f.plcy_no"
+        ") ranked WHERE ranked.category_rank <= %(category_limit)s"
+        " ORDER BY ranked.rrf_score DESC, ranked.inq_cnt DESC NULLS LAST"
+        " LIMIT %(limit)s"
+    )
+
+
+def _build_hybrid_query(
+    query_analysis, filters: List[str], params: Dict[str, Any], top_k: int, query_embedding: List[float], embedding_dimensions: int
+) -> str:
+    if query_analysis.query_keywords:
+        params["query_keywords"] = query_analysis.query_keywords
+    if embedding_dimensions and embedding_dimensions != EMBEDDING_DIMENSIONS:
+        query_embedding = reduce_embedding(query_embedding, embedding_dimensions)
+    params.update({
+        "query_embedding": vector_literal(query_embedding),
+        "candidate_limit": top_k * KNN_CANDIDATE_FACTOR,
+        "rrf_k": RRF_K,
+        "limit": top_k,
+    })
+    if query_analysis.lclsf_nm == "일반":
+        params["categories"] = list(GENERAL_CATEGORIES)
+        params["category_limit"] = max(1, top_k // 2)
+        category_filter = "p.lclsf_nm = ANY(%(categories)s)"
+    else:
+        params["lclsf_nm"] = query_analysis.lclsf_nm
+        params["category_limit"] = top_k
+        category_filter = "p.lclsf_nm = %(lclsf_nm)s"
+    return _select_hybrid(query_analysis, filters + [category_filter], params, embedding_dimensions)
+
+
+def build_policy_search_query(
+    query_analysis, top_k: int = 10, mode: str = "similarity", eligible_plcy_nos: Optional[List[str]] = None,
+    query_embedding: Optional[List[float]] = None, embedding_dimensions: int = 0
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    QueryAnalysis -> (SQL, 바인드 파라미터)
+    - 사용자 입력은 모두 바인드 파라미터로 전달되므로 SQL에 직접 삽입되지 않음
+    - mode: RETRIEVAL_MODES 중 하나
+    - eligible_plcy_nos: 자격 조건 비트맵(eligibility)으로 미리 계산한 대상 정책 - 조건 필터 대신 정책 번호로 제한
+    - query_embedding: hybrid 방식의 질문 임베딩 (policy_embeddings와 같은 모델)
+    - embedding_dimensions: hybrid 방식 벡터 검색 차원 (0이면 원본, embedding_search_target 참고)
+    """
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"지원하지 않는 검색 방식: {mode}")
+    trigram = uses_trigram(query_analysis, mode)
+    select = _select_trigram if trigram else _select
+
+    params: Dict[str, Any] = {}
+    filters = _build_filters(query_analysis, params)
+    if eligible_plcy_nos is not None:
+        params["eligible_plcy_nos"] = list(eligible_plcy_nos)
+        filters = ["p.plcy_no = ANY(%(eligible_plcy_nos)s)"]
+    if uses_hybrid(mode, query_embedding):
+        return _build_hybrid_query(query_analysis, filters, params, top_k, query_embedding, embedding_dimensions), params
+    order_by = _build_order_by(query_analysis, params, trigram)
+    if trigram:
+        params["candidate_limit"] = top_k * KNN_CANDIDATE_FACTOR
+
+    if query_analysis.lclsf_nm == "일반":
+        # 주거/일자리 각각 top_k의 절반씩
+        params["half_limit"] = max(1, top_k // 2)
+        selects = []
+        for i, category in enumerate(GENERAL_CATEGORIES):
+            params[f"lclsf_nm_{i}"] = category
+            selects.append("(" + select(filters + [f"p.lclsf_nm = %(lclsf_nm_{i})s"], order_by, "half_limit") + ")")
+        return " UNION ALL ".join(selects), params
+
+    params["lclsf_nm"] = query_analysis.lclsf_nm
+    params["limit"] = top_k
+    return select(filters + ["p.lclsf_nm = %(lclsf_nm)s"], order_by, "limit"), params
+
+
+def build_candidate_query(query: str, limit: int = 30, mode: str = "similarity") -> Tuple[str, Dict[str, Any]]:
+    """
+    질의 분석 전에 실행하는 사전 검색 쿼리 (질문 원문과 정책명/설명의 trigram 유사도)
+    - 분석 결과가 나오면 refine_candidates로 조건을 적용해 사용
+      (trigram 방식 검색 결과 보충, LLM SQL 생성 실패 시 대체 결과)
+    - trigram 방식은 정책명 거리(<->) KNN 인덱스 정렬
+    """
+    params = {"query": query, "limit": limit, "categories": list(GENERAL_CATEGORIES)}
+    if mode == "trigram":
+        order_by = "p.plcy_nm <-> %(query)s"
+    else:
+        order_by = (
+            "(similarity(p.plcy_nm, %(query)s)"
+            " + similarity(COALESCE(p.plcy_expln_cn, ''), %(query)s)) DESC, p.inq_cnt DESC NULLS LAST"
+        )
+    sql = (
+        "SELECT p.* FROM policies p"
+        " WHERE p.lclsf_nm = ANY(%(categories)s)"
+        f" ORDER BY {order_by}"
+        " LIMIT %(limit)s"
+    )
+    return sql, params
+
+
+def _matches_condition(row: Dict[str, Any], query_analysis) -> bool:
+    """_build_filters와 같은 조건을 사전 검색 결과 행에 적용"""
+    categories = GENERAL_CATEGORIES if query_analysis.lclsf_nm == "일반" else (query_analysis.lclsf_nm,)
+    if row.get("lclsf_nm") not in categories:
+        return False
+
+    if query_analysis.age is not None:
+        min_age = row.get("sprt_trgt_min_age") or 0
+        max_age = row.get("sprt_trgt_max_age") or 0
+        if min_age > query_analysis.age or (max_age and max_age < query_analysis.age):
+            return False
+
+    if query_analysis.mrg_stts_cd and row.get("mrg_stts_cd") not in (query_analysis.mrg_stts_cd, NO_RESTRICTION, "", None):
+        return False
+
+    for column in MULTI_VALUE_CONDITIONS:
+        value = getattr(query_analysis, column, None)
+        if value:
+            codes = row.get(codes_column(column))
+            if codes is None:
+                codes = split_codes(row.get(column))
+            if value not in codes and NO_RESTRICTION not in codes:
+                return False
+
+    if query_analysis.zip_cd:
+        regions = row.get("zip_cds")
+        if regions is None:
+            regions = split_codes(row.get("zip_cd"))
+        if not set(regions) & set(region_lineage(query_analysis.zip_cd)):
+            return False
+
+    return True
+
+
+def refine_candidates(rows: List[Dict[str, Any]], query_analysis, top_k: int = 10) -> List[Dict[str, Any]]:
+    """사전 검색 결과에 사용자 조건을 적용 (검색 쿼리 실패 시 대체 결과로 사용)"""
+    return [row for row in rows or [] if _matches_condition(row, query_analysis)][:top_k]
+
+
+def merge_candidates(rows: List[Dict[str, Any]], candidates: List[Dict[str, Any]], query_analysis, top_k: int = 10) -> List[Dict[str, Any]]:
+    """검색 결과가 top_k보다 적으면 조건을 적용한 사전 검색 결과로 채움 (이미 있는 정책은 제외)"""
+    seen = {row["plcy_no"] for row in rows}
+    extra = [row for row in refine_candidates(candidates, query_analysis, top_k) if row["plcy_no"] not in seen]
+    return (list(rows) + extra)[:top_k]
@@ -4,8 +4,12 @@ LangGraph Studio용 청년정책 RAG 시스템
 그 외 질문에 대해서는 답변을 거부하는 시스템
 """
 import os
+import time
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional, Literal, Annotated
+import threading
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Literal, Annotated, Union
 from typing_extensions import TypedDict
 from dotenv import load_dotenv
 
@@ -16,15 +20,31 @@ from langgraph.graph.message import add_messages
 # LangChain imports
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableLambda
 from pydantic import BaseModel, Field
-
-# LangChain SQL imports
-from langchain_community.utilities import SQLDatabase
-from langchain_openai import ChatOpenAI
-import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from .db import PolicyDBPool, AsyncPolicyDBPool
+from .retrieval import (
+    build_policy_search_query, build_candidate_query, build_region_policy_query, build_policies_by_no_query,
+    build_policy_detail_query, resolve_policy_detail, refine_candidates, merge_candidates, uses_trigram, find_plcy_no,
+)
+from .prompt_context import (
+    serialize_policies, truncate_to_tokens, SELECTION_FIELDS, ANSWER_FIELDS, DETAIL_FIELDS, DETAIL_FIELD_TOKEN_BUDGETS,
+)
+from .query_cache import SemanticQueryCache
+from .metrics import (
+    POLICY_SELECTION_STAGE, RESPONSE_GENERATION_STAGE, SQL_GUARD_REJECTIONS, PRECLASSIFIER_DECISIONS, DB_POOL_STATS,
+    CACHE_STATS, arecord_db_query,
+)
+from .response_cache import ResponseCache, response_cache_key
+from .eligibility import EligibilityEngine
+from .memory import (
+    NO_CONVERSATION, history_messages, previous_turn, conversation_text, transcript, refers_to_context,
+    refers_to_previous_policy,
+)
+from .preclassifier import PreClassifier, CentroidModel, DEFAULT_MODEL_PATH as PRECLASSIFIER_MODEL_PATH, REJECT_LABELS
+
 # 환경변수 로드
 load_dotenv()
 
@@ -149,12 +169,28 @@ class GraphState(TypedDict):
     final_response: Optional[str]  # 최종 답변
     html_content: Optional[str]  # HTML 형식의 최종 결과
     error: Optional[str]  # 오류 메시지
+    cache_bypass: Optional[bool]  # True면 캐시를 사용하지 않고 항상 새로 계산
+    response_cache_key: Optional[str]  # 답변 캐시 키 (정규화한 분석 결과 기준)
+    policy_data_version: Optional[int]  # 답변 캐시 조회 시점의 정책 데이터 버전
+    candidate_policies: Optional[List[Dict[str, Any]]]  # 질의 분석과 병렬로 가져온 사전 검색 결과 (trigram 결과 보충/검색 실패 시 대체용)
+    query_embedding: Optional[List[float]]  # hybrid 검색용 질문 임베딩 (질의 분석과 병렬 생성)
+    conversation_summary: Optional[str]  # 세션의 오래된 대화 누적 요약 (최근 메시지는 messages에 포함)
+    previous_analysis: Optional[QueryAnalysis]  # 이전 턴의 질의 분석 결과
+    previous_policies: Optional[List[Dict[str, Any]]]  # 이전 턴에서 선정한 정책 목록
+    preclassified: Optional[bool]  # True면 사전 분류기가 질의 분석 결과를 채움 (LLM 질의 분석 생략)
     timestamp: str  # 처리 시각
 
 
 class YouthPolicyRAGConfig:
-    """RAG 시스템 설정"""
+    """
+    RAG 시스템 설정 (get_config()가 첫 요청에서 생성)
+    - OpenAI 클라이언트 모듈은 생성 시점에 import (manage.py 명령/워커 부팅 시 import 비용 없음)
+    """
     def __init__(self):
+        import httpx
+        from openai import DefaultHttpxClient, DefaultAsyncHttpxClient
+        from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
         # 데이터베이스 설정
         self.db_config = {
             'host': os.getenv("DB_HOST", 'localhost'),
@@ -171,10 +207,73 @@ class YouthPolicyRAGConfig:
         
         # RAG 설정
         self.top_k = int(os.getenv('TOP_K', 10))
+        # SQL 생성 방식: template(쿼리 빌더, 실패 시 LLM으로 대체) | llm(항상 LLM 생성)
+        self.sql_generation_mode = os.getenv('SQL_GENERATION_MODE', 'template')
+        # 템플릿 검색 방식: similarity(similarity() 정렬) / trigram(pg_trgm 인덱스 연산자 %, <-> KNN)
+        #                  / hybrid(임베딩 ANN + 키워드 유사도 RRF 결합)
+        self.retrieval_mode = os.getenv('RETRIEVAL_MODE', 'similarity')
+        # 답변 생성 방식: single(정책 선정 + 답변 단일 호출) | two_stage(정책 선정 후 답변 생성, A/B 비교용)
+        self.response_generation_mode = os.getenv('RESPONSE_GENERATION_MODE', 'single')
+        self.context_token_budget = int(os.getenv('CONTEXT_TOKEN_BUDGET', 6000))  # 검색 결과 프롬프트 토큰 한도
         self.confidence_threshold = os.getenv('CONFIDENCE_THRESHOLD', 0.5)  # 분류 신뢰도 임계값
+        self.schema_check_interval = int(os.getenv('SCHEMA_CHECK_INTERVAL', 300))  # 스키마 변경 확인 주기(초)
+        # 병렬 분기 노드별 제한 시간(초) - 초과 시 해당 분기 결과 없이 진행
+        # (비동기 작업은 취소됨, prefetch_schema의 스냅샷 조회 스레드는 취소할 수 없어 끝까지 실행 후 캐시만 채움)
+        self.branch_timeouts = {
+            'analyze_query': float(os.getenv('ANALYZE_QUERY_TIMEOUT', 60)),
+            'prefetch_schema': float(os.getenv('PREFETCH_SCHEMA_TIMEOUT', 3)),
+            'prefetch_policy_version': float(os.getenv('PREFETCH_POLICY_VERSION_TIMEOUT', 2)),
+            'prefetch_candidates': float(os.getenv('PREFETCH_CANDIDATES_TIMEOUT', 3)),
+            'prefetch_query_embedding': float(os.getenv('PREFETCH_QUERY_EMBEDDING_TIMEOUT', 3)),
+        }
+        self.candidate_limit = int(os.getenv('PREFETCH_CANDIDATES_LIMIT', 30))  # 사전 검색 결과 수
+        # hybrid 벡터 검색 차원: 0이면 원본 임베딩, 256/512/1024면 적재 시 저장한 축소 임베딩 (embedding_{차원})
+        self.embedding_search_dimensions = int(os.getenv('EMBEDDING_SEARCH_DIMENSIONS', 0))
         
-        # PostgreSQL URI 생성
-        self.db_uri = f"postgresql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}:{self.db_config['port']}/{self.db_config['database']}"
+        # 세션 대화 메모리 (최근 메시지 수/토큰 한도, 메시지별 토큰 한도, 누적 요약 토큰 한도)
+        self.memory_max_messages = int(os.getenv('MEMORY_MAX_MESSAGES', 10))
+        self.memory_token_budget = int(os.getenv('MEMORY_TOKEN_BUDGET', 1500))
+        self.memory_message_tokens = int(os.getenv('MEMORY_MESSAGE_TOKENS', 300))
+        self.memory_summary_tokens = int(os.getenv('MEMORY_SUMMARY_TOKENS', 400))
+        
+        # 정책 상세 설명 빠른 경로 (정책 번호/정책명으로 대상 정책 하나를 찾아 검색 없이 답변)
+        # 답변 방식: llm(대상 정책 컬럼만 전달하는 짧은 LLM 호출) | template(LLM 호출 없이 고정 형식)
+        self.detail_answer_mode = os.getenv('DETAIL_ANSWER_MODE', 'llm')
+        # 정책명 trigram 유사도 하한 / 1위와 2위 유사도 차이 하한 (미달이면 일반 검색)
+        self.detail_min_name_score = float(os.getenv('DETAIL_MIN_NAME_SCORE', 0.3))
+        self.detail_min_name_margin = float(os.getenv('DETAIL_MIN_NAME_MARGIN', 0.1))
+        
+        # LLM 생성 쿼리 실행 제한 (최대 행 수, 쿼리 제한 시간, EXPLAIN 예상 비용 상한)
+        self.generated_sql_max_rows = int(os.getenv('GENERATED_SQL_MAX_ROWS', 50))
+        self.generated_sql_timeout_ms = int(os.getenv('GENERATED_SQL_STATEMENT_TIMEOUT_MS', 2000))
+        self.generated_sql_max_cost = float(os.getenv('GENERATED_SQL_MAX_COST', 100000))
+        
+        # 그래프 노드에서 공유하는 PostgreSQL 커넥션 풀 (노드 조회: psycopg 3 비동기 풀, 스키마 스냅샷 조회: psycopg2 동기 풀)
+        pool_options = {
+            'minconn': int(os.getenv('DB_POOL_MIN', 1)),
+            'maxconn': int(os.getenv('DB_POOL_MAX', 10)),
+            'statement_timeout_ms': int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 5000)),
+            'acquire_timeout': float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', 10)),
+            'health_check_interval': float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', 30)),
+            # HNSW 검색 후보 수 (클수록 재현율 증가/지연 증가, hybrid 벡터 후보 수 이상이어야 함)
+            'session_settings': {'hnsw.ef_search': int(os.getenv('HNSW_EF_SEARCH', 100))},
+        }
+        self.db_pool = PolicyDBPool(self.db_config, **pool_options)
+        self.async_db_pool = AsyncPolicyDBPool(self.db_config, **pool_options)
+
+
+        # OpenAI API HTTP 연결 풀 (keep-alive, 모든 LLM/임베딩 클라이언트가 공유)
+        openai_limits = httpx.Limits(
+            max_connections=int(os.getenv('OPENAI_MAX_CONNECTIONS', 100)),
+            max_keepalive_connections=int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 20)),
+            keepalive_expiry=float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 60))
+        )
+        self.openai_http_client = DefaultHttpxClient(limits=openai_limits)
+        self.openai_async_http_client = DefaultAsyncHttpxClient(limits=openai_limits)
+        openai_clients = {
+            'http_client': self.openai_http_client,
+            'http_async_client': self.openai_async_http_client,
+        }
 
         # LangChain LLM 설정
         try:
@@ -183,48 +282,166 @@ class YouthPolicyRAGConfig:
                 temperature=0,
                 verbose=True,
                 model="gpt-4o",
+                stream_usage=True,  # 스트리밍 응답에도 토큰 사용량 포함 (처리 지표 기록)
+                **openai_clients
             )
             logger.info("LangChain LLM 초기화 완료")
         except Exception as e:
             logger.warning(f"LangChain LLM 초기화 실패: {e}")
             self.chat_llm = None
-        # SQLDatabase 설정
-        try:
-            self.sql_database = SQLDatabase.from_uri(self.db_uri)
-            logger.info("SQLDatabase 초기화 완료")
-        except Exception as e:
-            logger.warning(f"SQLDatabase 초기화 실패: {e}")
-            self.sql_database = None
         
         # LangChain ChatOpenAI 모델 설정 (질의 분류용)
         self.thinking_model = ChatOpenAI(
             api_key=self.openai_api_key,
             model="o3-mini",
+            **openai_clients
+        )
+        
+        # 질의 분석 시맨틱 캐시 (비슷한 질문은 o3-mini 호출 없이 이전 분석 결과 재사용)
+        self.query_cache_enabled = os.getenv('QUERY_CACHE_ENABLED', 'true').lower() == 'true'
+        self.query_cache = SemanticQueryCache(
+            max_entries=int(os.getenv('QUERY_CACHE_MAX_ENTRIES', 1000)),
+            ttl_seconds=float(os.getenv('QUERY_CACHE_TTL', 3600)),
+            similarity_threshold=float(os.getenv('QUERY_CACHE_SIMILARITY_THRESHOLD', 0.95))
+        )
+        # 캐시 유사도 비교용 임베딩 모델 (질의 분석보다 훨씬 빠르고 저렴)
+        self.query_embeddings = OpenAIEmbeddings(
+            api_key=self.openai_api_key,
+            model=os.getenv('QUERY_CACHE_EMBEDDING_MODEL', 'text-embedding-3-small'),
+            **openai_clients
+        )
+        
+        # hybrid 검색용 질문 임베딩 모델 (policy_embeddings 적재 모델과 같아야 함)
+        self.policy_embeddings = OpenAIEmbeddings(
+            api_key=self.openai_api_key,
+            model=os.getenv('POLICY_EMBEDDING_MODEL', 'text-embedding-3-large'),
+            **openai_clients
+        )
+        
+        # 최종 답변 캐시 (같은 분석 결과 + 같은 정책 데이터 버전이면 검색/답변 생성 생략)
+        self.response_cache_enabled = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+        self.response_cache = ResponseCache(
+            max_entries=int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 500)),
+            ttl_seconds=float(os.getenv('RESPONSE_CACHE_TTL', 3600))
+        )
+        self.policy_version_check_interval = float(os.getenv('POLICY_VERSION_CHECK_INTERVAL', 5))  # 정책 데이터 버전 확인 주기(초)
+        
+        # 자격 조건 비트맵 사전 필터 (정책 조건 필터를 프로세스 내에서 계산, 정책 데이터 버전이 바뀌면 변경분 갱신)
+        self.eligibility_filter_enabled = os.getenv('ELIGIBILITY_FILTER_ENABLED', 'true').lower() == 'true'
+        self.eligibility_engine = EligibilityEngine()
+        
+        # 질의 사전 분류기 (o3-mini 질의 분석 전 규칙 + 최근접 중심 모델로 주제 외 질문 거부, 명확한 주거/일자리 질문 라우팅)
+        # 중심 모델 파일은 python manage.py train_preclassifier로 생성 (없으면 규칙만 사용)
+        self.preclassifier_enabled = os.getenv('PRECLASSIFIER_ENABLED', 'true').lower() == 'true'
+        self.preclassifier = PreClassifier(
+            model=CentroidModel.load(os.getenv('PRECLASSIFIER_MODEL_PATH', PRECLASSIFIER_MODEL_PATH)),
+            min_similarity=float(os.getenv('PRECLASSIFIER_MIN_SIMILARITY', 0.35)),  # 중심 모델만으로 거부할 때 유사도 하한
+            min_margin=float(os.getenv('PRECLASSIFIER_MIN_MARGIN', 0.05)),  # 1위와 2위 중심 유사도 차이 하한
+            max_query_chars=int(os.getenv('PRECLASSIFIER_MAX_QUERY_CHARS', 60))  # 긴 질문은 LLM 분석
         )
 
 
-# 전역 설정 인스턴스
-config = YouthPolicyRAGConfig()
+# 전역 설정 인스턴스 (처음 사용할 때 생성 - import만으로 LLM 클라이언트/DB 연결을 만들지 않음)
+_config: Optional[YouthPolicyRAGConfig] = None
+_config_lock = threading.Lock()
 
 
-def analyze_query_node(state: GraphState) -> GraphState:
-    """질의 분석 노드 - 분류와 조건 추출을 동시에 수행"""
+def get_config() -> YouthPolicyRAGConfig:
+    """전역 설정 (여러 스레드가 동시에 처음 호출해도 한 번만 생성)"""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = YouthPolicyRAGConfig()
+    return _config
+
+
+def db_pool_stats():
+    """Prometheus 수집용 커넥션 풀 지표 (설정 생성 전이면 없음 - 수집만으로 설정을 만들지 않음)"""
+    if _config is None:
+        return []
+    return [("sync", _config.db_pool.stats()), ("async", _config.async_db_pool.stats())]
+
+
+def cache_stats():
+    """Prometheus 수집용 질의 분석/답변 캐시 지표"""
+    if _config is None:
+        return []
+    return [("query_analysis", _config.query_cache.stats()), ("response", _config.response_cache.stats())]
+
+
+DB_POOL_STATS.set_source(db_pool_stats)
+CACHE_STATS.set_source(cache_stats)
+
+
+def get_last_user_message(state: GraphState) -> str:
+    """메시지에서 마지막 사용자 메시지 추출"""
+    for message in reversed(state["messages"]):
+        if isinstance(message, HumanMessage):
+            return message.content
+    raise ValueError("사용자 메시지를 찾을 수 없습니다.")
+
+
+def _stored_analysis(payload: Optional[Dict[str, Any]]) -> Optional[QueryAnalysis]:
+    """Message.query_analysis -> QueryAnalysis (저장 후 스키마가 바뀌어 검증에 실패하면 None)"""
+    if not payload:
+        return None
     try:
-        logger.info("질의 분석 시작 (분류 + 조건 추출)")
-        
-        # 메시지에서 마지막 사용자 메시지 추출
-        user_message = None
-        for message in reversed(state["messages"]):
-            if isinstance(message, HumanMessage):
-                user_message = message.content
-                break
-        
-        if not user_message:
-            raise ValueError("사용자 메시지를 찾을 수 없습니다.")
-        
-        # 통합 프롬프트 템플릿 정의
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """당신은 청년정책 질의 분석 전문가입니다. 
+        return QueryAnalysis.model_validate(payload)
+    except ValueError as e:
+        logger.warning(f"이전 턴 질의 분석 결과를 사용할 수 없음: {e}")
+        return None
+
+
+def conversation_state(rows: List[Dict[str, Any]], summary: Optional[str]) -> GraphState:
+    """
+    세션의 요약되지 않은 메시지(오래된 순) + 누적 요약 -> 그래프 입력 상태 (현재 질문 메시지는 호출 측에서 추가)
+    - 최근 메시지는 memory_token_budget 안에서 messages로, 이전 턴 분석/선정 정책은 후속 질문 재사용용
+    """
+    config = get_config()
+    previous_analysis, previous_policies = previous_turn(rows)
+    return {
+        "messages": history_messages(rows[-config.memory_max_messages:], config.memory_token_budget, config.memory_message_tokens),
+        "conversation_summary": summary or None,
+        "previous_analysis": _stored_analysis(previous_analysis),
+        "previous_policies": previous_policies,
+    }
+
+
+def conversation_messages(state: GraphState) -> List[BaseMessage]:
+    """현재 질문 이전의 대화 메시지"""
+    messages = state["messages"]
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[:i]
+    return []
+
+
+def has_conversation(state: GraphState) -> bool:
+    """이전 대화가 있는 질문인지"""
+    return bool(state.get("conversation_summary") or conversation_messages(state))
+
+
+def depends_on_conversation(state: GraphState) -> bool:
+    """
+    이전 대화 맥락에 따라 해석이 달라지는 질문인지 (지시어/후속 질문 표현)
+    - 맥락 의존 질문만 사전 분류와 캐시를 우회하고, 단독으로 해석되는 질문은 대화 중에도 질문 기준으로 캐시 사용
+    """
+    return has_conversation(state) and refers_to_context(get_last_user_message(state))
+
+
+def conversation_context(state: GraphState) -> str:
+    """프롬프트용 이전 대화 (누적 요약 + 최근 메시지)"""
+    return conversation_text(conversation_messages(state), state.get("conversation_summary"))
+
+
+@lru_cache(maxsize=1)
+def build_query_analysis_chain():
+    """질의 분석 체인 (분류 + 조건 추출 구조화 출력)"""
+    config = get_config()
+    # 통합 프롬프트 템플릿 정의
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", """당신은 청년정책 질의 분석 전문가입니다. 
 사용자의 질문을 분석하여 질의 분류와 개인 조건 추출을 동시에 수행해주세요.
 
 **1. 질의 분류 (lclsf_nm):**
@@ -261,27 +478,162 @@ def analyze_query_node(state: GraphState) -> GraphState:
 - 거주지는 "서울특별시", "대구광역시", "경상북도", "전북특별자치도", "강원특별자치도", "서울특별시 구로구", "경기도 수원시 팔달구" 의 형태로 추출
 - 소득은 "월소득 200만원 이하", "중위소득 150% 이하" 등의 형태로 추출
 - classification_confidence는 분류의 명확성을 기준으로 평가
-- extraction_confidence는 추출된 정보의 명확성과 완성도를 기준으로 평가"""),
-            ("human", "다음 질문을 분석해주세요: {query}")
-        ])
-        
-        # 구조화된 출력을 위한 체인 생성 (streaming 비활성화)
-        llm_no_stream = config.thinking_model.bind(stream=False)
-        structured_llm = llm_no_stream.with_structured_output(QueryAnalysis)
-        chain = prompt | structured_llm
+- extraction_confidence는 추출된 정보의 명확성과 완성도를 기준으로 평가
+
+**이전 대화:**
+- 이전 대화가 있으면 '그 정책', '거기', '신청 방법은?' 같은 후속 질문을 이전 대화 기준으로 해석
+- 이전 대화에서 안내한 정책에 대해 묻는 후속 질문의 의도는 '정책 상세 설명'"""),
+        ("human", "이전 대화:\n{conversation}\n\n다음 질문을 분석해주세요: {query}")
+    ])
+    
+    # 구조화된 출력을 위한 체인 생성 (streaming 비활성화)
+    llm_no_stream = config.thinking_model.bind(stream=False)
+    structured_llm = llm_no_stream.with_structured_output(QueryAnalysis)
+    return prompt | structured_llm
+
+
+# 후속 질문에서 이전 턴 분석 결과로 채우는 조건 필드
+CONDITION_FIELDS = (
+    "age", "mrg_stts_cd", "plcy_major_cd", "job_cd", "school_cd", "zip_cd", "earn_etc_cn", "additional_requirement",
+)
+
+
+def is_followup_detail(state: GraphState, query_analysis: Optional[QueryAnalysis]) -> bool:
+    """이전 턴에서 안내한 정책에 대한 상세 설명 후속 질문인지"""
+    return bool(
+        query_analysis and query_analysis.query_intent == "정책 상세 설명"
+        and state.get("previous_analysis") and state.get("previous_policies")
+    )
+
+
+def names_policy(state: GraphState) -> bool:
+    """질문이 대상 정책을 직접 가리킬 수 있는지 (정책 번호가 있거나, 지시어/순서로 이전 턴 정책을 가리키지 않음)"""
+    query = state["query"]
+    return bool(find_plcy_no(query)) or not refers_to_previous_policy(query)
+
+
+def with_previous_conditions(query_analysis: QueryAnalysis, previous_analysis: QueryAnalysis) -> QueryAnalysis:
+    """이번 질문에서 언급하지 않은 조건은 이전 턴 분석 결과 사용"""
+    updates = {
+        field: getattr(previous_analysis, field)
+        for field in CONDITION_FIELDS
+        if getattr(query_analysis, field) is None and getattr(previous_analysis, field) is not None
+    }
+    return query_analysis.model_copy(update=updates)
+
+
+def _query_analysis_state(state: GraphState, user_message: str, query_analysis: QueryAnalysis) -> GraphState:
+    """질의 분석 결과 로깅 후 상태 반환 (LLM 분석/캐시 적중/사전 분류 공통)"""
+    if is_followup_detail(state, query_analysis):
+        query_analysis = with_previous_conditions(query_analysis, state["previous_analysis"])
+        logger.info("정책 상세 설명 후속 질문 - 이전 턴 조건/선정 정책 재사용")
+    logger.info(f"질의 분석 완료: {query_analysis.lclsf_nm}/{query_analysis.mclsf_nm} (분류 신뢰도: {query_analysis.classification_confidence})")
+    logger.info(f"조건 추출 완료 (추출 신뢰도: {query_analysis.extraction_confidence})")
+    logger.info(f"추출된 조건: 나이={query_analysis.age}, 결혼상태={query_analysis.mrg_stts_cd}, 거주지={query_analysis.zip_cd}")
+    
+    return {
+        **state,
+        "query": user_message,
+        "query_analysis": query_analysis
+    }
+
+
+# 사전 분류 후 병렬로 실행하는 분기 (질의 분석 + 사전 조회)
+PARALLEL_BRANCHES = ("analyze_query", "prefetch_schema", "prefetch_policy_version", "prefetch_candidates", "prefetch_query_embedding")
+
+
+def preclassify_query_node(state: GraphState) -> GraphState:
+    """
+    질의 사전 분류 노드 (LLM/네트워크 호출 없음, 병렬 분기 전에 실행)
+    - 주제 외 질문은 바로 거부, 명확한 주거/일자리 질문은 규칙 분석 결과로 LLM 질의 분석 생략
+    - 이전 대화를 가리키는 질문(후속 질문 해석 필요)이거나 판단이 애매하면 LLM 질의 분석으로 진행
+    """
+    config = get_config()
+    if not config.preclassifier_enabled or depends_on_conversation(state):
+        return {}
+    user_message = get_last_user_message(state)
+    started = time.perf_counter()
+    result = config.preclassifier.classify(user_message)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    PRECLASSIFIER_DECISIONS.labels(decision=result.decision if result else "escalate").inc()
+    if result is None:
+        logger.info(f"사전 분류 보류 - LLM 질의 분석으로 진행 ({elapsed_ms:.2f}ms)")
+        return {}
+    logger.info(f"사전 분류: {result.decision} {result.lclsf_nm} ({result.reason}, {elapsed_ms:.2f}ms)")
+    return {
+        "query": user_message,
+        "query_analysis": QueryAnalysis(**result.analysis_fields()),
+        "preclassified": True
+    }
+
+
+def route_after_preclassification(state: GraphState) -> Union[str, List[str]]:
+    """사전 분류로 거부한 질문은 사전 조회 없이 거부 응답, 그 외는 병렬 분기"""
+    query_analysis = state.get("query_analysis")
+    if state.get("preclassified") and query_analysis.lclsf_nm in REJECT_LABELS:
+        return "reject_query"
+    return list(PARALLEL_BRANCHES)
+
+
+def _preclassified_state(state: GraphState, user_message: str) -> GraphState:
+    logger.info("사전 분류 결과 사용 - LLM 질의 분석 생략")
+    return _query_analysis_state(state, user_message, state["query_analysis"])
+
+
+def use_query_cache(state: GraphState) -> bool:
+    """질의 분석 캐시 사용 여부 (전역 설정 + 요청별 cache_bypass)"""
+    config = get_config()
+    if not config.query_cache_enabled or depends_on_conversation(state):
+        return False
+    if state.get("cache_bypass"):
+        config.query_cache.record_bypass()
+        return False
+    return True
+
+
+async def embed_query_for_cache(query: str) -> Optional[List[float]]:
+    """캐시 비교용 질문 임베딩 (실패 시 None -> 텍스트 일치로만 캐시 사용)"""
+    config = get_config()
+    try:
+        return await config.query_embeddings.aembed_query(query)
+    except Exception as e:
+        logger.warning(f"질의 임베딩 생성 실패, 유사 질문 캐시 건너뜀: {e}")
+        return None
+
+
+async def analyze_query_node(state: GraphState) -> GraphState:
+    """질의 분석 노드 - 분류와 조건 추출을 동시에 수행"""
+    config = get_config()
+    try:
+        logger.info("질의 분석 시작 (분류 + 조건 추출)")
+        user_message = get_last_user_message(state)
+        if state.get("preclassified"):
+            return _preclassified_state(state, user_message)
         
-        # 질의 분석 실행
-        query_analysis = chain.invoke({"query": user_message})
+        inputs = {"query": user_message, "conversation": conversation_context(state)}
+        if not use_query_cache(state):
+            return _query_analysis_state(state, user_message, await build_query_analysis_chain().ainvoke(inputs))
         
-        logger.info(f"질의 분석 완료: {query_analysis.lclsf_nm}/{query_analysis.mclsf_nm} (분류 신뢰도: {query_analysis.classification_confidence})")
-        logger.info(f"조건 추출 완료 (추출 신뢰도: {query_analysis.extraction_confidence})")
-        logger.info(f"추출된 조건: 나이={query_analysis.age}, 결혼상태={query_analysis.mrg_stts_cd}, 거주지={query_analysis.zip_cd}")
+        cached = config.query_cache.get_exact(user_message)
+        if cached is not None:
+            logger.info("질의 분석 캐시 적중 - LLM 호출 생략")
+            return _query_analysis_state(state, user_message, cached.model_copy(deep=True))
         
-        return {
-            **state,
-            "query": user_message,
-            "query_analysis": query_analysis
-        }
+        # 텍스트 불일치 시 유사 질문 비교용 임베딩과 LLM 질의 분석을 동시에 시작 (유사 질문 적중 시 분석 취소)
+        analysis_task = asyncio.create_task(build_query_analysis_chain().ainvoke(inputs))
+        try:
+            embedding = await embed_query_for_cache(user_message)
+            cached = config.query_cache.get_similar(user_message, embedding)
+            if cached is not None:
+                logger.info("질의 분석 유사 질문 캐시 적중 - LLM 질의 분석 취소")
+                return _query_analysis_state(state, user_message, cached.model_copy(deep=True))
+            query_analysis = await analysis_task
+        finally:
+            analysis_task.cancel()
+            # 유사 질문 적중 전에 끝난 분석의 예외는 사용하지 않음 (미확인 예외 경고 방지)
+            analysis_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        config.query_cache.set(user_message, embedding, query_analysis.model_copy(deep=True))
+        return _query_analysis_state(state, user_message, query_analysis)
         
     except Exception as e:
         logger.error(f"질의 분석 실패: {e}")
@@ -291,8 +643,114 @@ def analyze_query_node(state: GraphState) -> GraphState:
         }
 
 
-def route_after_analysis(state: GraphState) -> Literal["continue", "reject"]:
-    """분석 결과에 따른 라우팅 결정"""
+async def run_branch(name: str, coroutine, state: GraphState, on_timeout):
+    """분기 노드를 제한 시간 안에 실행 - 시간 초과 시 작업을 취소하고 on_timeout(state) 반환"""
+    config = get_config()
+    timeout = config.branch_timeouts.get(name)
+    try:
+        return await asyncio.wait_for(coroutine, timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"{name} 분기 시간 초과 ({timeout}초)")
+        return on_timeout(state)
+
+
+def _analysis_timeout_state(state: GraphState) -> GraphState:
+    return {"error": "질의 분석 시간이 초과되었습니다."}
+
+
+def _no_update(state: GraphState) -> GraphState:
+    return {}
+
+
+async def analyze_query_branch(state: GraphState) -> GraphState:
+    """질의 분석 분기 (제한 시간 적용)"""
+    return await run_branch("analyze_query", analyze_query_node(state), state, _analysis_timeout_state)
+
+
+async def prefetch_schema_node(state: GraphState) -> GraphState:
+    """
+    스키마 스냅샷 미리 로드 (LLM SQL 생성 경로에서 바로 사용) - 스냅샷 조회는 동기 풀을 사용하므로 스레드에서 실행
+    - 스냅샷이 최신이거나 다른 요청이 이미 조회 중이면 건너뜀
+      (시간 초과로 남겨진 조회 스레드가 요청마다 쌓이지 않도록 동시에 최대 하나만 실행)
+    """
+    config = get_config()
+    if schema_snapshot_fresh(config) or _schema_cache_lock.locked():
+        return {}
+    await run_branch("prefetch_schema", asyncio.to_thread(get_cached_postgresql_schema, config), state, _no_update)
+    return {}
+
+
+def _use_response_cache(state: GraphState) -> bool:
+    return get_config().response_cache_enabled and not state.get("cache_bypass") and not depends_on_conversation(state)
+
+
+async def prefetch_policy_version_node(state: GraphState) -> GraphState:
+    """답변 캐시용 정책 데이터 버전 미리 조회 (check_response_cache에서 DB 왕복 없이 사용)"""
+    config = get_config()
+    if _use_response_cache(state):
+        await run_branch("prefetch_policy_version", get_policy_data_version(config), state, _no_update)
+    return {}
+
+
+def _candidate_state(sql_result: Dict[str, Any]) -> GraphState:
+    if not sql_result["success"]:
+        return {}
+    logger.info(f"사전 검색 완료: {sql_result['row_count']}개 후보")
+    return {"candidate_policies": sql_result["data"]}
+
+
+def _uses_candidates(config) -> bool:
+    """
+    사전 검색 결과를 쓰는 설정인지 여부
+    - trigram 템플릿 검색: 키워드 일치 정책이 부족하면 similarity 재검색 대신 사전 검색 결과로 보충
+    - LLM SQL 생성: 생성한 쿼리가 실패하면 대체 결과로 사용
+    - 그 외 템플릿 검색은 실패 시에만 쓰이므로 요청마다 DB를 조회하지 않음
+    """
+    if config.sql_generation_mode == "llm":
+        return True
+    return config.retrieval_mode == "trigram"
+
+
+async def prefetch_candidates_node(state: GraphState) -> GraphState:
+    """질문 원문으로 trigram 사전 검색 (질의 분석과 병렬 실행, 사전 검색 결과를 쓰는 설정에서만)"""
+    config = get_config()
+    if not _uses_candidates(config):
+        return {}
+    async def fetch():
+        sql_query, params = build_candidate_query(get_last_user_message(state), config.candidate_limit, config.retrieval_mode)
+        return _candidate_state(await execute_postgresql_query(config, sql_query, params))
+    return await run_branch("prefetch_candidates", fetch(), state, _no_update)
+
+
+def _query_embedding_state(embedding: Optional[List[float]]) -> GraphState:
+    return {"query_embedding": embedding} if embedding else {}
+
+
+async def prefetch_query_embedding_node(state: GraphState) -> GraphState:
+    """hybrid 검색용 질문 임베딩 생성 (질의 분석과 병렬 실행, 실패/시간 초과 시 키워드 검색만 사용)"""
+    config = get_config()
+    if config.retrieval_mode != "hybrid":
+        return {}
+    async def embed():
+        try:
+            return _query_embedding_state(await config.policy_embeddings.aembed_query(get_last_user_message(state)))
+        except Exception as e:
+            logger.warning(f"검색용 질문 임베딩 생성 실패: {e}")
+            return {}
+    return await run_branch("prefetch_query_embedding", embed(), state, _no_update)
+
+
+def join_branches_node(state: GraphState) -> GraphState:
+    """병렬 분기(질의 분석 + 사전 조회) 합류 지점"""
+    return {}
+
+
+def route_after_analysis(state: GraphState) -> Literal["continue", "followup", "detail", "reject"]:
+    """
+    분석 결과에 따른 라우팅 결정
+    - 정책 상세 설명: 정책 번호/정책명 조회(detail)를 먼저 시도하고, 지시어로 이전 턴 정책만 가리키는
+      후속 질문은 바로 이전 턴 정책 조회(followup)로 진행 (모두 검색 생략)
+    """
     if state.get("error"):
         return "reject"
     
@@ -302,89 +760,425 @@ def route_after_analysis(state: GraphState) -> Literal["continue", "reject"]:
     # 주거 또는 일자리 관련이고 신뢰도가 임계값 이상인 경우만 계속 진행
     if query_analysis.lclsf_nm in ["주거", "일자리", "일반"]:
         logger.info(f"질의 승인: {query_analysis.lclsf_nm} (분류 신뢰도: {query_analysis.classification_confidence})")
-        return "continue"
+        if query_analysis.query_intent != "정책 상세 설명":
+            return "continue"
+        if is_followup_detail(state, query_analysis) and not names_policy(state):
+            return "followup"
+        return "detail"
     else:
         logger.info(f"질의 거부: {query_analysis.lclsf_nm} (분류 신뢰도: {query_analysis.classification_confidence})")
         return "reject"
 
 
 
-def generate_sql_query_node(state: GraphState) -> GraphState:
+# 정책 데이터 버전 조회 (적재 작업이 policies upsert 시 증가시킴)
+POLICY_DATA_VERSION_QUERY = "SELECT version FROM policy_data_version WHERE id = 1"
+
+# 프로세스 전역 정책 데이터 버전 (policy_version_check_interval 동안 재사용)
+_policy_version_cache = {
+    "version": None,
+    "checked_at": None,  # 마지막 확인 시각 (monotonic)
+}
+_policy_version_lock = threading.Lock()
+
+
+def _recent_policy_data_version():
+    """확인 주기 안에 조회한 버전이 있으면 (True, 버전)"""
+    config = get_config()
+    with _policy_version_lock:
+        checked_at = _policy_version_cache["checked_at"]
+        if checked_at is not None and time.monotonic() - checked_at < config.policy_version_check_interval:
+            return True, _policy_version_cache["version"]
+    return False, None
+
+
+def _remember_policy_data_version(version: Optional[int]):
+    """조회한 버전 저장, 버전이 바뀌었으면 이전 버전 답변 캐시 무효화"""
+    config = get_config()
+    with _policy_version_lock:
+        changed = version != _policy_version_cache["version"]
+        _policy_version_cache.update({"version": version, "checked_at": time.monotonic()})
+    if changed and version is not None:
+        config.response_cache.invalidate_except(version)
+
+
+async def get_policy_data_version(config) -> Optional[int]:
+    """현재 정책 데이터 버전 (조회 실패 시 None -> 답변 캐시 사용 안 함)"""
+    fresh, version = _recent_policy_data_version()
+    if fresh:
+        return version
+    try:
+        async with config.async_db_pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(POLICY_DATA_VERSION_QUERY)
+                row = await cursor.fetchone()
+        version = row["version"] if row else None
+    except Exception as e:
+        logger.warning(f"정책 데이터 버전 조회 실패, 답변 캐시 건너뜀: {e}")
+        version = None
+    _remember_policy_data_version(version)
+    return version
+
+
+def _eligibility_refresh_result(engine, sql_result: Dict[str, Any], version: Optional[int], full: bool):
+    if not sql_result["success"]:
+        logger.warning(f"자격 조건 비트맵 갱신 실패, 이전 인덱스 사용: {sql_result['error']}")
+        return engine.index
+    return engine.apply(sql_result["data"], version, full)
+
+
+async def get_eligibility_index(config):
+    """
+    현재 정책 데이터 버전의 자격 조건 비트맵 (없으면 None -> SQL 조건 필터 사용)
+    - 다른 요청이 갱신 중이면 기다리지 않고 이전 인덱스 사용
+    """
+    engine = config.eligibility_engine
+    version = await get_policy_data_version(config)
+    if not engine.needs_refresh(version) or not engine.begin_refresh():
+        return engine.index
+    try:
+        sql_query, params = engine.refresh_query()
+        return _eligibility_refresh_result(engine, await execute_postgresql_query(config, sql_query, params), version, params is None)
+    finally:
+        engine.end_refresh()
+
+
+def _eligible_plcy_nos(index, query_analysis) -> Optional[List[str]]:
+    """비트맵으로 계산한 대상 정책 번호 (비활성화/인덱스 없음이면 None)"""
+    if index is None:
+        return None
+    eligible = index.eligible(query_analysis)
+    logger.info(f"자격 조건 비트맵: 대상 정책 {len(eligible)}/{index.size}개")
+    return eligible
+
+
+async def eligible_plcy_nos(config, query_analysis) -> Optional[List[str]]:
+    if not config.eligibility_filter_enabled:
+        return None
+    return _eligible_plcy_nos(await get_eligibility_index(config), query_analysis)
+
+
+def _loggable_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """로그용 파라미터 (대상 정책 번호 목록은 개수, 질문 임베딩은 생략으로 표시)"""
+    loggable = dict(params)
+    if "eligible_plcy_nos" in loggable:
+        loggable["eligible_plcy_nos"] = f"<{len(loggable['eligible_plcy_nos'])}개>"
+    if "query_embedding" in loggable:
+        loggable["query_embedding"] = "<임베딩>"
+    return loggable
+
+
+def _response_cache_lookup(state: GraphState, version: Optional[int]) -> GraphState:
+    """답변 캐시 조회 - 적중 시 캐시된 결과와 final_response를 상태에 반영"""
+    config = get_config()
+    if version is None:
+        return {**state, "response_cache_key": None, "policy_data_version": None}
+    
+    key = response_cache_key(
+        state["query_analysis"],
+        top_k=config.top_k,
+        sql_generation_mode=config.sql_generation_mode,
+        response_generation_mode=config.response_generation_mode
+    )
+    cached = config.response_cache.get(key, version)
+    if cached is None:
+        return {**state, "response_cache_key": key, "policy_data_version": version}
+    
+    logger.info(f"답변 캐시 적중 (정책 데이터 버전 {version}) - 검색/답변 생성 생략")
+    return {
+        **state,
+        **cached,
+        "messages": state["messages"] + [AIMessage(content=cached["final_response"])],
+        "response_cache_key": key,
+        "policy_data_version": version
+    }
+
+
+async def check_response_cache_node(state: GraphState) -> GraphState:
+    """답변 캐시 조회 노드"""
+    config = get_config()
+    if not _use_response_cache(state):
+        return {**state, "response_cache_key": None}
+    return _response_cache_lookup(state, await get_policy_data_version(config))
+
+
+def route_after_cache(state: GraphState) -> Literal["cached", "search"]:
+    """답변 캐시 적중 시 바로 종료"""
+    return "cached" if state.get("final_response") else "search"
+
+
+def store_response_cache(state: GraphState):
+    """생성된 답변을 캐시에 저장 (캐시 조회 시점의 데이터 버전으로 저장)"""
+    config = get_config()
+    key = state.get("response_cache_key")
+    if not key or state.get("error") or not state.get("final_response"):
+        return
+    config.response_cache.set(key, state["policy_data_version"], {
+        "generated_sql": state.get("generated_sql"),
+        "sql_result": state.get("sql_result"),
+        "selected_policies": state.get("selected_policies"),
+        "final_response": state["final_response"]
+    })
+
+
+def _sql_result_state(state: GraphState, sql_query: str, sql_result: Dict[str, Any], explanation: str) -> GraphState:
+    """쿼리 실행 결과를 상태에 반영 - 쿼리 생성 근거는 로그로만 남김"""
+    logger.info(f"쿼리 실행 완료 ({explanation}): {sql_result['row_count']}개 결과 반환")
+    return {
+        **state,
+        "generated_sql": sql_query,
+        "sql_result": sql_result['data']
+    }
+
+
+def _needs_similarity_fallback(query_analysis, sql_result: Dict[str, Any]) -> bool:
+    """trigram 방식에서 키워드가 일치하는 정책이 top_k의 절반 미만이면 보충 (사전 검색 결과 또는 similarity 재검색)"""
+    config = get_config()
+    if not (sql_result["success"] and uses_trigram(query_analysis, config.retrieval_mode)):
+        return False
+    if sql_result["row_count"] >= max(1, config.top_k // 2):
+        return False
+    logger.info(f"키워드 일치 정책 {sql_result['row_count']}개 - 검색 결과 보충")
+    return True
+
+
+def _merge_candidate_result(state: GraphState, sql_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """trigram 검색 결과를 사전 검색 결과로 보충 (보충할 후보가 없으면 None -> similarity 재검색)"""
+    config = get_config()
+    merged = merge_candidates(sql_result["data"], state.get("candidate_policies"), state["query_analysis"], config.top_k)
+    if len(merged) == sql_result["row_count"]:
+        return None
+    logger.info(f"사전 검색 결과 {len(merged) - sql_result['row_count']}개로 보충")
+    return {**sql_result, "data": merged, "row_count": len(merged)}
+
+
+def _candidate_fallback_state(state: GraphState) -> Optional[GraphState]:
+    """검색 쿼리가 실패한 경우 사전 검색 결과에 조건을 적용해 대체 결과로 사용"""
+    config = get_config()
+    candidates = state.get("candidate_policies")
+    if not candidates:
+        return None
+    refined = refine_candidates(candidates, state["query_analysis"], config.top_k)
+    logger.warning(f"검색 실패 - 사전 검색 결과 {len(refined)}개로 대체")
+    return _sql_result_state(state, None, {"data": refined, "row_count": len(refined)}, "사전 검색 결과로 대체")
+
+
+def _previous_policies_state(state: GraphState, sql_query: str, sql_result: Dict[str, Any]) -> GraphState:
+    """이전 턴 정책 조회 결과 반영 (실패/결과 없음이면 검색 경로로 진행)"""
+    if not sql_result["success"] or not sql_result["data"]:
+        logger.warning("이전 턴 선정 정책 조회 실패 - 정책 검색으로 진행")
+        return {}
+    return _sql_result_state(state, sql_query, sql_result, "이전 턴 선정 정책")
+
+
+async def load_previous_policies_node(state: GraphState) -> GraphState:
+    """정책 상세 설명 후속 질문 - 이전 턴에서 선정한 정책을 기본 키로 조회 (SQL 생성/검색 생략)"""
+    config = get_config()
+    sql_query, params = build_policies_by_no_query([policy["plcy_no"] for policy in state["previous_policies"]])
+    return _previous_policies_state(state, sql_query, await execute_postgresql_query(config, sql_query, params))
+
+
+def route_after_policy_lookup(state: GraphState) -> Literal["answer", "search"]:
+    """이전 턴 정책을 조회했으면 바로 답변 생성, 아니면 일반 검색"""
+    return "answer" if state.get("sql_result") else "search"
+
+
+def route_after_policy_detail(state: GraphState) -> Literal["answer", "followup", "search"]:
+    """
+    상세 설명 대상 정책을 특정했으면 그 정책으로 답변
+    - 특정하지 못했으면 이전 턴 정책 후속 질문으로 처리하고, 이전 턴 정책이 없으면 일반 검색
+    """
+    if state.get("sql_result"):
+        return "answer"
+    if is_followup_detail(state, state["query_analysis"]):
+        logger.info("정책 상세 설명 대상을 특정하지 못함 - 이전 턴 선정 정책 사용")
+        return "followup"
+    return "search"
+
+
+def _policy_detail_state(state: GraphState, sql_query: str, sql_result: Dict[str, Any]) -> GraphState:
+    """정책 상세 조회 결과 -> 대상 정책 하나 (조회 실패/모호하면 일반 검색으로 진행)"""
+    config = get_config()
+    if not sql_result["success"]:
+        logger.warning(f"정책 상세 조회 실패 - 정책 검색으로 진행: {sql_result['error']}")
+        return {}
+    policy = resolve_policy_detail(sql_result["data"], config.detail_min_name_score, config.detail_min_name_margin)
+    if policy is None:
+        logger.info("정책 상세 설명 대상 정책을 특정할 수 없음 - 정책 검색으로 진행")
+        return {}
+    logger.info(f"정책 상세 조회: {policy['plcy_no']} {policy['plcy_nm']} (정책명 유사도 {policy['name_score']:.2f})")
+    return _sql_result_state(state, sql_query, {"data": [policy], "row_count": 1}, "정책 상세 조회")
+
+
+async def resolve_policy_detail_node(state: GraphState) -> GraphState:
+    """정책 상세 설명 질문 - 정책 번호 또는 정책명(trigram 거리)으로 대상 정책 조회 (SQL 생성/검색 생략)"""
+    config = get_config()
+    sql_query, params = build_policy_detail_query(state["query"], state["query_analysis"].query_keywords)
+    return _policy_detail_state(state, sql_query, await execute_postgresql_query(config, sql_query, params))
+
+
+async def generate_sql_query_node(state: GraphState) -> GraphState:
     """SQL 쿼리를 생성하고 실행하는 노드"""
+    config = get_config()
     try:
         logger.info("SQL 쿼리 생성 및 실행 시작")
         
         query_analysis = state["query_analysis"]
         query = state["query"]
         
-        try:
-            # 직접 SQL 쿼리 생성 체인 생성
-            sql_chain = create_direct_sql_chain(config, query_analysis, query_analysis)
-            
-            # SQL 쿼리 생성
-            logger.info("SQL 쿼리 생성 중...")
-            sql_generation = sql_chain.invoke({"query": query})
-            
-            logger.info(f"생성된 SQL 쿼리: {sql_generation.sql_query}")
-            logger.info(f"쿼리 생성 근거: {sql_generation.explanation}")
-            
-            # SQL 쿼리 실행
-            logger.info("PostgreSQL 쿼리 실행 중...")
-            sql_result = execute_postgresql_query(config, sql_generation.sql_query)
-            
-            if not sql_result["success"]:
-                raise Exception(f"SQL 실행 실패: {sql_result['error']}")
-            
-            logger.info(f"쿼리 실행 완료: {sql_result['row_count']}개 결과 반환")
-            
-            return {
-                **state,
-                "generated_sql": sql_generation.sql_query,
-                "sql_result": sql_result['data'],
-                "sql_explanation": sql_generation.explanation
-            }
-            
-        except Exception as e:
-            logger.error(f"SQL 쿼리 처리 실패: {e}")
-            error_message = f"정책 검색 중 오류가 발생했습니다: {str(e)}"
-            return {
-                **state,
-                "error": error_message
-            }
+        # 1. 쿼리 빌더로 바인드 파라미터 쿼리 생성 및 실행 (LLM 호출 없음)
+        if config.sql_generation_mode == "template":
+            try:
+                eligible = await eligible_plcy_nos(config, query_analysis)
+                sql_query, params = build_policy_search_query(
+                    query_analysis, config.top_k, config.retrieval_mode, eligible,
+                    state.get("query_embedding"), config.embedding_search_dimensions
+                )
+                logger.info(f"템플릿 SQL 쿼리: {sql_query} / 파라미터: {_loggable_params(params)}")
+                
+                sql_result = await execute_postgresql_query(config, sql_query, params)
+                if _needs_similarity_fallback(query_analysis, sql_result):
+                    merged = _merge_candidate_result(state, sql_result)
+                    if merged is not None:
+                        return _sql_result_state(state, sql_query, merged, "쿼리 빌더 + 사전 검색 보충")
+                    sql_query, params = build_policy_search_query(query_analysis, config.top_k, eligible_plcy_nos=eligible)
+                    sql_result = await execute_postgresql_query(config, sql_query, params)
+                if sql_result["success"]:
+                    return _sql_result_state(state, sql_query, sql_result, "쿼리 빌더로 생성")
+                logger.warning(f"템플릿 쿼리 실행 실패, LLM 쿼리 생성으로 대체: {sql_result['error']}")
+            except Exception as e:
+                logger.warning(f"템플릿 쿼리 생성 실패, LLM 쿼리 생성으로 대체: {e}")
+        
+        # 2. LLM 기반 SQL 쿼리 생성 (대체 경로)
+        # 스키마 스냅샷 조회는 동기 풀을 사용하므로 스레드에서 실행 (캐시 적중 시 DB 조회 없음)
+        sql_inputs = await asyncio.to_thread(direct_sql_inputs, config, query_analysis, query_analysis, query)
+        sql_generation = await build_direct_sql_chain().ainvoke(sql_inputs)
+        
+        logger.info(f"생성된 SQL 쿼리: {sql_generation.sql_query}")
+        logger.info(f"쿼리 생성 근거: {sql_generation.explanation}")
+        
+        sql_result = await execute_generated_query(config, sql_generation.sql_query)
+        if not sql_result["success"]:
+            raise Exception(f"SQL 실행 실패: {sql_result['error']}")
+        
+        return _sql_result_state(state, sql_generation.sql_query, sql_result, sql_generation.explanation)
         
     except Exception as e:
-        logger.error(f"SQL 쿼리 노드 실행 실패: {e}")
+        logger.error(f"SQL 쿼리 처리 실패: {e}")
+        candidate_state = _candidate_fallback_state(state)
+        if candidate_state:
+            return candidate_state
         return {
             **state,
-            "error": f"SQL 쿼리 생성 중 오류가 발생했습니다: {str(e)}"
+            "error": f"정책 검색 중 오류가 발생했습니다: {str(e)}"
         }
 
 
-def generate_response_node(state: GraphState) -> GraphState:
-    """SQL 쿼리 결과를 바탕으로 자연어 응답을 생성하는 노드"""
-    try:
-        logger.info("자연어 응답 생성 시작")
-        
-        # 에러가 있는 경우 에러 메시지 반환
-        if state.get("error"):
-            ai_message = AIMessage(content=state["error"])
-            return {
-                **state,
-                "messages": state["messages"] + [ai_message]
-            }
+# 답변 생성 가이드라인 (2단계/단일 호출 방식 공통)
+RESPONSE_GUIDELINES = """**답변 가이드라인:**
+1. 검색 결과를 바탕으로 정확한 정보를 제공하세요
+2. 정책명, 지원내용, 신청방법 등을 구체적으로 안내하세요
+3. 사용자의 조건에 맞는 정책을 우선적으로 추천하세요
+4. 검색 결과가 없거나 부족한 경우 그 이유를 설명하세요
+5. 친근하고 도움이 되는 톤으로 답변하세요
+6. 필요시 추가 문의 방법이나 관련 기관 정보를 제공하세요
+7. 답변 시 markdown 형식을 사용하여 가독성을 높이세요
+8. 적절한 이모지를 사용하여 답변을 더 친근하게 만드세요
+9. 주거정책과 일자리 정책을 구분하여 답변하세요
+10. 2개 이상의 정책목록 나열 시 구분할 수 있도록 정책 앞과 뒤에 --- 형태로 구분하세요
+"""
+
+# 단일 호출 방식에서 답변 첫 줄에 선정 정책 번호를 출력하도록 하는 접두어
+SELECTION_PREFIX = "선정 정책:"
+
+# 사용자에게 스트리밍할 최종 답변 LLM 호출에 붙이는 태그 (graph.stream의 messages 모드에서 필터링용)
+ANSWER_STREAM_TAG = "final_answer"
+
+
+def selected_policies_from_rows(sql_result: List[Dict[str, Any]], plcy_nos: List[str]) -> List[Dict[str, Any]]:
+    """선정된 정책 번호 순서대로 검색 결과 행에서 SelectedPolicy 형태의 딕셔너리 생성"""
+    rows_by_no = {str(row.get('plcy_no')): row for row in sql_result or []}
+    selected = []
+    for plcy_no in plcy_nos:
+        row = rows_by_no.get(plcy_no)
+        if row is None:
+            # 검색 결과에 없는 정책 번호는 무시
+            continue
+        selected.append(SelectedPolicy(
+            plcy_no=str(row.get('plcy_no')),
+            plcy_nm=row.get('plcy_nm') or "",
+            plcy_expln_nm=row.get('plcy_expln_cn') or "",
+            lclsf_nm=row.get('lclsf_nm') or "",
+            mclsf_nm=row.get('mclsf_nm') or "",
+            zip_cd=row.get('zip_cd') or "",
+            inq_cnt=row.get('inq_cnt') or 0
+        ).model_dump())
+    return selected
+
+
+def parse_selection_prefix(content: str):
+    """
+    단일 호출 응답을 (선정 정책 번호 목록, 답변 본문)으로 분리
+    - 첫 줄이 '선정 정책: 번호, 번호' 형태가 아니면 전체를 답변으로 간주
+    """
+    first_line, _, rest = content.lstrip().partition("\n")
+    if not first_line.startswith(SELECTION_PREFIX):
+        return [], content
+    
+    numbers = first_line[len(SELECTION_PREFIX):].replace("없음", "")
+    plcy_nos = [number.strip() for number in numbers.split(",") if number.strip()]
+    return plcy_nos, rest.lstrip("\n")
+
+
+class SelectionPrefixFilter:
+    """
+    스트리밍 토큰에서 첫 줄의 '선정 정책: ...' 접두어를 제거하는 필터
+    - 접두어가 없는 응답(2단계 방식 등)은 그대로 통과
+    """
+    def __init__(self):
+        self._buffer = ""
+        self._passthrough = False
+        self._strip_leading = False  # 접두어 줄 다음의 빈 줄 제거 여부
+
+    def feed(self, text: str) -> str:
+        """토큰을 받아 사용자에게 보여줄 부분만 반환"""
+        if self._passthrough:
+            if self._strip_leading:
+                text = text.lstrip("\n")
+                self._strip_leading = not text
+            return text
         
-        query_analysis = state["query_analysis"]
-        query = state["query"]
-        sql_result = state.get("sql_result", [])
+        self._buffer += text
+        stripped = self._buffer.lstrip()
+        if len(stripped) < len(SELECTION_PREFIX) and SELECTION_PREFIX.startswith(stripped):
+            # 접두어인지 아직 판단할 수 없음
+            return ""
+        if not stripped.startswith(SELECTION_PREFIX):
+            self._passthrough = True
+            return self._buffer
+        if "\n" not in stripped:
+            # 접두어 줄이 끝날 때까지 대기
+            return ""
         
-        # 1단계: 정책 선정을 위한 LLM 호출
-        policy_selection_prompt = ChatPromptTemplate.from_messages([
-            ("system", """당신은 청년정책 전문가입니다. 
+        self._passthrough = True
+        self._strip_leading = True
+        _, _, rest = stripped.partition("\n")
+        return self.feed(rest)
+
+
+@lru_cache(maxsize=1)
+def build_policy_selection_prompt() -> ChatPromptTemplate:
+    """2단계 방식 1단계: 정책 선정 프롬프트"""
+    return ChatPromptTemplate.from_messages([
+        ("system", """당신은 청년정책 전문가입니다. 
 검색된 정책 데이터를 분석하여 사용자의 질문과 조건에 가장 적합한 정책들을 선정해주세요.
 
 **사용자 질문:** {user_query}
 **사용자 조건:** {user_conditions}
-**검색된 정책 데이터:** {search_data}
+**이전 대화:**
+{conversation}
+**검색된 정책 데이터 (TSV, 첫 줄은 컬럼명):**
+{search_data}
 
 **정책 선정 가이드라인:**
 1. 사용자의 조건(나이, 거주지, 학력, 취업상태 등)에 가장 적합한 정책을 우선 선정
@@ -397,79 +1191,341 @@ def generate_response_node(state: GraphState) -> GraphState:
 - 검색 결과에서 실제 존재하는 정책만 선정
 - 정책 정보는 검색 결과에서 정확히 추출
 - mclsf_nm이 null인 경우 빈 문자열로 처리"""),
-            ("human", "위 검색 결과에서 사용자에게 적합한 정책들을 선정해주세요.")
-        ])
-        
-        # 정책 선정을 위한 구조화된 LLM 체인
-        llm_no_stream = config.thinking_model.bind(stream=False)
-        policy_selection_llm = llm_no_stream.with_structured_output(PolicySelection)
-        policy_selection_chain = policy_selection_prompt | policy_selection_llm
-        
-        # 정책 선정 실행
-        policy_selection_result = policy_selection_chain.invoke({
-            "user_query": query,
-            "user_conditions": str(query_analysis),
-            "search_data": str(sql_result)
-        })
-        
-        logger.info(f"정책 선정 완료: {len(policy_selection_result.selected_policies)}개 정책 선정")
-        logger.info(f"선정 근거: {policy_selection_result.selection_reasoning}")
-        
-        # 3단계: 자연어 응답 생성
-        response_prompt = ChatPromptTemplate.from_messages([
-            ("system", """당신은 청년정책 전문 상담사입니다. 
+        ("human", "위 검색 결과에서 사용자에게 적합한 정책들을 선정해주세요.")
+    ])
+
+
+@lru_cache(maxsize=1)
+def build_policy_selection_chain():
+    """2단계 방식 1단계: 정책 선정 체인 (구조화 출력, streaming 비활성화)"""
+    config = get_config()
+    llm_no_stream = config.thinking_model.bind(stream=False)
+    chain = build_policy_selection_prompt() | llm_no_stream.with_structured_output(PolicySelection)
+    return chain.with_config(run_name=POLICY_SELECTION_STAGE)
+
+
+@lru_cache(maxsize=1)
+def build_two_stage_response_prompt() -> ChatPromptTemplate:
+    """2단계 방식 2단계: 선정된 정책으로 자연어 응답 생성 프롬프트"""
+    return ChatPromptTemplate.from_messages([
+        ("system", """당신은 청년정책 전문 상담사입니다. 
 데이터베이스 검색 결과를 바탕으로 사용자에게 도움이 되는 정확하고 친절한 답변을 제공해주세요.
 
 **분류 정보:** {classification_type}
 **사용자 질문:** {user_query}
-**검색된 데이터:** {search_data}
+**이전 대화:**
+{conversation}
+**검색된 데이터 (TSV, 첫 줄은 컬럼명):**
+{search_data}
 **선정된 정책:** {selected_policies}
 
+""" + RESPONSE_GUIDELINES),
+        ("human", "위 검색 결과를 바탕으로 사용자 질문에 대한 답변을 생성해주세요.")
+    ])
+
+
+@lru_cache(maxsize=1)
+def build_two_stage_response_chain():
+    """2단계 방식 2단계: 응답 생성 체인 (스트리밍 태그 포함)"""
+    config = get_config()
+    chain = build_two_stage_response_prompt() | config.chat_llm.with_config(tags=[ANSWER_STREAM_TAG])
+    return chain.with_config(run_name=RESPONSE_GENERATION_STAGE)
+
+
+def policy_selection_inputs(query_analysis, query: str, sql_result, conversation: str = NO_CONVERSATION) -> Dict[str, Any]:
+    """정책 선정 프롬프트 입력 (선정에 필요한 컬럼만 직렬화)"""
+    config = get_config()
+    selection_data, selection_tokens = serialize_policies(sql_result, SELECTION_FIELDS, config.context_token_budget)
+    logger.info(f"정책 선정 컨텍스트: {selection_tokens} 토큰")
+    return {
+        "user_query": query,
+        "user_conditions": str(query_analysis),
+        "conversation": conversation,
+        "search_data": selection_data
+    }
+
+
+def two_stage_response_inputs(query_analysis, query: str, sql_result, policy_selection_result, conversation: str = NO_CONVERSATION):
+    """정책 선정 결과 -> (선정 정책 목록, 응답 프롬프트 입력)"""
+    config = get_config()
+    logger.info(f"정책 선정 완료: {len(policy_selection_result.selected_policies)}개 정책 선정")
+    logger.info(f"선정 근거: {policy_selection_result.selection_reasoning}")
+    
+    selected_policies = [policy.model_dump() for policy in policy_selection_result.selected_policies]
+    answer_data, answer_tokens = serialize_policies(sql_result, ANSWER_FIELDS, config.context_token_budget)
+    logger.info(f"답변 생성 컨텍스트: {answer_tokens} 토큰")
+    return selected_policies, {
+        "classification_type": query_analysis.lclsf_nm,
+        "user_query": query,
+        "conversation": conversation,
+        "search_data": answer_data,
+        "selected_policies": str(selected_policies)
+    }
+
+
+async def generate_two_stage_response(query_analysis, query: str, sql_result, conversation: str = NO_CONVERSATION):
+    """2단계 방식: 정책 선정(구조화 출력) 후 자연어 응답 생성 - (선정 정책 목록, 답변) 반환"""
+    policy_selection_result = await build_policy_selection_chain().ainvoke(
+        policy_selection_inputs(query_analysis, query, sql_result, conversation)
+    )
+    selected_policies, response_inputs = two_stage_response_inputs(
+        query_analysis, query, sql_result, policy_selection_result, conversation
+    )
+    
+    response_chain = build_two_stage_response_chain()
+    final_response = await response_chain.ainvoke(response_inputs)
+    
+    return selected_policies, final_response.content
+
+
+@lru_cache(maxsize=1)
+def build_single_call_prompt() -> ChatPromptTemplate:
+    """단일 호출 방식 프롬프트 - 첫 줄에 선정 정책 번호, 이후 markdown 답변"""
+    return ChatPromptTemplate.from_messages([
+        ("system", """당신은 청년정책 전문 상담사입니다. 
+데이터베이스 검색 결과에서 사용자의 질문과 조건에 가장 적합한 정책을 선정하고, 선정한 정책을 바탕으로 정확하고 친절한 답변을 제공해주세요.
+
+**분류 정보:** {classification_type}
+**사용자 질문:** {user_query}
+**사용자 조건:** {user_conditions}
+**이전 대화:**
+{conversation}
+**검색된 데이터 (TSV, 첫 줄은 컬럼명):**
+{search_data}
+
+**정책 선정 가이드라인:**
+1. 사용자의 조건(나이, 거주지, 학력, 취업상태 등)에 가장 적합한 정책을 우선 선정
+2. 사용자 질문의 키워드와 관련성이 높은 정책을 선정
+3. 최대 10개까지의 정책을 선정하며, 검색 결과에 실제 존재하는 정책만 선정
+
+""" + RESPONSE_GUIDELINES + """
+**출력 형식 (반드시 지켜주세요):**
+- 첫 줄: """ + SELECTION_PREFIX + """ 뒤에 선정한 정책의 plcy_no를 쉼표로 구분하여 출력 (선정한 정책이 없으면 '없음')
+  예) """ + SELECTION_PREFIX + """ 20250521005400110863, 20250609005400111048
+- 둘째 줄부터: 사용자에게 보여줄 markdown 답변"""),
+        ("human", "위 검색 결과를 바탕으로 정책을 선정하고 사용자 질문에 대한 답변을 생성해주세요.")
+    ])
+
+
+@lru_cache(maxsize=1)
+def build_single_call_chain():
+    """단일 호출 방식 응답 체인 (스트리밍 태그 포함)"""
+    config = get_config()
+    chain = build_single_call_prompt() | config.chat_llm.with_config(tags=[ANSWER_STREAM_TAG])
+    return chain.with_config(run_name=RESPONSE_GENERATION_STAGE)
+
+
+def single_call_inputs(query_analysis, query: str, sql_result, conversation: str = NO_CONVERSATION) -> Dict[str, Any]:
+    """단일 호출 프롬프트 입력"""
+    config = get_config()
+    search_data, context_tokens = serialize_policies(sql_result, ANSWER_FIELDS, config.context_token_budget)
+    logger.info(f"답변 생성 컨텍스트: {context_tokens} 토큰")
+    return {
+        "classification_type": query_analysis.lclsf_nm,
+        "user_query": query,
+        "user_conditions": str(query_analysis),
+        "conversation": conversation,
+        "search_data": search_data
+    }
+
+
+def parse_single_call_response(content: str, sql_result):
+    """단일 호출 응답 -> (선정 정책 목록, 답변)"""
+    plcy_nos, final_response = parse_selection_prefix(content)
+    selected_policies = selected_policies_from_rows(sql_result, plcy_nos)
+    logger.info(f"정책 선정 완료: {len(selected_policies)}개 정책 선정 (단일 호출)")
+    return selected_policies, final_response
+
+
+async def generate_single_call_response(query_analysis, query: str, sql_result, conversation: str = NO_CONVERSATION):
+    """단일 호출 방식: 정책 선정과 답변을 한 번의 LLM 호출로 생성 - (선정 정책 목록, 답변) 반환"""
+    response_chain = build_single_call_chain()
+    response = await response_chain.ainvoke(single_call_inputs(query_analysis, query, sql_result, conversation))
+    return parse_single_call_response(response.content, sql_result)
+
+
+@lru_cache(maxsize=1)
+def build_policy_detail_prompt() -> ChatPromptTemplate:
+    """정책 상세 설명 빠른 경로 프롬프트 (대상 정책 하나의 컬럼만 전달)"""
+    return ChatPromptTemplate.from_messages([
+        ("system", """당신은 청년정책 전문 상담사입니다.
+아래 정책 하나의 정보만을 바탕으로 사용자의 질문에 정확하고 간결하게 답변해주세요.
+
+**사용자 질문:** {user_query}
+**이전 대화:**
+{conversation}
+**정책 정보 (TSV, 첫 줄은 컬럼명):**
+{policy_data}
+
 **답변 가이드라인:**
-1. 검색 결과를 바탕으로 정확한 정보를 제공하세요
-2. 정책명, 지원내용, 신청방법 등을 구체적으로 안내하세요
-3. 사용자의 조건에 맞는 정책을 우선적으로 추천하세요
-4. 검색 결과가 없거나 부족한 경우 그 이유를 설명하세요
-5. 친근하고 도움이 되는 톤으로 답변하세요
-6. 필요시 추가 문의 방법이나 관련 기관 정보를 제공하세요
-7. 답변 시 markdown 형식을 사용하여 가독성을 높이세요
-8. 적절한 이모지를 사용하여 답변을 더 친근하게 만드세요
-9. 주거정책과 일자리 정책을 구분하여 답변하세요
-10. 2개 이상의 정책목록 나열 시 구분할 수 있도록 정책 앞과 뒤에 --- 형태로 구분하세요
-"""),
-            ("human", "위 검색 결과를 바탕으로 사용자 질문에 대한 답변을 생성해주세요.")
-        ])
-        
-        response_chain = response_prompt | config.chat_llm
-        final_response = response_chain.invoke({
-            "classification_type": query_analysis.lclsf_nm,
-            "user_query": query,
-            "search_data": str(sql_result),
-            "selected_policies": str([policy.model_dump() for policy in policy_selection_result.selected_policies])
-        })
+1. 질문에서 묻는 항목(지원내용, 지원대상, 신청방법, 신청기간 등)을 먼저 답변하세요
+2. 정책 정보에 없는 내용은 추측하지 말고 신청 URL이나 운영기관 문의를 안내하세요
+3. 답변 시 markdown 형식을 사용하고, 적절한 이모지를 사용하여 친근하게 답변하세요"""),
+        ("human", "위 정책 정보를 바탕으로 사용자 질문에 답변해주세요.")
+    ])
+
+
+@lru_cache(maxsize=1)
+def build_policy_detail_chain():
+    """정책 상세 설명 응답 체인 (스트리밍 태그 포함)"""
+    config = get_config()
+    chain = build_policy_detail_prompt() | config.chat_llm.with_config(tags=[ANSWER_STREAM_TAG])
+    return chain.with_config(run_name=RESPONSE_GENERATION_STAGE)
+
+
+def policy_detail_inputs(query: str, policy: Dict[str, Any], conversation: str = NO_CONVERSATION) -> Dict[str, Any]:
+    """정책 상세 설명 프롬프트 입력 (대상 정책 하나, 상세 컬럼 한도 적용)"""
+    policy_data, context_tokens = serialize_policies([policy], DETAIL_FIELDS, field_budgets=DETAIL_FIELD_TOKEN_BUDGETS)
+    logger.info(f"정책 상세 답변 컨텍스트: {context_tokens} 토큰")
+    return {
+        "user_query": query,
+        "conversation": conversation,
+        "policy_data": policy_data
+    }
+
+
+def _age_range_text(policy: Dict[str, Any]) -> str:
+    min_age = policy.get("sprt_trgt_min_age") or 0
+    max_age = policy.get("sprt_trgt_max_age") or 0
+    if not min_age and not max_age:
+        return "제한 없음"
+    return f"만 {min_age}세 ~ {f'{max_age}세' if max_age else ''}".rstrip()
+
+
+def _apply_period_text(policy: Dict[str, Any]) -> str:
+    start, end = policy.get("aply_bgng_ymd"), policy.get("aply_end_ymd")
+    if not start and not end:
+        return "상시 (상세 내용은 신청 페이지 확인)"
+    return f"{start or ''} ~ {end or ''}"
+
+
+def render_policy_detail(policy: Dict[str, Any]) -> str:
+    """정책 행 -> 고정 형식 markdown 답변 (LLM 호출 없음, 값이 없는 항목은 생략)"""
+    sections = [f"### 📌 {policy.get('plcy_nm')}", policy.get("plcy_expln_cn")]
+    for title, field in (("💰 지원 내용", "plcy_sprt_cn"), ("📝 신청 방법", "plcy_aply_mthd_cn"),
+                         ("🔍 심사 방법", "srng_mthd_cn"), ("📎 제출 서류", "sbmsn_dcmnt_cn")):
+        if policy.get(field):
+            sections.append(f"**{title}**\n{policy[field]}")
+    
+    targets = [f"- 연령: {_age_range_text(policy)}"]
+    for label, field in (("지역", "zip_cd"), ("소득", "earn_etc_cn"), ("추가 자격", "add_aply_qlfcc_cn")):
+        if policy.get(field):
+            targets.append(f"- {label}: {policy[field]}")
+    sections.append("**👥 지원 대상**\n" + "\n".join(targets))
+    sections.append(f"**📅 신청 기간:** {_apply_period_text(policy)}")
+    
+    links = [f"- {label}: {policy[field]}" for label, field in (("신청", "aply_url_addr"), ("참고", "ref_url_addr1")) if policy.get(field)]
+    institution = policy.get("oper_inst_cd_nm") or policy.get("sprvsn_inst_cd_nm")
+    if institution:
+        links.append(f"- 문의: {institution}")
+    if links:
+        sections.append("**🔗 신청/문의**\n" + "\n".join(links))
+    return "\n\n".join(section for section in sections if section)
+
+
+def _detail_response_state(state: GraphState, policy: Dict[str, Any], final_response: str) -> GraphState:
+    selected_policies = selected_policies_from_rows([policy], [str(policy.get("plcy_no"))])
+    return _response_state(state, selected_policies, final_response)
+
+
+async def generate_detail_response_node(state: GraphState) -> GraphState:
+    """정책 상세 설명 답변 노드 - 대상 정책 하나로 고정 형식 답변 또는 짧은 LLM 호출"""
+    config = get_config()
+    try:
+        policy = state["sql_result"][0]
+        if config.detail_answer_mode == "template":
+            return _detail_response_state(state, policy, render_policy_detail(policy))
+        inputs = policy_detail_inputs(state["query"], policy, conversation_context(state))
+        return _detail_response_state(state, policy, (await build_policy_detail_chain().ainvoke(inputs)).content)
+    except Exception as e:
+        logger.error(f"정책 상세 답변 생성 실패: {e}")
+        return _error_response_state(state, f"응답 생성 중 오류가 발생했습니다: {str(e)}")
+
+
+@lru_cache(maxsize=1)
+def build_conversation_summary_chain():
+    """세션 대화 누적 요약 체인 (최근 메시지 창을 넘은 오래된 메시지를 기존 요약에 접어 넣음)"""
+    config = get_config()
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", """당신은 청년정책 상담 대화를 요약합니다.
+기존 요약과 새 대화 기록을 합쳐 이후 상담에 필요한 내용만 {max_tokens}토큰 이내의 한국어로 요약해주세요.
+- 사용자 조건 (나이, 거주지, 결혼/취업/학력 상태, 소득 등)
+- 안내한 정책과 사용자가 관심을 보인 정책의 정책명, 정책 번호(plcy_no)
+- 아직 해결되지 않은 질문"""),
+        ("human", "기존 요약:\n{summary}\n\n새 대화 기록:\n{transcript}")
+    ])
+    return prompt | config.chat_llm
+
+
+def conversation_summary_inputs(summary: Optional[str], rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    config = get_config()
+    return {
+        "summary": summary or NO_CONVERSATION,
+        "transcript": transcript(rows, config.memory_message_tokens),
+        "max_tokens": config.memory_summary_tokens
+    }
+
+
+async def summarize_conversation(summary: Optional[str], rows: List[Dict[str, Any]]) -> str:
+    """기존 요약 + 오래된 메시지(오래된 순) -> 새 누적 요약 (memory_summary_tokens 이내)"""
+    response = await build_conversation_summary_chain().ainvoke(conversation_summary_inputs(summary, rows))
+    return truncate_to_tokens(response.content.strip(), get_config().memory_summary_tokens)
+
+
+def _error_response_state(state: GraphState, error_message: str) -> GraphState:
+    """오류 메시지를 AI 응답으로 추가"""
+    return {
+        **state,
+        "messages": state["messages"] + [AIMessage(content=error_message)],
+        "error": error_message
+    }
+
+
+def _response_state(state: GraphState, selected_policies, final_response: str) -> GraphState:
+    """생성된 응답을 상태에 반영"""
+    logger.info("자연어 응답 생성 완료")
+    
+    # 메시지 리스트에 AI 응답 추가
+    ai_message = AIMessage(content=final_response)
+    
+    return {
+        **state,
+        "messages": state["messages"] + [ai_message],
+        "selected_policies": selected_policies,
+        "final_response": final_response
+    }
+
+
+async def generate_response_node(state: GraphState) -> GraphState:
+    """SQL 쿼리 결과를 바탕으로 자연어 응답을 생성하는 노드"""
+    config = get_config()
+    try:
+        logger.info("자연어 응답 생성 시작")
         
-        logger.info("자연어 응답 생성 완료")
+        if state.get("error"):
+            ai_message = AIMessage(content=state["error"])
+            return {
+                **state,
+                "messages": state["messages"] + [ai_message]
+            }
         
-        # 메시지 리스트에 AI 응답 추가
-        ai_message = AIMessage(content=final_response.content)
+        query_analysis = state["query_analysis"]
+        query = state["query"]
+        sql_result = state.get("sql_result", [])
+        conversation = conversation_context(state)
         
-        return {
-            **state,
-            "messages": state["messages"] + [ai_message],
-            "selected_policies": [policy.model_dump() for policy in policy_selection_result.selected_policies],
-            "final_response": final_response.content
-        }
+        if config.response_generation_mode == "two_stage":
+            selected_policies, final_response = await generate_two_stage_response(query_analysis, query, sql_result, conversation)
+        else:
+            selected_policies, final_response = await generate_single_call_response(query_analysis, query, sql_result, conversation)
+        
+        result_state = _response_state(state, selected_policies, final_response)
+        store_response_cache(result_state)
+        return result_state
         
     except Exception as e:
         logger.error(f"응답 생성 실패: {e}")
-        error_message = f"응답 생성 중 오류가 발생했습니다: {str(e)}"
-        ai_message = AIMessage(content=error_message)
-        
-        return {
-            **state,
-            "messages": state["messages"] + [ai_message],
-            "error": error_message
-        }
+        return _error_response_state(state, f"응답 생성 중 오류가 발생했습니다: {str(e)}")
 
 def reject_query_node(state: GraphState) -> GraphState:
     """질의 거부 노드"""
@@ -509,96 +1565,179 @@ def reject_query_node(state: GraphState) -> GraphState:
         "final_response": response
     }
 
+# 스키마 정보 쿼리 (policies, policy_conditions 테이블만, 코멘트 포함)
+SCHEMA_QUERY = """
+SELECT 
+    t.table_name,
+    c.column_name,
+    c.data_type,
+    c.is_nullable,
+    c.column_default,
+    COALESCE(col_desc.description, '') as column_comment,
+    COALESCE(table_desc.description, '') as table_comment
+FROM information_schema.tables t
+JOIN information_schema.columns c ON t.table_name = c.table_name
+LEFT JOIN pg_catalog.pg_description table_desc 
+    ON table_desc.objoid = (SELECT oid FROM pg_catalog.pg_class WHERE relname = t.table_name)
+    AND table_desc.objsubid = 0
+LEFT JOIN pg_catalog.pg_description col_desc 
+    ON col_desc.objoid = (SELECT oid FROM pg_catalog.pg_class WHERE relname = t.table_name)
+    AND col_desc.objsubid = c.ordinal_position
+WHERE t.table_schema = 'public'
+AND t.table_type = 'BASE TABLE'
+AND t.table_name IN ('policies', 'policy_conditions')
+ORDER BY t.table_name, c.ordinal_position;
+"""
+
+# 스키마 변경 감지용 핑거프린트 쿼리
+# pg_class/pg_attribute/pg_description 의 oid 인덱스만 조회하므로 information_schema 스캔보다 훨씬 가볍다
+SCHEMA_FINGERPRINT_QUERY = """
+SELECT string_agg(
+    c.relname || ':' || c.oid || ':' || c.relfilenode || ':' ||
+    (SELECT count(*) FROM pg_catalog.pg_attribute a
+     WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped) || ':' ||
+    COALESCE((SELECT md5(string_agg(d.objsubid || '=' || d.description, '|' ORDER BY d.objsubid))
+              FROM pg_catalog.pg_description d WHERE d.objoid = c.oid), ''),
+    ',' ORDER BY c.relname
+) AS fingerprint
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = 'public'
+AND c.relname IN ('policies', 'policy_conditions');
+"""
+
+# 프로세스 전역 스키마 스냅샷 (스키마는 마이그레이션 시에만 변경됨)
+_schema_cache = {
+    "schema_info": None,  # 포맷팅된 스키마 문자열
+    "fingerprint": None,  # 스냅샷 생성 시점의 카탈로그 핑거프린트
+    "checked_at": 0.0,  # 마지막 핑거프린트 확인 시각 (monotonic)
+}
+_schema_cache_lock = threading.Lock()
+
+
+def format_postgresql_schema(schema_results) -> str:
+    """스키마 조회 결과를 프롬프트용 문자열로 포맷팅 (코멘트 포함)"""
+    schema_info = "PostgreSQL Database Schema:\n\n"
+    current_table = None
+    
+    for row in schema_results:
+        if current_table != row['table_name']:
+            if current_table is not None:
+                schema_info += "\n"
+            current_table = row['table_name']
+            table_comment = f" -- {row['table_comment']}" if row['table_comment'] else ""
+            schema_info += f"Table: {row['table_name']}{table_comment}\n"
+        
+        nullable = "NULL" if row['is_nullable'] == 'YES' else "NOT NULL"
+        default = f"DEFAULT {row['column_default']}" if row['column_default'] else ""
+        column_comment = f" -- {row['column_comment']}" if row['column_comment'] else ""
+        schema_info += f"  - {row['column_name']}: {row['data_type']} {nullable} {default}{column_comment}\n"
+    
+    return schema_info
+
+
 def get_postgresql_schema(config) -> str:
     """PostgreSQL 데이터베이스 스키마 정보를 가져오는 함수"""
     try:
-        # config의 db_config를 사용하여 직접 연결
-        conn = psycopg2.connect(
-            host=config.db_config['host'],
-            database=config.db_config['database'],
-            user=config.db_config['user'],
-            password=config.db_config['password'],
-            port=config.db_config['port']
-        )
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-        # 테이블 스키마 정보 쿼리 (policies, policy_conditions 테이블만, 코멘트 포함)
-        schema_query = """
-        SELECT 
-            t.table_name,
-            c.column_name,
-            c.data_type,
-            c.is_nullable,
-            c.column_default,
-            COALESCE(col_desc.description, '') as column_comment,
-            COALESCE(table_desc.description, '') as table_comment
-        FROM information_schema.tables t
-        JOIN information_schema.columns c ON t.table_name = c.table_name
-        LEFT JOIN pg_catalog.pg_description table_desc 
-            ON table_desc.objoid = (SELECT oid FROM pg_catalog.pg_class WHERE relname = t.table_name)
-            AND table_desc.objsubid = 0
-        LEFT JOIN pg_catalog.pg_description col_desc 
-            ON col_desc.objoid = (SELECT oid FROM pg_catalog.pg_class WHERE relname = t.table_name)
-            AND col_desc.objsubid = c.ordinal_position
-        WHERE t.table_schema = 'public'
-        AND t.table_type = 'BASE TABLE'
-        AND t.table_name IN ('policies', 'policy_conditions')
-        ORDER BY t.table_name, c.ordinal_position;
-        """
-        
-        cursor.execute(schema_query)
-        schema_results = cursor.fetchall()
-
-        # 스키마 정보를 문자열로 포맷팅 (코멘트 포함)
-        schema_info = "PostgreSQL Database Schema:\n\n"
-        current_table = None
-        
-        for row in schema_results:
-            if current_table != row['table_name']:
-                if current_table is not None:
-                    schema_info += "\n"
-                current_table = row['table_name']
-                table_comment = f" -- {row['table_comment']}" if row['table_comment'] else ""
-                schema_info += f"Table: {row['table_name']}{table_comment}\n"
-            
-            nullable = "NULL" if row['is_nullable'] == 'YES' else "NOT NULL"
-            default = f"DEFAULT {row['column_default']}" if row['column_default'] else ""
-            column_comment = f" -- {row['column_comment']}" if row['column_comment'] else ""
-            schema_info += f"  - {row['column_name']}: {row['data_type']} {nullable} {default}{column_comment}\n"
-        
-        cursor.close()
-        conn.close()
+        with config.db_pool.connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute(SCHEMA_QUERY)
+            schema_results = cursor.fetchall()
+            cursor.close()
         
-        return schema_info
+        return format_postgresql_schema(schema_results)
         
     except Exception as e:
         logger.error(f"스키마 정보 가져오기 실패: {e}")
         return "스키마 정보를 가져올 수 없습니다."
 
 
-def execute_postgresql_query(config, sql_query: str) -> Dict[str, Any]:
-    """PostgreSQL 쿼리를 직접 실행하는 함수"""
-    try:
-        # config의 db_config를 사용하여 직접 연결
-        conn = psycopg2.connect(
-            host=config.db_config['host'],
-            database=config.db_config['database'],
-            user=config.db_config['user'],
-            password=config.db_config['password'],
-            port=config.db_config['port']
-        )
+def _load_schema_snapshot(config):
+    """핑거프린트와 스키마 정보를 한 번의 연결로 함께 조회"""
+    with config.db_pool.connection() as conn:
         cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(SCHEMA_FINGERPRINT_QUERY)
+        fingerprint = cursor.fetchone()['fingerprint']
+        cursor.execute(SCHEMA_QUERY)
+        schema_info = format_postgresql_schema(cursor.fetchall())
+        cursor.close()
+    return fingerprint, schema_info
+
+
+def get_postgresql_schema_fingerprint(config) -> Optional[str]:
+    """스키마 변경 여부 판단을 위한 카탈로그 핑거프린트 조회"""
+    with config.db_pool.connection() as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(SCHEMA_FINGERPRINT_QUERY)
+        fingerprint = cursor.fetchone()['fingerprint']
+        cursor.close()
+    return fingerprint
+
+
+def schema_snapshot_fresh(config) -> bool:
+    """스키마 스냅샷이 있고 확인 주기가 지나지 않았는지 여부 (락 없이 확인, DB 조회 없음)"""
+    return _schema_cache["schema_info"] is not None and time.monotonic() - _schema_cache["checked_at"] < config.schema_check_interval
+
+
+def get_cached_postgresql_schema(config) -> str:
+    """
+    프로세스 전역 스키마 스냅샷 반환
+    - 최초 호출 시 한 번만 information_schema를 조회
+    - schema_check_interval 주기로 핑거프린트만 확인하고, 변경된 경우에만 다시 조회
+    """
+    with _schema_cache_lock:
+        now = time.monotonic()
+        cached_schema = _schema_cache["schema_info"]
         
-        # 쿼리 실행
-        cursor.execute(sql_query)
-        results = cursor.fetchall()
-        
-        # 결과를 딕셔너리 형태로 변환
-        result_data = [dict(row) for row in results]
+        if cached_schema is not None and now - _schema_cache["checked_at"] < config.schema_check_interval:
+            return cached_schema
         
-        cursor.close()
-        conn.close()
+        try:
+            if cached_schema is not None:
+                fingerprint = get_postgresql_schema_fingerprint(config)
+                if fingerprint == _schema_cache["fingerprint"]:
+                    _schema_cache["checked_at"] = now
+                    return cached_schema
+                logger.info("스키마 변경 감지 - 스키마 스냅샷 갱신")
+            
+            fingerprint, schema_info = _load_schema_snapshot(config)
+            _schema_cache.update({
+                "schema_info": schema_info,
+                "fingerprint": fingerprint,
+                "checked_at": now
+            })
+            logger.info("스키마 스냅샷 로드 완료")
+            return schema_info
+            
+        except Exception as e:
+            logger.error(f"스키마 스냅샷 로드 실패: {e}")
+            # 이전 스냅샷이 있으면 그대로 사용
+            if cached_schema is not None:
+                return cached_schema
+            return "스키마 정보를 가져올 수 없습니다."
+
+
+def invalidate_schema_cache():
+    """스키마 스냅샷 무효화 (다음 호출 시 다시 조회)"""
+    with _schema_cache_lock:
+        _schema_cache.update({
+            "schema_info": None,
+            "fingerprint": None,
+            "checked_at": 0.0
+        })
+    logger.info("스키마 스냅샷 무효화")
+
+
+async def execute_postgresql_query(config, sql_query: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """PostgreSQL 쿼리를 비동기 커넥션 풀의 연결로 실행하는 함수 (params는 바인드 파라미터)"""
+    try:
+        started_at = time.perf_counter()
+        async with config.async_db_pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(sql_query, params)
+                result_data = [dict(row) for row in await cursor.fetchall()]
         
+        await arecord_db_query(time.perf_counter() - started_at, len(result_data))
         return {
             "success": True,
             "data": result_data,
@@ -614,15 +1753,87 @@ def execute_postgresql_query(config, sql_query: str) -> Dict[str, Any]:
         }
 
 
-def create_direct_sql_chain(config, query_analysis, user_condition):
-    """직접 SQL 쿼리를 생성하는 LLM 체인을 생성하는 함수"""
-    
-    # 데이터베이스 스키마 정보 가져오기
-    schema_info = get_postgresql_schema(config)
-    
+async def find_policies_by_region(config, zip_cd: str) -> List[str]:
+    """사용자 지역 -> 해당 지역/상위 지역/전국 대상 정책 번호 목록 (조회 실패 시 빈 목록)"""
+    sql_query, params = build_region_policy_query(zip_cd)
+    result = await execute_postgresql_query(config, sql_query, params)
+    return [row["plcy_no"] for row in result["data"]]
+
+
+# 생성 쿼리 검사(sql_guard)는 sqlglot을 사용하므로 LLM SQL 생성 경로에서만 import
+def _guard_generated_query(config, sql_query: str) -> str:
+    """LLM 생성 쿼리 검사 (단일 SELECT + LIMIT 적용) - 거부 시 UnsafeQueryError"""
+    from .sql_guard import UnsafeQueryError, guard_select
+    try:
+        guarded_query = guard_select(sql_query, config.generated_sql_max_rows)
+    except UnsafeQueryError as e:
+        SQL_GUARD_REJECTIONS.labels(reason=e.reason).inc()
+        raise
+    if guarded_query != sql_query:
+        logger.info(f"생성 쿼리 정규화: {guarded_query}")
+    return guarded_query
+
+
+def _check_plan_cost(config, explain_result):
+    from .sql_guard import UnsafeQueryError, plan_cost, check_cost
+    cost = plan_cost(explain_result)
+    try:
+        check_cost(cost, config.generated_sql_max_cost)
+    except UnsafeQueryError as e:
+        SQL_GUARD_REJECTIONS.labels(reason=e.reason).inc()
+        raise
+    logger.info(f"생성 쿼리 예상 비용: {cost:.0f}")
+
+
+def _guard_failure(e: Exception) -> Dict[str, Any]:
+    logger.warning(f"생성 쿼리 실행 거부/실패: {e}")
+    return {
+        "success": False,
+        "error": str(e),
+        "data": []
+    }
+
+
+# 읽기 전용 트랜잭션 + 트랜잭션 한정 statement_timeout (SET은 바인드 파라미터를 받지 않으므로 set_config 사용)
+READ_ONLY_TRANSACTION = "SET TRANSACTION READ ONLY"
+LOCAL_STATEMENT_TIMEOUT = "SELECT set_config('statement_timeout', %(timeout)s, true)"
+
+
+async def execute_generated_query(config, sql_query: str) -> Dict[str, Any]:
+    """
+    LLM 생성 쿼리 실행 (반환 형식은 execute_postgresql_query와 동일)
+    - 실행 전 검사 -> 읽기 전용 트랜잭션/제한 시간 설정 -> EXPLAIN 비용 확인 -> 실행
+    """
+    from .sql_guard import explain_sql
+    try:
+        sql_query = _guard_generated_query(config, sql_query)
+        started_at = time.perf_counter()
+        async with config.async_db_pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(READ_ONLY_TRANSACTION)
+                await cursor.execute(LOCAL_STATEMENT_TIMEOUT, {"timeout": str(config.generated_sql_timeout_ms)})
+                await cursor.execute(explain_sql(sql_query))
+                _check_plan_cost(config, await cursor.fetchone())
+                await cursor.execute(sql_query)
+                result_data = [dict(row) for row in await cursor.fetchall()]
+        
+        await arecord_db_query(time.perf_counter() - started_at, len(result_data))
+        return {
+            "success": True,
+            "data": result_data,
+            "row_count": len(result_data)
+        }
+    except Exception as e:
+        return _guard_failure(e)
+
+
+@lru_cache(maxsize=1)
+def build_direct_sql_chain():
+    """직접 SQL 쿼리를 생성하는 LLM 체인 (스키마/조건 정보는 direct_sql_inputs로 전달)"""
+    config = get_config()
     # SQL 쿼리 생성을 위한 프롬프트 템플릿
     sql_prompt = ChatPromptTemplate.from_messages([
-        ("system", f"""당신은 PostgreSQL 전문가입니다. 주어진 자연어 질문을 바탕으로 정확한 PostgreSQL 쿼리를 생성해주세요.
+        ("system", """당신은 PostgreSQL 전문가입니다. 주어진 자연어 질문을 바탕으로 정확한 PostgreSQL 쿼리를 생성해주세요.
 
 **데이터베이스 스키마:**
 {schema_info}
@@ -635,7 +1846,7 @@ school_cd -> ('고졸 미만', '고교 재학', '고졸 예정', '고교 졸업'
 zip_cd -> string 값 (예: '전국', '서울특별시', '대구광역시', '경상북도', '전북특별자치도', '서울 구로구', '대구 달서구', '경기도 수원시', '경기도 수원시 팔달구')
 earn_etc_cn -> string 값 (예: '중위소득 150% 이하', '월소득 200만원 이하')
 
-**분류 정보:** {query_analysis.lclsf_nm}
+**분류 정보:** {lclsf_nm}
 **조건 정보:** {user_condition}
 
 **쿼리 생성 규칙:**
@@ -648,14 +1859,14 @@ earn_etc_cn -> string 값 (예: '중위소득 150% 이하', '월소득 200만원
     - lclsf_nm 이 '일반'인 경우 policies 테이블의 lclsf_nm의 '주거', '일자리'를 각각 5개씩 반환합니다.
 7. 나이 정보는 policies 테이블의 sprt_trgt_min_age, sprt_trgt_max_age 컬럼을 사용하여 필터링하세요
     - sprt_trgt_min_age와 sprt_trgt_max_age 가 0 인 경우는 필터링하지 않습니다.
-    - 예: sprt_trgt_min_age <= {user_condition.age} AND sprt_trgt_max_age >= {user_condition.age} OR (sprt_trgt_min_age = 0 AND sprt_trgt_max_age = 0)
+    - 예: sprt_trgt_min_age <= {age} AND sprt_trgt_max_age >= {age} OR (sprt_trgt_min_age = 0 AND sprt_trgt_max_age = 0)
 8. mrg_stts_cd 검색 시 IN (조건 정보,'제한없음') 형태로 필터링하세요
-9. school_cd, plcy_major_cd, job_cd 검색 시 '제한없음'과 해당 조건을 필터링 하세요
-    - 예 school_cd ILIKE '%대학 졸업%' OR school_cd = '제한없음'
-    - 예 plcy_major_cd ILIKE '%인문계열%' OR plcy_major_cd = '제한없음'
-10. zip_cd 검색 시 전국, 해당지역, 해당 지역의 상위 지역을 포함하여 필터링 해야 합니다.
+9. school_cd, plcy_major_cd, job_cd 검색 시 값 단위 배열 컬럼(school_cds, plcy_major_cds, job_cds)으로 '제한없음'과 해당 조건을 필터링 하세요
+    - 예 school_cds && ARRAY['대학 졸업', '제한없음']
+    - 예 plcy_major_cds && ARRAY['인문계열', '제한없음']
+10. zip_cd 검색 시 지역 배열 컬럼(zip_cds)으로 전국, 해당지역, 해당 지역의 상위 지역을 포함하여 필터링 해야 합니다.
     - zip_cd 데이터가 예를들을 '경기도 수원시 팔달구'이면 '경기도', '경기도 수원시', '경기도 수원시 팔달구' 데이터를 모두 포함해야 합니다.
-    - 예 zip_cd ILIKE '%경기도 수원시 팔달구%' OR zip_cd ILIKE '%경기도 수원시%' OR zip_cd ILIKE '%경기도%' OR zip_cd = '전국'
+    - 예 zip_cds && ARRAY['경기도 수원시 팔달구', '경기도 수원시', '경기도', '전국']
 11. earn_etc_cn은 유사도를 판단하는데 사용합니다.
     - 예 ORDER BY similarity(earn_etc_cn, 조건 정보의 earn_etc_cn) DESC
 12. additional_requirement도 필터링은 하지 않고 add_aply_qlfcc_cn, ptcp_prp_trgt_cn 컬럼과 유사도 판단으로 사용합니다.
@@ -682,9 +1893,72 @@ earn_etc_cn -> string 값 (예: '중위소득 150% 이하', '월소득 200만원
     # 구조화된 출력을 위한 LLM 체인 (streaming 비활성화)
     llm_no_stream = config.thinking_model.bind(stream=False)
     structured_llm = llm_no_stream.with_structured_output(SQLQueryGeneration)
-    sql_chain = sql_prompt | structured_llm
-    
-    return sql_chain
+    return sql_prompt | structured_llm
+
+
+def direct_sql_inputs(config, query_analysis, user_condition, query: str) -> Dict[str, Any]:
+    """SQL 생성 체인 입력 (데이터베이스 스키마는 프로세스 전역 스냅샷 사용)"""
+    return {
+        "schema_info": get_cached_postgresql_schema(config),
+        "lclsf_nm": query_analysis.lclsf_nm,
+        "user_condition": str(user_condition),
+        "age": user_condition.age,
+        "query": query
+    }
+
+
+# 프로세스당 한 번 구성해 재사용하는 프롬프트/체인 (config의 LLM 클라이언트를 교체한 경우 clear_chain_cache 호출)
+CHAIN_BUILDERS = (
+    build_query_analysis_chain,
+    build_policy_selection_prompt,
+    build_policy_selection_chain,
+    build_two_stage_response_prompt,
+    build_two_stage_response_chain,
+    build_single_call_prompt,
+    build_single_call_chain,
+    build_direct_sql_chain,
+    build_policy_detail_prompt,
+    build_policy_detail_chain,
+    build_conversation_summary_chain,
+)
+
+
+def clear_chain_cache():
+    """캐시된 프롬프트/체인 제거 (다음 호출 시 다시 구성)"""
+    for builder in CHAIN_BUILDERS:
+        builder.cache_clear()
+
+
+# 동기 그래프 실행(invoke/stream)에서 비동기 노드를 실행하는 프로세스 전역 이벤트 루프
+# - 루프가 하나이므로 비동기 커넥션 풀도 이 루프의 풀 하나만 생성됨
+_sync_loop = None
+_sync_loop_lock = threading.Lock()
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="graph-sync-loop", daemon=True).start()
+            _sync_loop = loop
+    return _sync_loop
+
+
+def run_sync(coroutine):
+    """
+    동기 코드에서 코루틴 실행 (호출 스레드는 결과가 나올 때까지 대기)
+    - 호출 스레드의 컨텍스트(콜백/트레이싱)가 그대로 전달됨
+    - 이벤트 루프 안에서는 호출하지 말 것 (ainvoke/astream 사용)
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_sync_loop()).result()
+
+
+def graph_node(anode) -> RunnableLambda:
+    """비동기 노드 -> 그래프 노드 (ainvoke/astream은 그대로 await, invoke/stream은 run_sync로 실행)"""
+    def node(state: GraphState) -> GraphState:
+        return run_sync(anode(state))
+    return RunnableLambda(node, afunc=anode, name=anode.__name__)
 
 
 def build_graph() -> StateGraph:
@@ -692,28 +1966,96 @@ def build_graph() -> StateGraph:
     # StateGraph 생성
     builder = StateGraph(GraphState)
     # 노드 추가
-    builder.add_node("analyze_query", analyze_query_node)
-    builder.add_node("generate_sql_query", generate_sql_query_node)
-    builder.add_node("generate_response", generate_response_node)
+    # I/O가 있는 노드는 비동기 구현 하나만 두고, 동기 실행(invoke/stream)용으로 graph_node로 감싸 등록
+    builder.add_node("preclassify_query", preclassify_query_node)
+    builder.add_node("analyze_query", graph_node(analyze_query_branch))
+    builder.add_node("prefetch_schema", graph_node(prefetch_schema_node))
+    builder.add_node("prefetch_policy_version", graph_node(prefetch_policy_version_node))
+    builder.add_node("prefetch_candidates", graph_node(prefetch_candidates_node))
+    builder.add_node("prefetch_query_embedding", graph_node(prefetch_query_embedding_node))
+    builder.add_node("join_branches", join_branches_node)
+    builder.add_node("generate_sql_query", graph_node(generate_sql_query_node))
+    builder.add_node("generate_response", graph_node(generate_response_node))
+    builder.add_node("check_response_cache", graph_node(check_response_cache_node))
+    builder.add_node("load_previous_policies", graph_node(load_previous_policies_node))
+    builder.add_node("resolve_policy_detail", graph_node(resolve_policy_detail_node))
+    builder.add_node("generate_detail_response", graph_node(generate_detail_response_node))
     builder.add_node("reject_query", reject_query_node)
     
     # 엣지 정의
-    builder.add_edge(START, "analyze_query")
+    # 사전 분류: 주제 외 질문은 병렬 분기 없이 바로 거부
+    builder.add_edge(START, "preclassify_query")
+    # 병렬 분기: 질의 분석(LLM)과 동시에 스키마/데이터 버전/사전 검색/검색용 임베딩을 미리 조회
+    branches = list(PARALLEL_BRANCHES)
+    builder.add_conditional_edges("preclassify_query", route_after_preclassification, branches + ["reject_query"])
+    # 모든 분기가 끝나면 합류 (각 분기는 제한 시간 적용)
+    builder.add_edge(branches, "join_branches")
     # 조건부 엣지: 분석 결과에 따라 라우팅
     builder.add_conditional_edges(
-        "analyze_query",
+        "join_branches",
         route_after_analysis,
         {
-            "continue": "generate_sql_query",
+            "continue": "check_response_cache",
+            "followup": "load_previous_policies",
+            "detail": "resolve_policy_detail",
             "reject": "reject_query"
         }
     )
+    # 정책 상세 설명 후속 질문: 이전 턴 정책을 조회했으면 검색 없이 답변 생성
+    builder.add_conditional_edges(
+        "load_previous_policies",
+        route_after_policy_lookup,
+        {
+            "answer": "generate_response",
+            "search": "check_response_cache"
+        }
+    )
+    # 정책 상세 설명 질문: 대상 정책을 특정했으면 그 정책 하나로 답변, 못 했으면 이전 턴 정책 또는 일반 검색
+    builder.add_conditional_edges(
+        "resolve_policy_detail",
+        route_after_policy_detail,
+        {
+            "answer": "generate_detail_response",
+            "followup": "load_previous_policies",
+            "search": "check_response_cache"
+        }
+    )
+    # 답변 캐시 적중 시 검색/답변 생성 생략
+    builder.add_conditional_edges(
+        "check_response_cache",
+        route_after_cache,
+        {
+            "cached": END,
+            "search": "generate_sql_query"
+        }
+    )
     builder.add_edge("generate_sql_query", "generate_response")
     builder.add_edge("generate_response", END)
+    builder.add_edge("generate_detail_response", END)
     builder.add_edge("reject_query", END)
     
     return builder.compile()
 
 
-# LangGraph Studio에서 사용할 그래프 인스턴스
-graph = build_graph()
+# 컴파일된 그래프 (처음 사용할 때 컴파일)
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """컴파일된 그래프 (여러 스레드가 동시에 처음 호출해도 한 번만 컴파일)"""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = build_graph()
+    return _graph
+
+
+def __getattr__(name: str):
+    """service.config / service.graph 접근 시 지연 생성 (LangGraph Studio는 모듈의 graph 속성을 로드)"""
+    if name == "config":
+        return get_config()
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,103 @@
+"""
+LLM이 생성한 SQL 실행 전 검사 (build_direct_sql_chain 결과 전용)
+- 단일 SELECT(UNION 등 조회 집합 연산 포함)만 허용, 쓰기/DDL/SELECT INTO/위험 함수 거부
+- LIMIT이 없거나 max_rows보다 크면 max_rows로 제한
+- 실행 시에는 읽기 전용 트랜잭션 + statement_timeout + EXPLAIN 비용 상한 적용 (service.execute_generated_query)
+"""
+import json
+from typing import Any, Dict
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError
+
+DIALECT = "postgres"
+
+# 조회 쿼리 안에서도 허용하지 않는 노드 (데이터 변경, 잠금, 임시 테이블 생성 등)
+FORBIDDEN_NODES = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop, exp.Alter,
+    exp.Command, exp.Into, exp.Lock, exp.Set, exp.Transaction, exp.Commit, exp.Rollback,
+)
+
+# 부수 효과가 있거나 서버 자원을 점유할 수 있는 함수
+FORBIDDEN_FUNCTIONS = {
+    "pg_sleep", "pg_sleep_for", "pg_sleep_until", "pg_read_file", "pg_read_binary_file", "pg_ls_dir",
+    "pg_terminate_backend", "pg_cancel_backend", "pg_reload_conf", "set_config",
+    "lo_import", "lo_export", "dblink", "dblink_exec", "generate_series",
+}
+
+
+class UnsafeQueryError(ValueError):
+    """실행하지 않고 거부한 생성 쿼리"""
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason  # 지표 라벨 (parse, statement, forbidden, cost)
+
+
+def _function_name(node: exp.Func) -> str:
+    """
+    PostgreSQL에서 호출되는 함수 이름
+    - sqlglot이 아는 함수는 내부 이름(예: generate_series -> EXPLODING_GENERATE_SERIES)으로 바뀌므로 postgres로 출력한 이름 사용
+    """
+    if isinstance(node, exp.Anonymous):
+        return str(node.this).lower()
+    return node.sql(dialect=DIALECT).split("(", 1)[0].strip().lower()
+
+
+def _limit_value(query: exp.Query):
+    limit = query.args.get("limit")
+    if limit is None:
+        return None
+    expression = limit.expression
+    if isinstance(expression, exp.Literal) and expression.is_int:
+        return int(expression.this)
+    return -1  # 파라미터/식으로 지정된 LIMIT은 상한으로 교체
+
+
+def guard_select(sql_query: str, max_rows: int) -> str:
+    """
+    생성 쿼리 검사 후 LIMIT을 적용한 SQL 반환
+    - 허용되지 않는 쿼리는 UnsafeQueryError
+    """
+    try:
+        statements = [statement for statement in sqlglot.parse(sql_query, read=DIALECT) if statement is not None]
+    except ParseError as e:
+        raise UnsafeQueryError("parse", f"SQL 파싱 실패: {e}") from e
+
+    if len(statements) != 1:
+        raise UnsafeQueryError("statement", f"단일 쿼리만 실행할 수 있습니다 ({len(statements)}개)")
+    query = statements[0]
+    if not isinstance(query, (exp.Select, exp.SetOperation)):
+        raise UnsafeQueryError("statement", f"SELECT 쿼리만 실행할 수 있습니다 ({query.key})")
+
+    for node in query.walk():
+        if isinstance(node, FORBIDDEN_NODES):
+            raise UnsafeQueryError("forbidden", f"허용되지 않는 구문: {node.key}")
+        if isinstance(node, exp.Func) and _function_name(node) in FORBIDDEN_FUNCTIONS:
+            raise UnsafeQueryError("forbidden", f"허용되지 않는 함수: {_function_name(node)}")
+
+    limit = _limit_value(query)
+    if limit is None or limit < 0 or limit > max_rows:
+        query = query.limit(max_rows, copy=False)
+    return query.sql(dialect=DIALECT)
+
+
+def explain_sql(sql_query: str) -> str:
+    return f"EXPLAIN (FORMAT JSON) {sql_query}"
+
+
+def plan_cost(explain_result: Any) -> float:
+    """EXPLAIN (FORMAT JSON) 결과 -> 최상위 계획의 Total Cost (드라이버별 반환 형식 처리)"""
+    if isinstance(explain_result, dict):  # dict_row / RealDictCursor
+        explain_result = next(iter(explain_result.values()))
+    elif isinstance(explain_result, (tuple, list)) and explain_result and not isinstance(explain_result[0], dict):
+        explain_result = explain_result[0]
+    if isinstance(explain_result, str):
+        explain_result = json.loads(explain_result)
+    plan: Dict[str, Any] = explain_result[0]["Plan"]
+    return float(plan["Total Cost"])
+
+
+def check_cost(cost: float, max_cost: float):
+    if cost > max_cost:
+        raise UnsafeQueryError("cost", f"예상 비용 초과 ({cost:.0f} > {max_cost:.0f})")
@@ -1,3 +1,888 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import psycopg2
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langgraph.graph import END, START, StateGraph
+from typing_extensions import TypedDict
+from psycopg2.pool import PoolError
+from psycopg_pool import PoolTimeout
+
+from . import service
+from .db import AsyncPolicyDBPool, PolicyDBPool
+from .eligibility import EligibilityIndex
+from .memory import history_messages, previous_turn, refers_to_context, refers_to_previous_policy, split_for_summary
+from .metrics import TOTAL_STAGE, ChatMetricsCallback, StatsCollector, arecord_db_query, record_db_query
+from .preclassifier import PreClassifier, domain_keywords, extract_conditions, extract_region
+from .prompt_context import (
+    ANSWER_FIELDS, DETAIL_FIELD_TOKEN_BUDGETS, DETAIL_FIELDS, FIELD_TOKEN_BUDGETS, TRUNCATION_MARK,
+    count_tokens, serialize_policies, truncate_to_tokens,
+)
+from .query_cache import SemanticQueryCache, normalize_query, query_entities
+from .response_cache import ResponseCache, response_cache_key
+from .retrieval import (
+    RRF_K, _matches_condition, build_policy_detail_query, build_policy_search_query, find_plcy_no,
+    merge_candidates, refine_candidates, region_lineage, region_prefixes, resolve_policy_detail,
+)
+from .service import (
+    ANSWER_STREAM_TAG, QueryAnalysis, SelectionPrefixFilter, route_after_analysis, route_after_policy_detail,
+)
+from .sql_guard import UnsafeQueryError, guard_select
+from .views import metrics_view, send_message_stream
+
+DB_CONFIG = {"host": "localhost", "database": "test", "user": "test", "password": "test", "port": 5432}
+
+
+def analysis(**fields):
+    """테스트용 QueryAnalysis (지정하지 않은 필드는 기본값)"""
+    defaults = {
+        "lclsf_nm": "주거", "query_keywords": "전세", "classification_confidence": 0.9,
+        "extraction_confidence": 0.9, "reasoning": "test",
+    }
+    return QueryAnalysis(**{**defaults, **fields})
+
+
+def policy(plcy_no, **fields):
+    """테스트용 정책 행 (조건 컬럼 + 값 단위 배열 컬럼)"""
+    row = {
+        "plcy_no": plcy_no, "plcy_nm": f"정책 {plcy_no}", "lclsf_nm": "주거",
+        "sprt_trgt_min_age": 0, "sprt_trgt_max_age": 0, "mrg_stts_cd": "제한없음",
+        "job_cds": ["제한없음"], "school_cds": ["제한없음"], "plcy_major_cds": ["제한없음"], "zip_cds": ["전국"],
+    }
+    row.update(fields)
+    return row
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.conn.executed.append(query)
+
+
+class FakeConnection:
+    """테스트용 psycopg 연결 (broken이면 쿼리 실행 시 OperationalError)"""
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+
+class FakeThreadedPool:
+    """테스트용 ThreadedConnectionPool - 반납된 연결을 다시 빌려줌"""
+    def __init__(self, minconn, maxconn, **kwargs):
+        self.kwargs = kwargs
+        self.idle = []
+        self.closed = []
+
+    def getconn(self):
+        return self.idle.pop() if self.idle else FakeConnection()
+
+    def putconn(self, conn, close=False):
+        (self.closed if close else self.idle).append(conn)
+
+    def closeall(self):
+        pass
+
+
+class PolicyDBPoolTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("Chatbot.db.ThreadedConnectionPool", FakeThreadedPool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = PolicyDBPool(DB_CONFIG, maxconn=2, acquire_timeout=0.01, statement_timeout_ms=1234)
+
+    def test_connections_are_reused_and_counted(self):
+        with self.pool.connection() as first:
+            self.assertEqual(self.pool.stats()["in_use"], 1)
+        with self.pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+        stats = self.pool.stats()
+        self.assertEqual((stats["checkouts"], stats["in_use"], stats["max_in_use"]), (2, 0, 1))
+        self.assertIn("statement_timeout=1234", self.pool._pool.kwargs["options"])
+
+    def test_health_check_only_after_idle_interval(self):
+        for _ in range(2):
+            with self.pool.connection():
+                pass
+        self.assertEqual(self.pool.stats()["health_checks"], 1)
+
+    def test_broken_connection_is_replaced(self):
+        with self.pool.connection() as conn:
+            pass
+        conn.broken = True
+        self.pool.health_check_interval = 0
+        with self.assertLogs("Chatbot.db", level="WARNING"), self.pool.connection() as replacement:
+            self.assertIsNot(replacement, conn)
+        self.assertEqual(self.pool.stats()["discarded"], 1)
+        self.assertEqual(self.pool._pool.closed, [conn])
+
+    def test_error_rolls_back_and_returns_connection(self):
+        with self.assertRaises(ValueError):
+            with self.pool.connection() as conn:
+                raise ValueError("query failed")
+        self.assertEqual(self.pool._pool.idle, [conn])
+        self.assertEqual((self.pool.stats()["errors"], self.pool.stats()["in_use"]), (1, 0))
+
+    def test_acquire_times_out_when_exhausted(self):
+        with self.pool.connection(), self.pool.connection():
+            with self.assertRaises(PoolError):
+                with self.pool.connection():
+                    pass
+        self.assertEqual(self.pool.stats()["acquire_timeouts"], 1)
+
+
+class FakeAsyncPool:
+    """테스트용 AsyncConnectionPool - open()은 이벤트 루프를 한 번 양보한 뒤 완료"""
+    instances = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.opened = False
+        self.timeout = False
+        self.loop = asyncio.get_running_loop()
+        FakeAsyncPool.instances.append(self)
+
+    async def open(self):
+        await asyncio.sleep(0)
+        self.opened = True
+
+    async def close(self):
+        self.opened = False
+
+    def connection(self):
+        pool = self
+
+        class Borrow:
+            async def __aenter__(self):
+                assert pool.opened and asyncio.get_running_loop() is pool.loop
+                if pool.timeout:
+                    raise PoolTimeout("timed out")
+                await asyncio.sleep(0)
+                return mock.AsyncMock()
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return Borrow()
+
+
+class AsyncPolicyDBPoolTests(SimpleTestCase):
+    def setUp(self):
+        FakeAsyncPool.instances = []
+        patcher = mock.patch("Chatbot.db.AsyncConnectionPool", FakeAsyncPool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = AsyncPolicyDBPool(DB_CONFIG, maxconn=5)
+
+    async def borrow(self):
+        async with self.pool.connection():
+            await asyncio.sleep(0)
+
+    async def test_concurrent_first_use_opens_one_pool(self):
+        await asyncio.gather(*(self.borrow() for _ in range(5)))
+        self.assertEqual(len(FakeAsyncPool.instances), 1)
+        stats = self.pool.stats()
+        self.assertEqual((stats["checkouts"], stats["in_use"], stats["pools"]), (5, 0, 1))
+        self.assertGreater(stats["max_in_use"], 1)
+
+    async def test_each_event_loop_gets_its_own_pool(self):
+        await self.borrow()
+        thread = threading.Thread(target=asyncio.run, args=(self.borrow(),))
+        thread.start()
+        thread.join()
+        await self.borrow()
+        self.assertEqual(len(FakeAsyncPool.instances), 2)
+        self.assertEqual(self.pool.stats()["checkouts"], 3)
+
+    async def test_pool_timeout_is_reported(self):
+        await self.borrow()
+        FakeAsyncPool.instances[0].timeout = True
+        with self.assertRaises(PoolError):
+            await self.borrow()
+        self.assertEqual(self.pool.stats()["acquire_timeouts"], 1)
+
+    async def test_close_only_closes_current_loop_pool(self):
+        await self.borrow()
+        await self.pool.close()
+        self.assertFalse(FakeAsyncPool.instances[0].opened)
+        await self.borrow()
+        self.assertEqual(len(FakeAsyncPool.instances), 2)
+
+
+class RegionLineageTests(SimpleTestCase):
+    def test_prefixes_from_most_specific(self):
+        self.assertEqual(
+            region_prefixes("경기도 수원시 팔달구"),
+            ["경기도 수원시 팔달구", "경기도 수원시", "경기도"],
+        )
+
+    def test_lineage_ends_with_nationwide(self):
+        self.assertEqual(region_lineage("서울특별시"), ["서울특별시", "전국"])
+
+
+class PolicySearchQueryTests(SimpleTestCase):
+    def test_user_values_are_bound_parameters(self):
+        sql, params = build_policy_search_query(
+            analysis(age=27, zip_cd="서울특별시 구로구", job_cd="재직자", query_keywords="전세'; DROP"), top_k=10,
+        )
+        self.assertNotIn("DROP", sql)
+        self.assertEqual(params["age"], 27)
+        self.assertEqual(params["zip_regions"], ["서울특별시 구로구", "서울특별시", "전국"])
+        self.assertEqual(params["job_cd_codes"], ["재직자", "제한없음"])
+        self.assertEqual(params["lclsf_nm"], "주거")
+        self.assertEqual(params["limit"], 10)
+
+    def test_condition_codes_use_array_operators(self):
+        sql, _ = build_policy_search_query(analysis(job_cd="재직자"))
+        self.assertIn("p.job_cds && %(job_cd_codes)s::text[]", sql)
+        self.assertIn("%(job_cd)s = ANY(p.job_cds)", sql)
+        self.assertNotIn("p.job_cd ILIKE", sql)
+
+    def test_general_query_splits_categories(self):
+        sql, params = build_policy_search_query(analysis(lclsf_nm="일반"), top_k=10)
+        self.assertIn("UNION ALL", sql)
+        self.assertEqual((params["lclsf_nm_0"], params["lclsf_nm_1"]), ("주거", "일자리"))
+        self.assertEqual(params["half_limit"], 5)
+
+    def test_eligible_policies_replace_condition_filters(self):
+        sql, params = build_policy_search_query(analysis(age=27), eligible_plcy_nos=["1", "2"])
+        self.assertIn("p.plcy_no = ANY(%(eligible_plcy_nos)s)", sql)
+        self.assertNotIn("sprt_trgt_min_age", sql)
+        self.assertEqual(params["eligible_plcy_nos"], ["1", "2"])
+
+    def test_trigram_mode_needs_keywords(self):
+        sql, _ = build_policy_search_query(analysis(), mode="trigram")
+        self.assertIn("<->", sql)
+        sql, _ = build_policy_search_query(analysis(query_keywords=""), mode="trigram")
+        self.assertNotIn("<->", sql)
+
+    def test_hybrid_mode_fuses_with_rrf(self):
+        sql, params = build_policy_search_query(analysis(), top_k=4, mode="hybrid", query_embedding=[0.5, 0.5])
+        self.assertIn("SUM(1.0 / (%(rrf_k)s + r.rank))", sql)
+        self.assertEqual(params["rrf_k"], RRF_K)
+        self.assertEqual(params["candidate_limit"], 20)
+        self.assertEqual(params["query_embedding"], "[0.5,0.5]")
+
+    def test_hybrid_mode_without_embedding_falls_back(self):
+        sql, _ = build_policy_search_query(analysis(), mode="hybrid", query_embedding=None)
+        self.assertNotIn("rrf_score", sql)
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            build_policy_search_query(analysis(), mode="bm25")
+
+
+class PolicyDetailLookupTests(SimpleTestCase):
+    def test_plcy_no_uses_primary_key(self):
+        sql, params = build_policy_detail_query("20250521005400110863 자세히 알려줘", "청년 월세")
+        self.assertIn("p.plcy_no = %(plcy_no)s", sql)
+        self.assertEqual(params, {"plcy_no": "20250521005400110863"})
+
+    def test_longer_digit_runs_are_not_plcy_no(self):
+        self.assertIsNone(find_plcy_no("1202505210054001108630"))
+
+    def test_ambiguous_names_do_not_resolve(self):
+        rows = [{"plcy_no": "1", "name_score": 0.6}, {"plcy_no": "2", "name_score": 0.58}]
+        self.assertIsNone(resolve_policy_detail(rows, min_score=0.3, min_margin=0.1))
+        rows[1]["name_score"] = 0.2
+        self.assertEqual(resolve_policy_detail(rows, min_score=0.3, min_margin=0.1)["plcy_no"], "1")
+
+
+class PromptContextTests(SimpleTestCase):
+    def test_truncate_marks_cut_text(self):
+        text = "청년 월세 지원 " * 100
+        truncated = truncate_to_tokens(text, 10)
+        self.assertTrue(truncated.endswith(TRUNCATION_MARK))
+        self.assertLessEqual(count_tokens(truncated), 12)
+        self.assertEqual(truncate_to_tokens("짧은 설명", 10), "짧은 설명")
+
+    def test_cells_respect_field_budgets(self):
+        row = {"plcy_no": "1", "plcy_nm": "정책", "plcy_sprt_cn": "지원 " * 1000, "plcy_expln_cn": "탭\t줄바꿈\n포함"}
+        text, _ = serialize_policies([row])
+        header, line = text.split("\n")
+        self.assertEqual(header.split("\t"), list(ANSWER_FIELDS))
+        cells = dict(zip(ANSWER_FIELDS, line.split("\t")))
+        self.assertEqual(cells["plcy_expln_cn"], "탭 줄바꿈 포함")
+        self.assertLessEqual(count_tokens(cells["plcy_sprt_cn"]), FIELD_TOKEN_BUDGETS["plcy_sprt_cn"] + 2)
+
+    def test_field_budgets_override_defaults(self):
+        row = {"plcy_no": "1", "plcy_sprt_cn": "지원 " * 1000}
+        default, _ = serialize_policies([row])
+        larger, _ = serialize_policies([row], field_budgets={"plcy_sprt_cn": 400})
+        self.assertGreater(len(larger), len(default))
+
+    def test_detail_budgets_are_larger(self):
+        row = {"plcy_no": "1", "plcy_sprt_cn": "지원 " * 1000}
+        answer, _ = serialize_policies([row])
+        detail, _ = serialize_policies([row], fields=DETAIL_FIELDS, field_budgets=DETAIL_FIELD_TOKEN_BUDGETS)
+        self.assertGreater(len(detail), len(answer))
+
+    def test_total_budget_drops_trailing_rows(self):
+        rows = [{"plcy_no": str(i), "plcy_expln_cn": "설명 " * 50} for i in range(10)]
+        full, full_tokens = serialize_policies(rows)
+        limited, limited_tokens = serialize_policies(rows, total_token_budget=full_tokens // 2)
+        self.assertLess(limited.count("\n"), full.count("\n"))
+        self.assertLessEqual(limited_tokens, full_tokens // 2)
+
+
+async def sse_events(response):
+    """SSE 응답 -> [(이벤트, 데이터)]"""
+    body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+async def astream(*items):
+    for item in items:
+        yield item
+
+
+class SelectionPrefixFilterTests(SimpleTestCase):
+    def feed(self, chunks):
+        prefix_filter = SelectionPrefixFilter()
+        return "".join(prefix_filter.feed(chunk) for chunk in chunks)
+
+    def test_strips_selection_line_split_across_tokens(self):
+        self.assertEqual(self.feed(["선정", " 정책: 1, ", "2\n", "\n", "답변", "입니다"]), "답변입니다")
+
+    def test_answer_without_prefix_passes_through(self):
+        self.assertEqual(self.feed(["선", "택하신 조건의 ", "정책입니다"]), "선택하신 조건의 정책입니다")
+
+
+class SendMessageStreamTests(SimpleTestCase):
+    def setUp(self):
+        patches = {
+            "get_graph": mock.patch("Chatbot.views.get_graph"),
+            "session": mock.patch("Chatbot.views.ChatSession"),
+            "message": mock.patch("Chatbot.views.Message"),
+            "interests": mock.patch("Chatbot.views.save_recommend_interests"),
+            "summary": mock.patch("Chatbot.views.schedule_conversation_summary"),
+        }
+        self.mocks = {name: patcher.start() for name, patcher in patches.items()}
+        for patcher in patches.values():
+            self.addCleanup(patcher.stop)
+        self.mocks["graph"] = self.mocks["get_graph"].return_value
+        self.mocks["session"].objects.acreate = mock.AsyncMock(return_value=mock.Mock(session_id=7))
+        self.mocks["message"].objects.acreate = mock.AsyncMock(
+            side_effect=lambda **fields: mock.Mock(msg_id=len(self.saved()), **fields),
+        )
+
+    def saved(self):
+        return self.mocks["message"].objects.acreate.call_args_list
+
+    async def post(self, body):
+        request = RequestFactory().post("/chatbot/api/chat/stream/", json.dumps(body), content_type="application/json")
+        request.user = mock.Mock()
+        return await send_message_stream(request)
+
+    async def test_streams_progress_tokens_then_saves_messages(self):
+        answer_tags = {"tags": [ANSWER_STREAM_TAG]}
+        self.mocks["graph"].astream.return_value = astream(
+            ("updates", {"analyze_query": {"query_analysis": analysis(age=27)}}),
+            ("messages", (AIMessageChunk(content="선정 정책: 1\n"), answer_tags)),
+            ("messages", (AIMessageChunk(content="분석 중"), {"tags": []})),
+            ("messages", (AIMessageChunk(content="답변"), answer_tags)),
+            ("updates", {"generate_response": {"final_response": "답변", "selected_policies": [{"plcy_no": "1"}]}}),
+        )
+        response = await self.post({"message": "전세 지원"})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        events = await sse_events(response)
+        self.assertEqual([event for event, _ in events], ["progress", "progress", "token", "progress", "done"])
+        self.assertEqual(events[2][1], {"content": "답변"})
+        done = events[-1][1]
+        self.assertEqual(done["session_id"], 7)
+        self.assertEqual([message["content"] for message in done["messages"]], ["전세 지원", "답변"])
+        self.assertEqual(done["messages"][1]["sql_result"], [{"plcy_no": "1"}])
+        self.assertEqual(len(self.saved()), 2)
+        self.assertEqual(self.saved()[1].kwargs["query_analysis"]["age"], 27)
+        self.mocks["summary"].assert_called_once()
+
+    async def test_graph_error_is_saved_as_answer(self):
+        self.mocks["graph"].astream.side_effect = RuntimeError("LLM 호출 실패")
+        with self.assertLogs("Chatbot.views", level="ERROR"):
+            events = await sse_events(await self.post({"message": "전세 지원"}))
+        self.assertEqual(events[-1][0], "done")
+        self.assertIn("LLM 호출 실패", events[-1][1]["messages"][1]["content"])
+
+    async def test_empty_message_is_rejected_before_streaming(self):
+        response = await self.post({"message": " "})
+        self.assertEqual(response.status_code, 400)
+        self.mocks["graph"].astream.assert_not_called()
+
+
+class ConditionMatchTests(SimpleTestCase):
+    rows = [
+        policy("all"),
+        policy("young", sprt_trgt_min_age=19, sprt_trgt_max_age=29),
+        policy("married", mrg_stts_cd="기혼"),
+        policy("worker", job_cds=["재직자"]),
+        policy("student", school_cds=["대학 재학", "대학 졸업"]),
+        policy("seoul", zip_cds=["서울특별시"]),
+        policy("guro", zip_cds=["서울특별시 구로구"]),
+        policy("busan", zip_cds=["부산광역시"]),
+        policy("job", lclsf_nm="일자리"),
+        policy("legacy", job_cds=None, job_cd="미취업자, 재직자"),
+    ]
+    analyses = [
+        analysis(),
+        analysis(age=25),
+        analysis(age=35, mrg_stts_cd="미혼"),
+        analysis(job_cd="재직자", school_cd="대학 재학"),
+        analysis(job_cd="미취업자"),
+        analysis(zip_cd="서울특별시 구로구"),
+        analysis(zip_cd="서울특별시 강남구", age=27),
+        analysis(lclsf_nm="일반", zip_cd="부산광역시"),
+    ]
+
+    def test_refine_applies_conditions(self):
+        refined = refine_candidates(self.rows, analysis(age=35, zip_cd="서울특별시 구로구"))
+        self.assertEqual([row["plcy_no"] for row in refined], ["all", "married", "worker", "student", "seoul", "guro", "legacy"])
+
+    def test_legacy_rows_split_comma_codes(self):
+        self.assertTrue(_matches_condition(self.rows[-1], analysis(job_cd="재직자")))
+        self.assertFalse(_matches_condition(self.rows[-1], analysis(job_cd="자영업자")))
+
+    def test_bitmaps_match_row_filter(self):
+        rows = self.rows[:-1]  # 비트맵은 적재된 배열 컬럼만 사용
+        index = EligibilityIndex(rows)
+        for query_analysis in self.analyses:
+            with self.subTest(query_analysis=query_analysis.model_dump(exclude_none=True)):
+                expected = [row["plcy_no"] for row in rows if _matches_condition(row, query_analysis)]
+                self.assertEqual(index.eligible(query_analysis), expected)
+                self.assertEqual(index.count(query_analysis), len(expected))
+
+    def test_refreshed_index_replaces_changed_rows(self):
+        index = EligibilityIndex([policy("1"), policy("2")], version=1)
+        refreshed = index.refreshed([policy("2", zip_cds=["부산광역시"]), policy("3")], version=2)
+        self.assertEqual(refreshed.version, 2)
+        self.assertEqual(refreshed.eligible(analysis(zip_cd="서울특별시")), ["1", "3"])
+        self.assertEqual(index.eligible(analysis(zip_cd="서울특별시")), ["1", "2"])
+
+
+class CandidatePrefetchTests(SimpleTestCase):
+    def config(self, **fields):
+        defaults = {
+            "sql_generation_mode": "template", "retrieval_mode": "trigram", "top_k": 4, "candidate_limit": 30,
+            "embedding_search_dimensions": 0, "branch_timeouts": {}, "schema_check_interval": 300,
+        }
+        return SimpleNamespace(**{**defaults, **fields})
+
+    def patch(self, config, rows=()):
+        patchers = [
+            mock.patch("Chatbot.service.get_config", return_value=config),
+            mock.patch("Chatbot.service.eligible_plcy_nos", mock.AsyncMock(return_value=None)),
+        ]
+        execute = mock.AsyncMock(return_value={"success": True, "data": list(rows), "row_count": len(rows)})
+        patchers.append(mock.patch("Chatbot.service.execute_postgresql_query", execute))
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return execute
+
+    def state(self, **extra):
+        return {"query": "전세", "query_analysis": analysis(), "messages": [HumanMessage(content="전세")], **extra}
+
+    def test_merge_skips_duplicates_and_unmatched(self):
+        candidates = [policy("1"), policy("job", lclsf_nm="일자리"), policy("2"), policy("3")]
+        merged = merge_candidates([policy("1")], candidates, analysis(), top_k=3)
+        self.assertEqual([row["plcy_no"] for row in merged], ["1", "2", "3"])
+
+    async def test_prefetch_only_where_candidates_are_used(self):
+        execute = self.patch(self.config(retrieval_mode="similarity"))
+        self.assertEqual(await service.prefetch_candidates_node(self.state()), {})
+        execute.assert_not_called()
+        execute = self.patch(self.config(sql_generation_mode="llm", retrieval_mode="similarity"), [policy("1")])
+        self.assertEqual(len((await service.prefetch_candidates_node(self.state()))["candidate_policies"]), 1)
+
+    async def test_trigram_shortfall_uses_candidates_instead_of_second_query(self):
+        execute = self.patch(self.config(), [policy("1")])
+        result = await service.generate_sql_query_node(self.state(candidate_policies=[policy("1"), policy("2")]))
+        self.assertEqual([row["plcy_no"] for row in result["sql_result"]], ["1", "2"])
+        self.assertEqual(execute.await_count, 1)
+
+    async def test_trigram_shortfall_without_candidates_searches_again(self):
+        execute = self.patch(self.config(), [policy("1")])
+        await service.generate_sql_query_node(self.state())
+        self.assertEqual(execute.await_count, 2)
+
+    async def test_schema_prefetch_skips_fresh_or_loading_snapshot(self):
+        self.patch(self.config())
+        with mock.patch("Chatbot.service.get_cached_postgresql_schema") as load:
+            with mock.patch("Chatbot.service.schema_snapshot_fresh", return_value=True):
+                await service.prefetch_schema_node({})
+            with mock.patch("Chatbot.service.schema_snapshot_fresh", return_value=False):
+                with service._schema_cache_lock:
+                    await service.prefetch_schema_node({})
+                load.assert_not_called()
+                await service.prefetch_schema_node({})
+            load.assert_called_once()
+
+
+class QueryCacheTests(SimpleTestCase):
+    def test_normalized_text_hits_exactly(self):
+        cache = SemanticQueryCache()
+        cache.set("서울 사는 27살 전세대출!", None, "analysis")
+        self.assertEqual(cache.get_exact("  서울 사는 27살   전세대출 "), "analysis")
+        self.assertEqual(cache.stats()["exact_hits"], 1)
+
+    def test_similar_query_must_share_numbers_and_entities(self):
+        cache = SemanticQueryCache(similarity_threshold=0.9)
+        cache.set("서울 사는 27살 전세대출", [1.0, 0.0], "seoul")
+        self.assertEqual(cache.get_similar("서울에 사는 27살인데 전세대출", [1.0, 0.01]), "seoul")
+        self.assertIsNone(cache.get_similar("서울 사는 28살 전세대출", [1.0, 0.0]))
+        self.assertIsNone(cache.get_similar("부산 사는 27살 전세대출", [1.0, 0.0]))
+        self.assertIsNone(cache.get_similar("서울 사는 27살 기혼 전세대출", [1.0, 0.0]))
+        self.assertIsNone(cache.get_similar("서울 사는 27살 전세대출", [0.0, 1.0]))
+        self.assertEqual((cache.stats()["semantic_hits"], cache.stats()["misses"]), (1, 4))
+
+    def test_entities_use_canonical_region_names(self):
+        self.assertEqual(query_entities(normalize_query("서울시 강남구")), query_entities(normalize_query("서울 강남구에")))
+        self.assertEqual(query_entities(normalize_query("대학생 직장인")), frozenset({"대학 재학", "재직자"}))
+
+    def test_lru_eviction_and_ttl(self):
+        cache = SemanticQueryCache(max_entries=2)
+        for query in ("전세", "월세", "취업"):
+            cache.set(query, None, query)
+        self.assertIsNone(cache.get_exact("전세"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+        cache = SemanticQueryCache(ttl_seconds=10)
+        with mock.patch("Chatbot.query_cache.time.monotonic", return_value=0):
+            cache.set("전세", None, "value")
+        with mock.patch("Chatbot.query_cache.time.monotonic", return_value=11):
+            self.assertIsNone(cache.get_exact("전세"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+
+class QueryCacheAnalysisTests(SimpleTestCase):
+    query = "서울 사는 27살 전세대출"
+
+    def setUp(self):
+        self.cache = SemanticQueryCache(similarity_threshold=0.9)
+        config = SimpleNamespace(query_cache_enabled=True, query_cache=self.cache)
+        self.analysis_started = asyncio.Event()
+        self.analysis_cancelled = False
+
+        async def analyze(inputs):
+            self.analysis_started.set()
+            try:
+                await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                self.analysis_cancelled = True
+                raise
+            return analysis(age=27, zip_cd="서울특별시")
+
+        async def embed(query):
+            # 임베딩 대기 중에 질의 분석이 이미 시작되어 있어야 함
+            await asyncio.wait_for(self.analysis_started.wait(), 1)
+            return [1.0, 0.0]
+
+        patchers = [
+            mock.patch("Chatbot.service.get_config", return_value=config),
+            mock.patch("Chatbot.service.build_query_analysis_chain", return_value=SimpleNamespace(ainvoke=analyze)),
+            mock.patch("Chatbot.service.embed_query_for_cache", embed),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def state(self, query):
+        return {"messages": [HumanMessage(content=query)]}
+
+    async def test_miss_runs_analysis_alongside_embedding(self):
+        result = await service.analyze_query_node(self.state(self.query))
+        self.assertEqual(result["query_analysis"].age, 27)
+        self.assertFalse(self.analysis_cancelled)
+        self.assertEqual(self.cache.stats()["size"], 1)
+
+    async def test_semantic_hit_cancels_analysis(self):
+        self.cache.set(self.query, [1.0, 0.0], analysis(age=27, query_keywords="캐시"))
+        result = await service.analyze_query_node(self.state("서울에 사는 27살인데 전세대출"))
+        await asyncio.sleep(0)
+        self.assertEqual(result["query_analysis"].query_keywords, "캐시")
+        self.assertTrue(self.analysis_cancelled)
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def test_key_ignores_confidence_and_keyword_order(self):
+        first = analysis(query_keywords="전세 대출", classification_confidence=0.9, reasoning="a")
+        second = analysis(query_keywords="대출,  전세", classification_confidence=0.5, reasoning="b")
+        self.assertEqual(response_cache_key(first, top_k=10), response_cache_key(second, top_k=10))
+        self.assertNotEqual(response_cache_key(first, top_k=10), response_cache_key(first, top_k=5))
+        self.assertNotEqual(response_cache_key(first), response_cache_key(analysis(query_keywords="전세 대출", age=27)))
+
+    def test_version_change_invalidates(self):
+        cache = ResponseCache()
+        cache.set("key", 1, {"final_response": "답변"})
+        self.assertEqual(cache.get("key", 1), {"final_response": "답변"})
+        self.assertIsNone(cache.get("key", 2))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_values_are_copied(self):
+        cache = ResponseCache()
+        value = {"selected_policies": [{"plcy_no": "1"}]}
+        cache.set("key", 1, value)
+        value["selected_policies"].append({"plcy_no": "2"})
+        cache.get("key", 1)["selected_policies"].clear()
+        self.assertEqual(cache.get("key", 1), {"selected_policies": [{"plcy_no": "1"}]})
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", 1, {})
+        cache.set("b", 1, {})
+        cache.get("a", 1)
+        cache.set("c", 1, {})
+        self.assertIsNone(cache.get("b", 1))
+        self.assertIsNotNone(cache.get("a", 1))
+
+
+class MetricsState(TypedDict, total=False):
+    answer: str
+
+
+def metrics_graph(loops=None):
+    """테스트용 그래프 - DB 조회 노드 + LLM 호출 노드 (service.graph_node로 등록, loops에 노드 실행 루프 기록)"""
+    model = GenericFakeChatModel(messages=iter([
+        AIMessage(content="답변", usage_metadata={"input_tokens": 30, "output_tokens": 7, "total_tokens": 37}),
+    ]))
+
+    async def search(state):
+        if loops is not None:
+            loops.append(asyncio.get_running_loop())
+        await arecord_db_query(0.02, 5)
+        return {}
+
+    async def respond(state):
+        return {"answer": (await model.ainvoke("질문")).content}
+
+    builder = StateGraph(MetricsState)
+    builder.add_node("search", service.graph_node(search))
+    builder.add_node("respond", service.graph_node(respond))
+    builder.add_edge(START, "search")
+    builder.add_edge("search", "respond")
+    builder.add_edge("respond", END)
+    return builder.compile()
+
+
+class ChatMetricsCallbackTests(SimpleTestCase):
+    async def test_collects_stage_times_tokens_and_db_queries(self):
+        metrics = ChatMetricsCallback()
+        result = await metrics_graph().ainvoke({}, config={"callbacks": [metrics]})
+        self.assertEqual(result["answer"], "답변")
+
+        summary = metrics.as_dict()
+        self.assertEqual(set(summary["stages_ms"]), {TOTAL_STAGE, "search", "respond"})
+        self.assertEqual(summary["tokens"], {"respond": {"prompt": 30, "completion": 7}})
+        self.assertEqual((summary["db"]["queries"], summary["db"]["rows"], summary["db"]["time_ms"]), (1, 5, 20.0))
+
+    def test_sync_invoke_runs_async_nodes_with_callbacks(self):
+        # invoke는 비동기 노드를 백그라운드 루프 하나에서 실행하고 콜백 컨텍스트를 그대로 전달
+        loops = []
+        for _ in range(2):
+            metrics = ChatMetricsCallback()
+            result = metrics_graph(loops).invoke({}, config={"callbacks": [metrics]})
+            self.assertEqual(result["answer"], "답변")
+            summary = metrics.as_dict()
+            self.assertEqual(summary["tokens"], {"respond": {"prompt": 30, "completion": 7}})
+            self.assertEqual(summary["db"]["queries"], 1)
+        self.assertIs(loops[0], loops[1])
+
+    async def test_async_invoke_awaits_nodes_on_running_loop(self):
+        loops = []
+        await metrics_graph(loops).ainvoke({})
+        self.assertEqual(loops, [asyncio.get_running_loop()])
+
+    def test_db_query_outside_graph_is_recorded_without_callback(self):
+        record_db_query(0.01, 3)
+
+    def test_stats_collector_reads_sources_at_scrape_time(self):
+        collector = StatsCollector(
+            "cache", gauges={"size": ("test_entries", "항목 수")}, counters={"hits": ("test_hits", "적중 수")},
+        )
+        self.assertEqual([family.samples for family in collector.collect()], [[], []])
+        collector.set_source(lambda: [("response", {"size": 3, "hits": 2}), ("query_analysis", {"size": 1})])
+        size, hits = collector.collect()
+        self.assertEqual(
+            [(sample.labels, sample.value) for sample in size.samples],
+            [({"cache": "response"}, 3), ({"cache": "query_analysis"}, 1)],
+        )
+        self.assertEqual([sample.value for sample in hits.samples if sample.name == "test_hits_total"], [2])
+
+    def test_stats_sources_do_not_create_config(self):
+        # 설정 생성 전 스크레이프는 빈 지표 (수집만으로 OpenAI 클라이언트/풀을 만들지 않음)
+        with mock.patch.object(service, "_config", None), mock.patch.object(service, "YouthPolicyRAGConfig") as factory:
+            self.assertEqual((service.db_pool_stats(), service.cache_stats()), ([], []))
+        factory.assert_not_called()
+
+
+class MetricsViewTests(SimpleTestCase):
+    def get(self, authorization=None):
+        headers = {"HTTP_AUTHORIZATION": authorization} if authorization else {}
+        return metrics_view(RequestFactory().get("/chatbot/metrics/", **headers))
+
+    @override_settings(METRICS_TOKEN="")
+    def test_hidden_without_configured_token(self):
+        self.assertEqual(self.get("Bearer ").status_code, 404)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_requires_matching_bearer_token(self):
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(self.get("Bearer wrong").status_code, 403)
+        response = self.get("Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"chatbot_stage_duration_seconds", response.content)
+
+
+class SqlGuardTests(SimpleTestCase):
+    def test_accepts_select_and_applies_limit(self):
+        self.assertIn("LIMIT 30", guard_select("SELECT * FROM policies WHERE lclsf_nm = '주거'", 30))
+        self.assertIn("LIMIT 5", guard_select("SELECT * FROM policies LIMIT 5", 30))
+        self.assertIn("LIMIT 30", guard_select("SELECT * FROM policies LIMIT 1000", 30))
+        self.assertIn("UNION ALL", guard_select("(SELECT * FROM policies) UNION ALL (SELECT * FROM policies)", 30))
+
+    def test_rejects_unsafe_queries(self):
+        cases = {
+            "DELETE FROM policies": "statement",
+            "SELECT 1; DROP TABLE policies": "statement",
+            "SELECT * INTO backup FROM policies": "forbidden",
+            "SELECT pg_sleep(10)": "forbidden",
+            "SELECT * FROM generate_series(1, 100000000)": "forbidden",
+            "WITH d AS (DELETE FROM policies RETURNING *) SELECT * FROM d": "forbidden",
+            "SELECT * FROM policies FOR UPDATE": "forbidden",
+        }
+        for sql_query, reason in cases.items():
+            with self.subTest(sql_query=sql_query):
+                with self.assertRaises(UnsafeQueryError) as raised:
+                    guard_select(sql_query, 30)
+                self.assertEqual(raised.exception.reason, reason)
+
+
+class MemoryTests(SimpleTestCase):
+    def rows(self, count):
+        return [
+            {"msg_id": i, "sender": "user" if i % 2 else "chatbot", "content": f"메시지 {i}",
+             "sql_result": [{"plcy_no": str(i)}] if i % 2 == 0 else None,
+             "query_analysis": {"lclsf_nm": "주거"} if i % 2 == 0 else None}
+            for i in range(1, count + 1)
+        ]
+
+    def test_split_only_over_window(self):
+        self.assertEqual(split_for_summary(self.rows(4), 4), ([], self.rows(4)))
+        folded, kept = split_for_summary(self.rows(5), 4)
+        self.assertEqual([row["msg_id"] for row in folded], [1, 2, 3])
+        self.assertEqual([row["msg_id"] for row in kept], [4, 5])
+
+    def test_history_keeps_recent_messages_within_budget(self):
+        messages = history_messages(self.rows(6), token_budget=12, message_tokens=100)
+        self.assertEqual([message.content for message in messages][-1], "메시지 6")
+        self.assertLess(len(messages), 6)
+        self.assertIsInstance(messages[-1], AIMessage)
+
+    def test_previous_turn_is_last_chatbot_message(self):
+        self.assertEqual(previous_turn(self.rows(5)), ({"lclsf_nm": "주거"}, [{"plcy_no": "4"}]))
+        self.assertEqual(previous_turn(self.rows(1)), (None, None))
+
+    def test_context_references(self):
+        for query in ("그 정책 신청 방법은?", "두 번째 거 자세히", "부산은?", "다른 거 없어?"):
+            with self.subTest(query=query):
+                self.assertTrue(refers_to_context(query))
+        for query in ("서울 사는 27살 전세대출", "청년이 지원받을 수 있는 월세 정책", "청년도약계좌 설명해줘"):
+            with self.subTest(query=query):
+                self.assertFalse(refers_to_context(query))
+        self.assertTrue(refers_to_previous_policy("그 정책 신청 방법은?"))
+        self.assertFalse(refers_to_previous_policy("청년도약계좌 신청 방법은?"))
+
+
+class RouteAfterAnalysisTests(SimpleTestCase):
+    def state(self, query, query_analysis, followup=False, **extra):
+        state = {"query": query, "query_analysis": query_analysis, "messages": [HumanMessage(content=query)], **extra}
+        if followup:
+            state.update(previous_analysis=analysis(age=27), previous_policies=[{"plcy_no": "1"}])
+        return state
+
+    def test_search_and_reject(self):
+        self.assertEqual(route_after_analysis(self.state("전세", analysis())), "continue")
+        self.assertEqual(route_after_analysis(self.state("날씨", analysis(lclsf_nm="기타"))), "reject")
+        self.assertEqual(route_after_analysis(self.state("전세", analysis(), error="실패")), "reject")
+        self.assertEqual(route_after_analysis(self.state("전세", None)), "reject")
+
+    def test_detail_tries_policy_lookup_first(self):
+        detail = analysis(query_intent="정책 상세 설명")
+        self.assertEqual(route_after_analysis(self.state("청년도약계좌 알려줘", detail)), "detail")
+        self.assertEqual(route_after_analysis(self.state("청년도약계좌 신청 방법은?", detail, followup=True)), "detail")
+        self.assertEqual(route_after_analysis(self.state("20250521005400110863 두 번째", detail, followup=True)), "detail")
+
+    def test_reference_to_previous_policy_is_followup(self):
+        detail = analysis(query_intent="정책 상세 설명")
+        self.assertEqual(route_after_analysis(self.state("그 정책 신청 방법은?", detail, followup=True)), "followup")
+
+    def test_unresolved_detail_falls_back(self):
+        detail = analysis(query_intent="정책 상세 설명")
+        resolved = self.state("청년도약계좌", detail, followup=True, sql_result=[{"plcy_no": "9"}])
+        self.assertEqual(route_after_policy_detail(resolved), "answer")
+        self.assertEqual(route_after_policy_detail(self.state("청년도약계좌", detail, followup=True)), "followup")
+        self.assertEqual(route_after_policy_detail(self.state("청년도약계좌", detail)), "search")
+
+
+class PreClassifierTests(SimpleTestCase):
+    classifier = PreClassifier()
+
+    def test_routes_with_two_keywords(self):
+        result = self.classifier.classify("서울 사는 27살 미혼 전세 월세 지원")
+        self.assertEqual((result.decision, result.lclsf_nm), ("route", "주거"))
+        self.assertEqual(result.conditions, {"age": 27, "zip_cd": "서울특별시", "mrg_stts_cd": "미혼"})
+
+    def test_single_keyword_without_model_escalates(self):
+        self.assertIsNone(self.classifier.classify("서울 사는 27살 전세대출"))
+
+    def test_false_positives_escalate(self):
+        for query in ("전세계 여행 지원", "경기 불황인데 취업 지원 있어?", "군대 가기 전 훈련 지원", "노래방 알바"):
+            with self.subTest(query=query):
+                self.assertIsNone(self.classifier.classify(query))
+
+    def test_keywords_match_word_starts(self):
+        self.assertEqual(domain_keywords("전세계 여행"), {"주거": ["전세"]})  # 관용 표현은 classify에서 먼저 제거
+        self.assertEqual(domain_keywords("청년전세 전월세"), {"주거": ["전세", "전월세"]})
+        self.assertEqual(domain_keywords("미취업자"), {})
+
+    def test_region_needs_word_boundary(self):
+        self.assertEqual(extract_region("경기 사는 25살")[0], "경기도")
+        self.assertEqual(extract_region("경기도 수원시 팔달구에 살아")[0], "경기도 수원시 팔달구")
+        self.assertIsNone(extract_region("경기가 안 좋아")[0])
+        self.assertIsNone(extract_region("광대구")[0])
+
+    def test_unknown_region_escalates(self):
+        self.assertIsNone(extract_conditions("판교에 사는 25살"))
+        self.assertIsNone(extract_conditions("50살"))
+
+    def test_rejects(self):
+        self.assertEqual(self.classifier.classify("안녕하세요").decision, "reject")
+        self.assertEqual(self.classifier.classify("주식이랑 코인 추천").decision, "reject")
+        self.assertIsNone(self.classifier.classify("오늘 날씨 어때?"))  # 두 번째 근거 없음
+        self.assertIsNone(self.classifier.classify("20250521005400110863 정책 알려줘"))
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.urls import path
-from .views import chatbot_view, send_message, session_list, session_detail, search_chat_history, save_interest
+from .views import chatbot_view, send_message, send_message_stream, session_list, session_detail, search_chat_history, save_interest, metrics_view
 
 app_name = "chatbot"
 
@@ -8,8 +8,10 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', chatbot_view, name='chatbot'),
     path('api/chat/', send_message, name='send_message'),
+    path('api/chat/stream/', send_message_stream, name='send_message_stream'),
     path('api/sessions/', session_list, name='session_list'),
     path('api/sessions/<int:session_id>/', session_detail, name='session_detail'),
     path('api/search/', search_chat_history, name='search_chat_history'),
     path('api/interest/', save_interest, name='save_interest'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
@@ -1,11 +1,18 @@
 import json
+import hmac
+import asyncio
 import logging
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.db.models import Max, Q
-from .service import graph
+from asgiref.sync import sync_to_async
+from .service import get_graph, get_config, conversation_state, summarize_conversation, ANSWER_STREAM_TAG, SelectionPrefixFilter
+from .memory import split_for_summary
+from .metrics import ChatMetricsCallback
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from django.conf import settings
 from User.services import verify_and_refresh_tokens
 from functools import wraps
 from User.models import User
@@ -194,9 +201,166 @@ def search_chat_history(request):
     
     return JsonResponse({'error': '잘못된 요청입니다.'}, status=400)
 
+# 그래프 결과(GraphState)에서 챗봇 응답 텍스트 추출
+def extract_bot_response(graph_result):
+    if isinstance(graph_result, dict):
+        if 'final_response' in graph_result and graph_result['final_response']:
+            logger.info("final_response에서 응답 추출 성공")
+            return graph_result['final_response']
+        elif 'error' in graph_result and graph_result['error']:
+            logger.info("error 필드에서 응답 추출")
+            return graph_result['error']
+        elif 'messages' in graph_result and graph_result['messages']:
+            # 마지막 AI 메시지에서 내용 추출
+            last_message = graph_result['messages'][-1]
+            logger.info("messages에서 응답 추출")
+            return last_message.content if hasattr(last_message, 'content') else str(last_message)
+        logger.warning("그래프 결과에서 응답을 찾을 수 없음")
+        return "죄송합니다. 응답을 생성할 수 없습니다."
+    # 그래프 결과가 문자열인 경우 (이전 버전 호환성)
+    logger.info("그래프 결과를 문자열로 변환")
+    return str(graph_result)
+
+# sql_result에서 필요한 필드만 필터링
+def filter_sql_result(graph_result):
+    if not isinstance(graph_result, dict) or not graph_result.get('sql_result'):
+        return None
+    filtered_sql_result = []
+    for policy in graph_result['sql_result']:
+        filtered_sql_result.append({
+            'plcy_no': policy.get('plcy_no'),
+            'plcy_nm': policy.get('plcy_nm'),
+            'plcy_expln_cn': policy.get('plcy_expln_cn'),
+            'lclsf_nm': policy.get('lclsf_nm'),
+            'mclsf_nm': policy.get('mclsf_nm'),
+            'zip_cd': policy.get('zip_cd'),
+            'inq_cnt': policy.get('inq_cnt', 0)
+        })
+    return filtered_sql_result
+
+# LLM 추천 정책을 관심(추천)으로 저장
+def save_recommend_interests(user, filtered_sql_result):
+    if not user or not user.is_authenticated or not filtered_sql_result:
+        return
+    for policy_data in filtered_sql_result:
+        plcy_no = policy_data.get('plcy_no')
+        if plcy_no:
+            try:
+                policy_obj = Policies.objects.get(plcy_no=plcy_no)
+                RecommendInterest.objects.get_or_create(
+                    user=user,
+                    plcy_no=policy_obj,
+                    interest_status='추천'
+                )
+            except Policies.DoesNotExist:
+                pass  # 정책이 DB에 없으면 무시
+
+# 메시지 검증 후 (세션, 오류 응답) 반환 - create=False면 새 세션은 만들지 않고 None 반환
+def get_chat_session(request, message, session_id, create=True):
+    # 메시지가 비어있으면 세션 생성 및 메시지 저장을 하지 않음
+    if not message:
+        return None, JsonResponse({'error': '메시지가 비어있습니다. 세션이 생성되지 않았습니다.'}, status=400)
+    
+    # 세션 ID가 있으면 기존 세션 사용, 없으면 새 세션 생성
+    if session_id:
+        try:
+            return ChatSession.objects.get(session_id=session_id, user=request.user), None
+        except ChatSession.DoesNotExist:
+            return None, JsonResponse({'error': '세션을 찾을 수 없습니다.'}, status=404)
+    
+    if not create:
+        return None, None
+    # 새 세션 생성 시 첫 번째 질문을 세션 제목으로 사용
+    return ChatSession.objects.create(user=request.user, session_nm=message), None
+
+# 세션의 요약되지 않은 메시지 (오래된 순, limit이 있으면 최근 limit개) - 대화 메모리에 필요한 필드만 조회
+async def load_unsummarized_messages(session, limit=None):
+    queryset = Message.objects.filter(session=session)
+    if session.summary_msg_id:
+        queryset = queryset.filter(msg_id__gt=session.summary_msg_id)
+    queryset = queryset.order_by('-msg_id').values('msg_id', 'sender', 'content', 'sql_result', 'query_analysis')
+    if limit:
+        queryset = queryset[:limit]
+    rows = [row async for row in queryset]
+    return list(reversed(rows))
+
+# 그래프 입력 (세션의 최근 대화 + 누적 요약 + 현재 질문) - 현재 질문 메시지를 저장하기 전에 호출
+async def build_graph_input(session, message, cache_bypass):
+    from langchain_core.messages import HumanMessage
+    
+    state = {}
+    if session is not None:
+        rows = await load_unsummarized_messages(session, get_config().memory_max_messages)
+        state = conversation_state(rows, session.summary)
+    return {
+        **state,
+        "messages": state.get("messages", []) + [HumanMessage(content=message)],
+        "query": message,
+        "cache_bypass": cache_bypass  # True면 캐시 없이 새로 분석
+    }
+
+# 최근 메시지 창을 넘은 오래된 메시지를 세션 누적 요약에 반영 (실패해도 다음 턴에 다시 시도)
+async def update_conversation_summary(session):
+    rows = await load_unsummarized_messages(session)
+    folded, _ = split_for_summary(rows, get_config().memory_max_messages)
+    if not folded:
+        return
+    try:
+        session.summary = await summarize_conversation(session.summary, folded)
+    except Exception as e:
+        logger.warning(f"대화 요약 실패: {e}")
+        return
+    session.summary_msg_id = folded[-1]['msg_id']
+    await session.asave(update_fields=['summary', 'summary_msg_id'])
+
+# 진행 중인 요약 작업 (세션 ID -> 작업) - 작업 참조를 유지하고 같은 세션의 요약이 겹치지 않도록 함
+_summary_tasks = {}
+
+def _summary_task_done(session_id, task):
+    _summary_tasks.pop(session_id, None)
+    if not task.cancelled() and task.exception():
+        logger.warning(f"대화 요약 갱신 실패: {task.exception()}")
+
+# 응답을 보낸 뒤 백그라운드에서 요약 갱신 (응답 대기 시간에 포함되지 않음)
+# - 이벤트 루프가 요청과 함께 끝나 작업이 취소되면 다음 턴에 다시 시도
+def schedule_conversation_summary(session):
+    if session.session_id in _summary_tasks:
+        return
+    task = asyncio.create_task(update_conversation_summary(session))
+    _summary_tasks[session.session_id] = task
+    task.add_done_callback(lambda task: _summary_task_done(session.session_id, task))
+
+# 챗봇 메시지에 저장할 질의 분석 결과 (후속 질문에서 재사용)
+def analysis_payload(graph_result):
+    query_analysis = graph_result.get('query_analysis') if isinstance(graph_result, dict) else None
+    return query_analysis.model_dump() if query_analysis is not None else None
+
+# 저장된 사용자/챗봇 메시지를 응답 형식으로 변환
+def build_message_payload(session, user_message, bot_message, selected_policies):
+    return {
+        'status': 'success',
+        'session_id': session.session_id,
+        'messages': [
+            {
+                'id': user_message.msg_id,
+                'sender': 'user',
+                'content': user_message.content,
+                'created_at': timezone.localtime(user_message.create_dt).strftime('%Y-%m-%d %H:%M')
+            },
+            {
+                'id': bot_message.msg_id,
+                'sender': 'chatbot',
+                'content': bot_message.content,
+                'sql_result': selected_policies,
+                'created_at': timezone.localtime(bot_message.create_dt).strftime('%Y-%m-%d %H:%M')
+            }
+        ]
+    }
+
 # 메시지 전송 및 응답 처리
+# - async 뷰: ASGI(uvicorn/daphne)에서 LLM 응답을 기다리는 동안 워커 스레드를 점유하지 않음
 @csrf_exempt
-def send_message(request):
+async def send_message(request):
     if request.method == 'POST':
         try:
             # 클라이언트에서 전달된 JSON 문자열을 Python 딕셔너리로 변환
@@ -206,139 +370,179 @@ def send_message(request):
             # 세션 ID 추출
             session_id = data.get('session_id')
             
-            # 메시지가 비어있으면 세션 생성 및 메시지 저장을 하지 않음
-            if not message:
-                return JsonResponse({'error': '메시지가 비어있습니다. 세션이 생성되지 않았습니다.'}, status=400)
+            # 세션 조회 또는 생성
+            session, error_response = await sync_to_async(get_chat_session)(request, message, session_id)
+            if error_response:
+                return error_response
             
-            # 세션 ID가 있으면 기존 세션 사용, 없으면 새 세션 생성
-            if session_id:
-                try:
-                    session = ChatSession.objects.get(session_id=session_id, user=request.user)
-                except ChatSession.DoesNotExist:
-                    return JsonResponse({'error': '세션을 찾을 수 없습니다.'}, status=404)
-            else:
-                # 새 세션 생성 시 첫 번째 질문을 세션 제목으로 사용
-                current_time = timezone.localtime(timezone.now())
-                session_name = message if message else f"대화 {current_time.strftime('%Y-%m-%d %H:%M')}"
-                session = ChatSession.objects.create(
-                    user=request.user,
-                    session_nm=session_name
-                )
+            # 세션의 이전 대화를 포함한 그래프 입력 (사용자 메시지 저장 전에 조회)
+            graph_input = await build_graph_input(session, message, bool(data.get('cache_bypass')))
             
             # 사용자 메시지 저장
-            user_message = Message.objects.create(
+            user_message = await Message.objects.acreate(
                 session=session,
                 sender='user',
                 content=message,
                 create_dt=timezone.localtime(timezone.now())
             )
             
-            # 챗봇 응답 생성
+            # 챗봇 응답 생성 (단계별 처리 시간/토큰/DB 지표 수집)
+            turn_metrics = ChatMetricsCallback()
             try:
                 logger.info(f"사용자 메시지 처리 시작: {user_message.content}")
                 
-                # LangGraph의 invoke 메서드 호출 - GraphState 형태로 반환됨
-                # HumanMessage 객체로 감싸서 전달
-                from langchain_core.messages import HumanMessage
-                
-                graph_result = graph.invoke({
-                    "messages": [HumanMessage(content=user_message.content)],
-                    "query": user_message.content
-                })
+                # LangGraph의 ainvoke 메서드 호출 - GraphState 형태로 반환됨
+                graph_result = await get_graph().ainvoke(graph_input, config={"callbacks": [turn_metrics]})
                 
                 logger.info(f"그래프 결과 타입: {type(graph_result)}")
                 logger.info(f"그래프 결과 키들: {graph_result.keys() if isinstance(graph_result, dict) else 'Not a dict'}")
                 
                 # GraphState에서 final_response 추출
-                if isinstance(graph_result, dict):
-                    if 'final_response' in graph_result and graph_result['final_response']:
-                        bot_response = graph_result['final_response']
-                        logger.info("final_response에서 응답 추출 성공")
-                    elif 'error' in graph_result:
-                        bot_response = graph_result['error']
-                        logger.info("error 필드에서 응답 추출")
-                    elif 'messages' in graph_result and graph_result['messages']:
-                        # 마지막 AI 메시지에서 내용 추출
-                        last_message = graph_result['messages'][-1]
-                        bot_response = last_message.content if hasattr(last_message, 'content') else str(last_message)
-                        logger.info("messages에서 응답 추출")
-                    else:
-                        bot_response = "죄송합니다. 응답을 생성할 수 없습니다."
-                        logger.warning("그래프 결과에서 응답을 찾을 수 없음")
-                else:
-                    # 그래프 결과가 문자열인 경우 (이전 버전 호환성)
-                    bot_response = str(graph_result)
-                    logger.info("그래프 결과를 문자열로 변환")
+                bot_response = extract_bot_response(graph_result)
                     
             except Exception as graph_error:
                 logger.error(f"그래프 처리 중 오류: {graph_error}", exc_info=True)
+                graph_result = None
                 bot_response = f"죄송합니다. 요청을 처리하는 중 오류가 발생했습니다: {str(graph_error)}"
             
             # 챗봇 메시지 저장
             # sql_result에서 필요한 필드만 필터링
-            filtered_sql_result = None
-            if isinstance(graph_result, dict) and 'sql_result' in graph_result and graph_result['sql_result']:
-                filtered_sql_result = []
-                for policy in graph_result['sql_result']:
-                    filtered_policy = {
-                        'plcy_no': policy.get('plcy_no'),
-                        'plcy_nm': policy.get('plcy_nm'),
-                        'plcy_expln_cn': policy.get('plcy_expln_cn'),
-                        'lclsf_nm': policy.get('lclsf_nm'),
-                        'mclsf_nm': policy.get('mclsf_nm'),
-                        'zip_cd': policy.get('zip_cd'),
-                        'inq_cnt': policy.get('inq_cnt', 0)
-                    }
-                    filtered_sql_result.append(filtered_policy)
+            filtered_sql_result = filter_sql_result(graph_result)
+            selected_policies = graph_result.get('selected_policies') if isinstance(graph_result, dict) else None
             
-            bot_message = Message.objects.create(
+            bot_message = await Message.objects.acreate(
                 session=session,
                 sender='chatbot',
                 content=bot_response,
-                sql_result=graph_result['selected_policies'],
+                sql_result=selected_policies,
+                metrics=turn_metrics.as_dict(),
+                query_analysis=analysis_payload(graph_result),
                 create_dt=timezone.localtime(timezone.now())
             )
             
             # LLM 추천 정책을 관심(추천)으로 저장
-            if request.user.is_authenticated and filtered_sql_result:
-                for policy_data in filtered_sql_result:
-                    plcy_no = policy_data.get('plcy_no')
-                    if plcy_no:
-                        try:
-                            policy_obj = Policies.objects.get(plcy_no=plcy_no)
-                            RecommendInterest.objects.get_or_create(
-                                user=request.user,
-                                plcy_no=policy_obj,
-                                interest_status='추천'
-                            )
-                        except Policies.DoesNotExist:
-                            pass  # 정책이 DB에 없으면 무시
+            await sync_to_async(save_recommend_interests)(request.user, filtered_sql_result)
+            schedule_conversation_summary(session)
             
-            return JsonResponse({
-                'status': 'success',
-                'session_id': session.session_id,
-                'messages': [
-                    {
-                        'id': user_message.msg_id,
-                        'sender': 'user',
-                        'content': message,
-                        'created_at': timezone.localtime(user_message.create_dt).strftime('%Y-%m-%d %H:%M')
-                    },
-                    {
-                        'id': bot_message.msg_id,
-                        'sender': 'chatbot',
-                        'content': bot_response,
-                        'sql_result': graph_result['selected_policies'],
-                        'created_at': timezone.localtime(bot_message.create_dt).strftime('%Y-%m-%d %H:%M')
-                    }
-                ]
-            })
+            return JsonResponse(build_message_payload(session, user_message, bot_message, selected_policies))
         except Exception as e:
             print(f"메시지 처리 중 오류 발생: {e}")
             return JsonResponse({'error': str(e)}, status=500)
     
     return JsonResponse({'error': '잘못된 요청입니다.'}, status=400)
 
+# 스트리밍 진행 이벤트에 표시할 안내 문구 (노드 완료 시점 기준, 다음 단계 안내)
+STREAM_START_LABEL = '질문을 분석하고 있습니다...'
+NODE_PROGRESS_LABELS = {
+    'join_branches': '조건에 맞는 정책을 검색하고 있습니다...',
+    'load_previous_policies': '답변을 작성하고 있습니다...',
+    'resolve_policy_detail': '답변을 작성하고 있습니다...',
+    'generate_sql_query': '답변을 작성하고 있습니다...',
+}
+
+# Server-Sent Events 형식으로 이벤트 직렬화
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+# 메시지 전송 및 응답 스트리밍 처리 (SSE)
+# - progress: 그래프 노드 완료 시점마다 진행 상황 전송
+# - token: 최종 답변 토큰을 생성되는 대로 전송
+# - done: 스트림 완료 후 사용자/챗봇 메시지를 저장하고 저장된 메시지 정보 전송
+@csrf_exempt
+@require_http_methods(["POST"])
+async def send_message_stream(request):
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': '잘못된 요청입니다.'}, status=400)
+    
+    message = data.get('message', '').strip()
+    session_id = data.get('session_id')
+    cache_bypass = bool(data.get('cache_bypass'))  # True면 캐시 없이 새로 분석
+    
+    # 기존 세션은 미리 확인하고, 새 세션은 스트림 완료 후 생성
+    session, error_response = await sync_to_async(get_chat_session)(request, message, session_id, create=False)
+    if error_response:
+        return error_response
+    
+    user = request.user
+    user_created_at = timezone.localtime(timezone.now())
+    
+    async def event_stream():
+        nonlocal session
+        
+        graph_result = {}
+        turn_metrics = ChatMetricsCallback()
+        prefix_filter = SelectionPrefixFilter()
+        streamed_answer = ''
+        
+        yield format_sse('progress', {'node': None, 'message': STREAM_START_LABEL})
+        
+        try:
+            logger.info(f"사용자 메시지 스트리밍 처리 시작: {message}")
+            graph_input = await build_graph_input(session, message, cache_bypass)
+            async for mode, payload in get_graph().astream(
+                graph_input,
+                stream_mode=["updates", "messages"],
+                config={"callbacks": [turn_metrics]}
+            ):
+                if mode == "updates":
+                    # 노드가 반환한 상태를 누적하고 진행 상황 전송
+                    for node_name, node_state in payload.items():
+                        if isinstance(node_state, dict):
+                            graph_result.update(node_state)
+                        yield format_sse('progress', {
+                            'node': node_name,
+                            'message': NODE_PROGRESS_LABELS.get(node_name, '')
+                        })
+                elif mode == "messages":
+                    # 최종 답변 LLM 호출의 토큰만 전송
+                    chunk, metadata = payload
+                    if ANSWER_STREAM_TAG in metadata.get('tags', []) and isinstance(chunk.content, str) and chunk.content:
+                        text = prefix_filter.feed(chunk.content)
+                        if text:
+                            streamed_answer += text
+                            yield format_sse('token', {'content': text})
+            
+            bot_response = extract_bot_response(graph_result) if graph_result else streamed_answer
+        except Exception as graph_error:
+            logger.error(f"그래프 스트리밍 처리 중 오류: {graph_error}", exc_info=True)
+            graph_result = {}
+            bot_response = f"죄송합니다. 요청을 처리하는 중 오류가 발생했습니다: {str(graph_error)}"
+        
+        # 스트림 완료 후 세션/메시지 저장
+        try:
+            if session is None:
+                session = await ChatSession.objects.acreate(user=user, session_nm=message)
+            user_message = await Message.objects.acreate(
+                session=session,
+                sender='user',
+                content=message,
+                create_dt=user_created_at
+            )
+            selected_policies = graph_result.get('selected_policies')
+            bot_message = await Message.objects.acreate(
+                session=session,
+                sender='chatbot',
+                content=bot_response,
+                sql_result=selected_policies,
+                metrics=turn_metrics.as_dict(),
+                query_analysis=analysis_payload(graph_result),
+                create_dt=timezone.localtime(timezone.now())
+            )
+            await sync_to_async(save_recommend_interests)(user, filter_sql_result(graph_result))
+            
+            yield format_sse('done', build_message_payload(session, user_message, bot_message, selected_policies))
+            schedule_conversation_summary(session)
+        except Exception as e:
+            logger.error(f"스트리밍 메시지 저장 중 오류: {e}", exc_info=True)
+            yield format_sse('error', {'error': str(e)})
+    
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx 프록시 버퍼링 비활성화
+    return response
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def save_interest(request):
@@ -365,4 +569,14 @@ def save_interest(request):
     except Policies.DoesNotExist:
         return JsonResponse({'success': False, 'error': '정책 없음'}, status=404)
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+# Prometheus 지표 노출 (챗봇 단계별 처리 시간/토큰/DB 지표)
+# - 로그인 없이 수집기가 호출하므로 METRICS_TOKEN Bearer 토큰으로 확인
+# - METRICS_TOKEN이 설정되지 않았으면 지표를 노출하지 않음 (404)
+def metrics_view(request):
+    if not settings.METRICS_TOKEN:
+        return HttpResponse(status=404)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'):
+        return HttpResponse(status=403)
+    return HttpResponse(generate_latest(), content_type=CONTENT_TYPE_LATEST)
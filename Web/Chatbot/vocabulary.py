@@ -0,0 +1,38 @@
+"""
+질문의 조건 표현 사전 (시/도 이름, 결혼/취업/학력 상태 키워드)
+- 질의 분석 캐시가 유사 질문의 조건이 같은지 비교할 때 사용
+- 사전 분류기가 규칙으로 조건을 추출할 때 사용
+- 값은 policies 조건 컬럼/QueryAnalysis 필드에 저장되는 정식 명칭
+"""
+
+# 시/도 약칭 -> 정식 명칭
+SIDO_NAMES = {
+    "서울": "서울특별시", "부산": "부산광역시", "대구": "대구광역시", "인천": "인천광역시", "광주": "광주광역시",
+    "대전": "대전광역시", "울산": "울산광역시", "세종": "세종특별자치시", "경기": "경기도", "강원": "강원특별자치도",
+    "충북": "충청북도", "충남": "충청남도", "전북": "전북특별자치도", "전남": "전라남도", "경북": "경상북도",
+    "경남": "경상남도", "제주": "제주특별자치도",
+}
+# 약칭이 아닌 도 이름 (개편 전 이름 포함) -> 정식 명칭
+SIDO_FULL_NAMES = {
+    "충청북도": "충청북도", "충청남도": "충청남도", "전라북도": "전북특별자치도", "전라남도": "전라남도",
+    "경상북도": "경상북도", "경상남도": "경상남도", "강원도": "강원특별자치도", "제주도": "제주특별자치도",
+}
+# '~시'로 끝나지만 지역이 아닌 흔한 단어
+NON_REGION_WORDS = {"혹시", "다시", "동시", "당시", "역시", "수시", "상시"}
+
+# (표현, 결혼 상태)
+MARRIAGE_KEYWORDS = (("미혼", "미혼"), ("기혼", "기혼"))
+# ((표현, ...), 취업 상태)
+JOB_KEYWORDS = (
+    (("직장인", "재직"), "재직자"),
+    (("취준", "취업준비", "취업 준비", "미취업", "구직자", "백수"), "미취업자"),
+    (("예비창업", "예비 창업", "창업 준비", "창업자"), "(예비)창업자"),
+)
+# ((표현, ...), 학력)
+SCHOOL_KEYWORDS = (
+    (("대학원", "석사", "박사"), "석·박사"),
+    (("대학생", "대학 재학", "대학교 재학"), "대학 재학"),
+    (("고등학생", "고교생"), "고교 재학"),
+    (("대졸", "대학 졸업"), "대학 졸업"),
+    (("고졸", "고교 졸업", "고등학교 졸업"), "고교 졸업"),
+)
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:32
+
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    # 챗봇이 조회하는 단일 버전 행 생성
+    PolicyDataVersion = apps.get_model('Home', 'PolicyDataVersion')
+    PolicyDataVersion.objects.get_or_create(id=1, defaults={'version': 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Home', '0004_delete_policy_delete_policyraw_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicyDataVersion',
+            fields=[
+                ('id', models.SmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, null=True)),
+            ],
+            options={
+                'verbose_name': '정책 데이터 버전',
+                'verbose_name_plural': '정책 데이터 버전',
+                'db_table': 'policy_data_version',
+                'constraints': [models.CheckConstraint(condition=models.Q(('id', 1)), name='policy_data_version_single_row')],
+            },
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
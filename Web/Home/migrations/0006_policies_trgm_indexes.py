@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:45
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Home', '0005_policydataversion'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='policies',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['plcy_nm'], name='idx_policies_nm_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='policies',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['plcy_expln_cn'], name='idx_policies_expln_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='policies',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['earn_etc_cn'], name='idx_policies_earn_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='policies',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['add_aply_qlfcc_cn'], name='idx_policies_qlfcc_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='policies',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['ptcp_prp_trgt_cn'], name='idx_policies_ptcp_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='policies',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['plcy_nm'], name='idx_policies_nm_trgm_knn', opclasses=['gist_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.1 on 2026-10-18 01:48
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+def split_codes_sql(column):
+    """'재직자, 미취업자' -> {재직자,미취업자} (공백 제거, 빈 값 제외)"""
+    return (
+        f"CASE WHEN {column} IS NULL THEN NULL ELSE ARRAY("
+        f"SELECT btrim(code) FROM unnest(string_to_array({column}, ',')) AS code WHERE btrim(code) <> ''"
+        ") END"
+    )
+
+
+BACKFILL_SQL = "UPDATE policies SET " + ", ".join(
+    f"{column}s = {split_codes_sql(column)}" for column in ('plcy_major_cd', 'job_cd', 'school_cd', 'zip_cd')
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Home', '0006_policies_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policies',
+            name='job_cds',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), null=True, size=None),
+        ),
+        migrations.AddField(
+            model_name='policies',
+            name='plcy_major_cds',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), null=True, size=None),
+        ),
+        migrations.AddField(
+            model_name='policies',
+            name='school_cds',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), null=True, size=None),
+        ),
+        migrations.AddField(
+            model_name='policies',
+            name='zip_cds',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), null=True, size=None),
+        ),
+        # 기존 정책 데이터 채우기 (이후에는 적재 스크립트가 함께 저장)
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='policies',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['plcy_major_cds'], name='idx_policies_major_cds'),
+        ),
+        migrations.AddIndex(
+            model_name='policies',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['job_cds'], name='idx_policies_job_cds'),
+        ),
+        migrations.AddIndex(
+            model_name='policies',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['school_cds'], name='idx_policies_school_cds'),
+        ),
+        migrations.AddIndex(
+            model_name='policies',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['zip_cds'], name='idx_policies_zip_cds'),
+        ),
+    ]
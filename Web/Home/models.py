@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
 
 class Policies(models.Model):
     plcy_no = models.CharField(max_length=50, primary_key=True)
@@ -21,6 +23,11 @@ class Policies(models.Model):
     job_cd = models.CharField(max_length=500, null=True)
     school_cd = models.CharField(max_length=500, null=True)
     zip_cd = models.CharField(max_length=500, null=True)
+    # 쉼표로 저장된 조건 코드를 값 단위로 분리한 배열 (적재 시 함께 저장, 챗봇 조건 필터는 && / = ANY)
+    plcy_major_cds = ArrayField(models.TextField(), null=True)
+    job_cds = ArrayField(models.TextField(), null=True)
+    school_cds = ArrayField(models.TextField(), null=True)
+    zip_cds = ArrayField(models.TextField(), null=True)
     earn_cnd_se_cd = models.CharField(max_length=10, null=True)
     earn_etc_cn = models.TextField(null=True)
     add_aply_qlfcc_cn = models.TextField(null=True)
@@ -53,6 +60,37 @@ class Policies(models.Model):
             models.Index(fields=['aply_bgng_ymd', 'aply_end_ymd'], name='idx_policies_aply_dates'),
             models.Index(fields=['lclsf_nm', 'mclsf_nm'], name='idx_policies_classification'),
             models.Index(fields=['plcy_nm'], name='idx_policies_plcy_nm'),
+            # pg_trgm: 챗봇 검색의 similarity()/% 연산자 가속
+            GinIndex(fields=['plcy_nm'], opclasses=['gin_trgm_ops'], name='idx_policies_nm_trgm'),
+            GinIndex(fields=['plcy_expln_cn'], opclasses=['gin_trgm_ops'], name='idx_policies_expln_trgm'),
+            GinIndex(fields=['earn_etc_cn'], opclasses=['gin_trgm_ops'], name='idx_policies_earn_trgm'),
+            GinIndex(fields=['add_aply_qlfcc_cn'], opclasses=['gin_trgm_ops'], name='idx_policies_qlfcc_trgm'),
+            GinIndex(fields=['ptcp_prp_trgt_cn'], opclasses=['gin_trgm_ops'], name='idx_policies_ptcp_trgm'),
+            # 조건 코드 배열 포함/겹침(@>, &&, = ANY) 검색
+            GinIndex(fields=['plcy_major_cds'], name='idx_policies_major_cds'),
+            GinIndex(fields=['job_cds'], name='idx_policies_job_cds'),
+            GinIndex(fields=['school_cds'], name='idx_policies_school_cds'),
+            GinIndex(fields=['zip_cds'], name='idx_policies_zip_cds'),
+            # pg_trgm KNN: ORDER BY plcy_nm <-> 키워드 (GIN은 거리 정렬을 지원하지 않음)
+            GistIndex(fields=['plcy_nm'], opclasses=['gist_trgm_ops'], name='idx_policies_nm_trgm_knn'),
         ]
         verbose_name = '정책'
-        verbose_name_plural = '정책'
\ No newline at end of file
+        verbose_name_plural = '정책'
+
+class PolicyDataVersion(models.Model):
+    """
+    정책 데이터 버전 (단일 행)
+    - 적재 작업이 policies upsert 시 version 증가
+    - 챗봇 답변 캐시는 버전이 바뀌면 이전 결과를 사용하지 않음
+    """
+    id = models.SmallIntegerField(primary_key=True, default=1)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+
+    class Meta:
+        db_table = 'policy_data_version'
+        constraints = [
+            models.CheckConstraint(condition=models.Q(id=1), name='policy_data_version_single_row'),
+        ]
+        verbose_name = '정책 데이터 버전'
+        verbose_name_plural = '정책 데이터 버전'
@@ -1,3 +1,33 @@
-from django.test import TestCase
+from django.apps import apps
+from django.contrib.postgres.indexes import GinIndex
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.state import ProjectState
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .models import Policies
+
+CONDITION_COLUMNS = ('zip_cd', 'school_cd', 'job_cd', 'plcy_major_cd')
+
+
+class PoliciesIndexTests(SimpleTestCase):
+    def indexes(self):
+        return {index.name: index for index in Policies._meta.indexes}
+
+    def test_condition_columns_have_no_trigram_index(self):
+        # 조건 필터는 값 단위 배열 컬럼(GIN)만 사용
+        for index in self.indexes().values():
+            with self.subTest(index=index.name):
+                self.assertFalse(set(index.fields) & set(CONDITION_COLUMNS))
+
+    def test_condition_arrays_have_gin_index(self):
+        indexed = {field for index in self.indexes().values() if isinstance(index, GinIndex) for field in index.fields}
+        for column in CONDITION_COLUMNS:
+            with self.subTest(column=column):
+                self.assertIn(f'{column}s', indexed)
+
+    def test_migrations_match_models(self):
+        # DB 연결 없이 마이그레이션 상태와 모델 비교 (makemigrations --check와 같은 검사)
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        changes = MigrationAutodetector(loader.project_state(), ProjectState.from_apps(apps)).changes(graph=loader.graph)
+        self.assertNotIn('Home', changes)
@@ -3,6 +3,7 @@ from django.shortcuts import redirect
 from .services import verify_and_refresh_tokens
 from rest_framework.exceptions import AuthenticationFailed
 from django.http import HttpResponse, JsonResponse
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 import logging
 
 # User 모델 가져오기
@@ -12,12 +13,17 @@ User = get_user_model()
 logger = logging.getLogger('User.middleware')
 
 class JWTAuthenticationMiddleware:
+    # 동기/비동기 모두 지원 → ASGI에서 async 뷰(챗봇 메시지 전송)를 스레드 전환 없이 호출
+    sync_capable = True
+    async_capable = True
 
     # Django middleware는 __init__ 에서 get_response 받아서 저장 → 요청 후 처리를 위해 사용.
     # get_response 저장 → 마지막에 호출
     def __init__(self, get_response):
         # view로 요청 전달할 때 사용되는 함수
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def _is_home_page(self, request):
         return request.path == '/'
@@ -38,6 +44,23 @@ class JWTAuthenticationMiddleware:
 
     # 미들웨어 본체 -> 모든 요청마다 실행
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self._authenticate(request)
+        if response is not None:
+            return response
+        return self.get_response(request)
+
+    # ASGI 요청 처리 -> 토큰 검증/사용자 조회(동기 ORM)만 스레드에서 실행하고 뷰는 비동기로 호출
+    async def __acall__(self, request):
+        response = await sync_to_async(self._authenticate)(request)
+        if response is not None:
+            return response
+        return await self.get_response(request)
+
+    # 인증 처리 -> 요청을 중단해야 하면 응답 객체, 뷰로 진행하면 None 반환
+    def _authenticate(self, request):
         logger.info('미들웨어 사용됨')
         
         # 공개 페이지 URL 목록
@@ -46,6 +69,7 @@ class JWTAuthenticationMiddleware:
             '/user/login/',
             '/user/naver/login/',
             '/user/naver/callback/',
+            '/chatbot/metrics/',  # Prometheus 수집 (METRICS_TOKEN으로 별도 확인, 미설정 시 404)
         ]
 
         # 뷰에서 항상 request.user를 안전하게 사용할 수 있도록 초기값 설정
@@ -54,7 +78,7 @@ class JWTAuthenticationMiddleware:
         # 공개 페이지는 인증 체크를 하지 않음
         # '/api/policy/'로 시작하는 URL도 인증 검사 제외
         if request.path in public_urls or request.path.startswith('/api/policy/'):
-            return self.get_response(request)
+            return None
 
         try:
             '''
@@ -116,7 +140,7 @@ class JWTAuthenticationMiddleware:
                 return self._redirect_to_login(request)
 
         # 정상 통과 시 → view로 요청 전달
-        return self.get_response(request)
+        return None
 
 
 
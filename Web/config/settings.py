@@ -34,6 +34,9 @@ NAVER_REDIRECT_URI = os.getenv("NAVER_REDIRECT_URI")
 ACCESS_SECRET_KEY = os.getenv("ACCESS_SECRET_KEY")
 REFRESH_SECRET_KEY = os.getenv("REFRESH_SECRET_KEY")
 
+# Prometheus 지표 수집 토큰 (/chatbot/metrics/ 요청에 Authorization: Bearer <토큰> 필요, 미설정 시 지표 비노출)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -59,6 +62,7 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',  # runserver를 ASGI 서버로 실행 (챗봇 async 뷰)
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -102,6 +106,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 
 # Database
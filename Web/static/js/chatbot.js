@@ -286,8 +286,13 @@ document.addEventListener('DOMContentLoaded', function() {
         // '답변을 생성중입니다...' 메시지 출력
         const loadingElement = displayMessage('답변을 생성중입니다...', 'bot', true);
 
-        // 서버에 메시지 전송을 요청하는 fetch 요청
-        fetch('/chatbot/api/chat/', {
+        // 스트리밍 API로 메시지 전송 (진행 상황과 답변을 실시간으로 표시)
+        streamMessage(message, loadingElement);
+    }
+
+    // 스트리밍 API로 메시지를 전송하고 SSE 이벤트를 처리하는 함수
+    function streamMessage(message, loadingElement, isRetry = false) {
+        fetch('/chatbot/api/chat/stream/', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -304,80 +309,26 @@ document.addEventListener('DOMContentLoaded', function() {
             if (response.status === 401) {
                 throw new Error('Unauthorized');
             }
-            return response.json();
-        })
-        .then(data => {
-            // 로딩 요소 제거
-            loadingElement.remove();
-
-            // 리다이렉트 상태인 경우 해당 URL로 이동
-            if (data.status === 'redirect') {
-                window.location.href = data.redirect_url;
-                return;
-            }
-            // 토큰 재발급 상태인 경우
-            else if (data.status === 'token_refreshed') {
-                // 원본 메시지를 저장
-                const originalMessage = message;
-                // 토큰 재발급 후 원본 메시지로 다시 요청
-                // 재요청 시에도 로딩 메시지 표시
-                const retryLoadingElement = displayMessage('답변을 생성중입니다...', 'bot', true);
-                
-                fetch('/chatbot/api/chat/', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                        'X-Requested-With': 'XMLHttpRequest',
-                        'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value
-                    },
-                    body: JSON.stringify({
-                        message: originalMessage,
-                        session_id: currentSessionId
-                    })
-                })
-                .then(response => response.json())
-                .then(data => {
-                    // 재요청의 로딩 요소 제거
-                    retryLoadingElement.remove();
-                    
-                    if (data.status === 'success' && data.messages) {
-                        data.messages.forEach(msg => {
-                            if (msg.sender === 'chatbot') {
-                                displayMessage(msg.content, msg.sender, false, msg.created_at, msg.id, msg.sql_result);
-                            }
-                        });
-                        loadSessionList();
-                        if (data.session_id) {
-                            currentSessionId = data.session_id;
-                        }
-                    } else {
-                        displayMessage(data.message || '오류가 발생했습니다.', 'bot');
+            const contentType = response.headers.get('Content-Type') || '';
+            // 스트림이 아닌 JSON 응답 (토큰 재발급, 리다이렉트, 오류 등)
+            if (!contentType.includes('text/event-stream')) {
+                return response.json().then(data => {
+                    loadingElement.remove();
+                    // 리다이렉트 상태인 경우 해당 URL로 이동
+                    if (data.status === 'redirect') {
+                        window.location.href = data.redirect_url;
+                    }
+                    // 토큰 재발급 후 원본 메시지로 다시 요청
+                    else if (data.status === 'token_refreshed' && !isRetry) {
+                        const retryLoadingElement = displayMessage('답변을 생성중입니다...', 'bot', true);
+                        streamMessage(message, retryLoadingElement, true);
+                    }
+                    else {
+                        displayMessage(data.error || data.message || '오류가 발생했습니다.', 'bot');
                     }
-                })
-                .catch(error => {
-                    // 재요청 실패 시에도 로딩 요소 제거
-                    retryLoadingElement.remove();
-                    displayMessage('네트워크 오류가 발생했습니다. 다시 시도해주세요.', 'bot');
                 });
-                return;
-            }
-            // 성공 상태인 경우
-            else if (data.status === 'success') {
-                if (data.messages) {
-                    data.messages.forEach(msg => {
-                        if (msg.sender === 'chatbot') {
-                            displayMessage(msg.content, msg.sender, false, msg.created_at, msg.id, msg.sql_result);
-                        }
-                    });
-                }
-                loadSessionList();
-                if (data.session_id) {
-                    currentSessionId = data.session_id;
-                }
-            }
-            else {
-                displayMessage(data.message || '오류가 발생했습니다.', 'bot');
             }
+            return readEventStream(response, loadingElement);
         })
         .catch(error => {
             loadingElement.remove();
@@ -389,6 +340,70 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // SSE 응답 본문을 읽어 progress/token/done/error 이벤트를 처리하는 함수
+    function readEventStream(response, loadingElement) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder('utf-8');
+        const messagesContainer = document.getElementById('chat-messages');
+        const loadingContent = loadingElement.querySelector('.font-semibold');
+        let buffer = '';
+        let answer = '';
+
+        // 이벤트 블록 하나('event: ...\ndata: ...')를 처리
+        function handleEvent(block) {
+            let eventName = 'message';
+            let dataText = '';
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataText += line.slice(5).trim();
+            });
+            if (!dataText) return;
+            const data = JSON.parse(dataText);
+
+            if (eventName === 'progress') {
+                // 답변 토큰이 오기 전까지 진행 상황 표시
+                if (!answer && data.message) {
+                    loadingContent.textContent = data.message;
+                }
+            } else if (eventName === 'token') {
+                // 생성되는 답변을 로딩 메시지 자리에 바로 렌더링
+                answer += data.content;
+                loadingContent.innerHTML = marked.parse(removeContentBetweenDashes(answer));
+                messagesContainer.scrollTop = messagesContainer.scrollHeight;
+            } else if (eventName === 'done') {
+                // 저장된 메시지로 교체 (정책 카드 포함)
+                loadingElement.remove();
+                (data.messages || []).forEach(msg => {
+                    if (msg.sender === 'chatbot') {
+                        displayMessage(msg.content, msg.sender, false, msg.created_at, msg.id, msg.sql_result);
+                    }
+                });
+                loadSessionList();
+                if (data.session_id) {
+                    currentSessionId = data.session_id;
+                }
+            } else if (eventName === 'error') {
+                loadingElement.remove();
+                displayMessage(data.error || '오류가 발생했습니다.', 'bot');
+            }
+        }
+
+        function read() {
+            return reader.read().then(({ done, value }) => {
+                if (done) {
+                    if (buffer.trim()) handleEvent(buffer);
+                    return;
+                }
+                buffer += decoder.decode(value, { stream: true });
+                const blocks = buffer.split('\n\n');
+                buffer = blocks.pop();
+                blocks.forEach(handleEvent);
+                return read();
+            });
+        }
+        return read();
+    }
+
     // 메시지를 화면에 표시하는 함수
     function displayMessage(message, sender, isLoading = false, createdAt = null, messageId = null, sqlResult = null) {
         // 채팅 메시지 컨테이너 요소 선택
@@ -3,6 +3,8 @@
 
 -- pgvector 확장 설치 (임베딩 테이블용)
 CREATE EXTENSION IF NOT EXISTS vector;
+-- pg_trgm 확장 설치 (챗봇 키워드 유사도 검색용)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- 1. 정책 테이블 (통합 메인 테이블)
 CREATE TABLE policies (
@@ -29,6 +31,11 @@ CREATE TABLE policies (
     job_cd VARCHAR(500),
     school_cd VARCHAR(500),
     zip_cd VARCHAR(500),
+    -- 조건 코드 배열 (위 쉼표 구분 코드를 값 단위로 분리, 적재 시 함께 저장)
+    plcy_major_cds TEXT[],
+    job_cds TEXT[],
+    school_cds TEXT[],
+    zip_cds TEXT[],
     earn_cnd_se_cd VARCHAR(10),
     earn_etc_cn TEXT,
     add_aply_qlfcc_cn TEXT,
@@ -68,15 +75,42 @@ CREATE TABLE policy_embeddings (
     FOREIGN KEY (plcy_no) REFERENCES policies(plcy_no) ON DELETE CASCADE
 );
 
+-- 3. 정책 데이터 버전 테이블 (단일 행, 적재 작업이 policies upsert 시 증가 -> 챗봇 답변 캐시 무효화)
+CREATE TABLE policy_data_version (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO policy_data_version (id, version) VALUES (1, 0);
+
 -- 인덱스 생성
 CREATE INDEX idx_policies_plcy_nm ON policies(plcy_nm);
 CREATE INDEX idx_policies_aply_dates ON policies(aply_bgng_ymd, aply_end_ymd);
 CREATE INDEX idx_policies_age ON policies(sprt_trgt_min_age, sprt_trgt_max_age);
 CREATE INDEX idx_policies_classification ON policies(lclsf_nm, mclsf_nm);
 
+-- 트라이그램 인덱스 (similarity()/% 연산자 가속)
+CREATE INDEX idx_policies_nm_trgm ON policies USING gin (plcy_nm gin_trgm_ops);
+CREATE INDEX idx_policies_expln_trgm ON policies USING gin (plcy_expln_cn gin_trgm_ops);
+CREATE INDEX idx_policies_earn_trgm ON policies USING gin (earn_etc_cn gin_trgm_ops);
+CREATE INDEX idx_policies_qlfcc_trgm ON policies USING gin (add_aply_qlfcc_cn gin_trgm_ops);
+CREATE INDEX idx_policies_ptcp_trgm ON policies USING gin (ptcp_prp_trgt_cn gin_trgm_ops);
+-- 조건 코드 배열 인덱스 (챗봇 조건 필터 &&, = ANY)
+CREATE INDEX idx_policies_major_cds ON policies USING gin (plcy_major_cds);
+CREATE INDEX idx_policies_job_cds ON policies USING gin (job_cds);
+CREATE INDEX idx_policies_school_cds ON policies USING gin (school_cds);
+CREATE INDEX idx_policies_zip_cds ON policies USING gin (zip_cds);
+-- 트라이그램 KNN 정렬 (ORDER BY plcy_nm <-> 키워드)
+CREATE INDEX idx_policies_nm_trgm_knn ON policies USING gist (plcy_nm gist_trgm_ops);
+
+-- 임베딩 ANN 인덱스 (챗봇 hybrid 검색, 3072차원 vector는 HNSW 한도를 넘으므로 halfvec 식 인덱스)
+CREATE INDEX idx_policy_embeddings_hnsw ON policy_embeddings USING hnsw ((embedding::halfvec(3072)) halfvec_cosine_ops);
+-- 축소 임베딩(embedding_256/512/1024 halfvec)과 인덱스는 적재 옵션(EMBEDDING_REDUCED_DIMENSIONS)으로 생성
+
 -- 테이블 코멘트
 COMMENT ON TABLE policies IS '정책 통합 정보 테이블';
 COMMENT ON TABLE policy_embeddings IS '정책 임베딩 벡터 테이블';
+COMMENT ON TABLE policy_data_version IS '정책 데이터 버전 (policies 변경 시 증가)';
 
 -- 컬럼 코멘트
 -- policies 테이블
@@ -103,6 +137,10 @@ COMMENT ON COLUMN policies.plcy_major_cd IS '정책전공요건코드';
 COMMENT ON COLUMN policies.job_cd IS '정책취업요건코드';
 COMMENT ON COLUMN policies.school_cd IS '정책학력요건코드';
 COMMENT ON COLUMN policies.zip_cd IS '정책거주지역코드';
+COMMENT ON COLUMN policies.plcy_major_cds IS '정책전공요건코드 배열';
+COMMENT ON COLUMN policies.job_cds IS '정책취업요건코드 배열';
+COMMENT ON COLUMN policies.school_cds IS '정책학력요건코드 배열';
+COMMENT ON COLUMN policies.zip_cds IS '정책거주지역코드 배열';
 COMMENT ON COLUMN policies.earn_cnd_se_cd IS '소득조건구분코드';
 COMMENT ON COLUMN policies.earn_etc_cn IS '소득기타내용';
 COMMENT ON COLUMN policies.add_aply_qlfcc_cn IS '추가신청자격요건';
@@ -25,16 +25,38 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 축소 임베딩으로 저장할 수 있는 차원 (Chatbot.retrieval.REDUCED_EMBEDDING_DIMENSIONS와 같음)
+REDUCED_EMBEDDING_DIMENSIONS = (256, 512, 1024)
+
+
+def split_codes(value):
+    """쉼표로 구분된 조건 코드 -> 배열 ('재직자, 미취업자' -> ['재직자', '미취업자'], 값이 없으면 None)"""
+    if value is None or pd.isna(value):
+        return None
+    return [code.strip() for code in str(value).split(',') if code.strip()]
+
+
 class YouthPolicyDataInserter:
-    def __init__(self, db_config, openai_api_key=None):
+    def __init__(self, db_config, openai_api_key=None, reduced_dimensions=None):
         """
         DB 연결 설정 및 OpenAI 클라이언트 초기화
+        - reduced_dimensions: 원본 임베딩과 함께 저장할 축소 임베딩 차원 목록 (예: [256, 512], 기본값은 환경변수 EMBEDDING_REDUCED_DIMENSIONS)
         """
         self.db_config = db_config
         self.conn = None
         self.cursor = None
         self.code_mapping = {}
         
+        if reduced_dimensions is None:
+            reduced_dimensions = [int(value) for value in os.getenv('EMBEDDING_REDUCED_DIMENSIONS', '').split(',') if value.strip()]
+        unsupported = set(reduced_dimensions) - set(REDUCED_EMBEDDING_DIMENSIONS)
+        if unsupported:
+            raise ValueError(f"지원하지 않는 축소 임베딩 차원: {sorted(unsupported)}")
+        self.reduced_dimensions = list(reduced_dimensions)
+        # HNSW 인덱스 생성 옵션 (클수록 재현율 증가, 생성 시간/크기 증가)
+        self.hnsw_m = int(os.getenv('HNSW_M', 16))
+        self.hnsw_ef_construction = int(os.getenv('HNSW_EF_CONSTRUCTION', 64))
+        
         # OpenAI 클라이언트 설정
         if openai_api_key:
             openai.api_key = openai_api_key
@@ -366,6 +388,10 @@ class YouthPolicyDataInserter:
                 row['정책취업요건코드'],
                 row['정책학력요건코드'],
                 row['정책거주지역코드'],
+                split_codes(row['정책전공요건코드']),
+                split_codes(row['정책취업요건코드']),
+                split_codes(row['정책학력요건코드']),
+                split_codes(row['정책거주지역코드']),
                 row['소득조건구분코드'],
                 row['소득기타내용'],
                 row['추가신청자격조건내용'],
@@ -398,7 +424,8 @@ class YouthPolicyDataInserter:
             srng_mthd_cn, sbmsn_dcmnt_cn, etc_mttr_cn, inq_cnt, frst_reg_dt,
             last_mdfcn_dt, aply_bgng_ymd, aply_end_ymd,
             sprt_trgt_min_age, sprt_trgt_max_age, mrg_stts_cd, plcy_major_cd,
-            job_cd, school_cd, zip_cd, earn_cnd_se_cd, earn_etc_cn,
+            job_cd, school_cd, zip_cd, plcy_major_cds, job_cds, school_cds, zip_cds,
+            earn_cnd_se_cd, earn_etc_cn,
             add_aply_qlfcc_cn, ptcp_prp_trgt_cn,
             lclsf_nm, mclsf_nm, plcy_pvsn_mthd_cd, plcy_kywd_nm,
             sprvsn_inst_cd_nm, oper_inst_cd_nm, aply_prd_se_cd, biz_prd_se_cd,
@@ -425,6 +452,10 @@ class YouthPolicyDataInserter:
             job_cd = EXCLUDED.job_cd,
             school_cd = EXCLUDED.school_cd,
             zip_cd = EXCLUDED.zip_cd,
+            plcy_major_cds = EXCLUDED.plcy_major_cds,
+            job_cds = EXCLUDED.job_cds,
+            school_cds = EXCLUDED.school_cds,
+            zip_cds = EXCLUDED.zip_cds,
             earn_cnd_se_cd = EXCLUDED.earn_cnd_se_cd,
             earn_etc_cn = EXCLUDED.earn_etc_cn,
             add_aply_qlfcc_cn = EXCLUDED.add_aply_qlfcc_cn,
@@ -448,9 +479,62 @@ class YouthPolicyDataInserter:
         """
         
         execute_values(self.cursor, query, policies_data)
+        # 같은 트랜잭션에서 데이터 버전 증가 (챗봇 답변 캐시 무효화)
+        self.bump_policy_data_version()
         self.conn.commit()
         logger.info(f"통합 정책 테이블에 {len(policies_data)}개 레코드 {'업데이트' if is_update else '삽입'} 완료")
     
+    def bump_policy_data_version(self):
+        """정책 데이터 버전 증가 (테이블이 없으면 생성) - commit은 호출 측에서 수행"""
+        self.cursor.execute("""
+        CREATE TABLE IF NOT EXISTS policy_data_version (
+            id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        self.cursor.execute("""
+        INSERT INTO policy_data_version (id, version) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE SET
+            version = policy_data_version.version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING version
+        """)
+        version = self.cursor.fetchone()[0]
+        logger.info(f"정책 데이터 버전 갱신: {version}")
+    
+    def create_embedding_index(self):
+        """
+        챗봇 hybrid 검색용 HNSW 인덱스 (없으면 생성) - commit은 호출 측에서 수행
+        - 3072차원 vector는 HNSW 차원 한도(2000)를 넘으므로 halfvec 식 인덱스 (검색 쿼리도 같은 식 사용)
+        """
+        self.cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_policy_embeddings_hnsw
+        ON policy_embeddings USING hnsw ((embedding::halfvec(3072)) halfvec_cosine_ops)
+        WITH (m = {self.hnsw_m}, ef_construction = {self.hnsw_ef_construction})
+        """)
+    
+    def store_reduced_embeddings(self, policy_numbers):
+        """
+        축소 임베딩 저장 (Matryoshka: 원본 앞부분 절단 후 L2 정규화, 추가 API 호출 없음) - commit은 호출 측에서 수행
+        - 차원별 컬럼 embedding_{차원} halfvec + HNSW 인덱스 (없으면 생성)
+        - 이번에 적재한 정책과 아직 축소 임베딩이 없는 정책을 갱신
+        """
+        for dimensions in self.reduced_dimensions:
+            column = f"embedding_{dimensions}"
+            self.cursor.execute(f"ALTER TABLE policy_embeddings ADD COLUMN IF NOT EXISTS {column} halfvec({dimensions})")
+            self.cursor.execute(f"""
+            UPDATE policy_embeddings
+            SET {column} = l2_normalize(subvector(embedding, 1, {dimensions}))::halfvec({dimensions})
+            WHERE plcy_no = ANY(%s) OR {column} IS NULL
+            """, (list(policy_numbers),))
+            self.cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_policy_{column}_hnsw
+            ON policy_embeddings USING hnsw ({column} halfvec_cosine_ops)
+            WITH (m = {self.hnsw_m}, ef_construction = {self.hnsw_ef_construction})
+            """)
+            logger.info(f"축소 임베딩 저장 완료: {column}")
+    
     def insert_policy_embeddings(self, df, is_update=False):
         """정책 임베딩 정보 삽입 또는 업데이트"""
         if df.empty:
@@ -493,6 +577,7 @@ class YouthPolicyDataInserter:
         """
         
         execute_values(self.cursor, query, embedding_data)
+        self.create_embedding_index()
         self.conn.commit()
         logger.info(f"정책 임베딩 테이블에 {len(embedding_data)}개 레코드 {'업데이트' if is_update else '삽입'} 완료")
     
@@ -525,6 +610,12 @@ class YouthPolicyDataInserter:
                 if include_embeddings:
                     self.insert_policy_embeddings(updated_df, is_update=True)
             
+            # 축소 임베딩 (옵션 - 새로 적재한 정책 + 축소 임베딩이 없는 기존 정책)
+            if include_embeddings and self.reduced_dimensions:
+                changed = list(new_df['정책번호']) + list(updated_df['정책번호'])
+                self.store_reduced_embeddings(changed)
+                self.conn.commit()
+            
             # 요약 로그
             logger.info("=" * 50)
             logger.info("데이터 처리 요약:")